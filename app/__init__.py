@@ -1,5 +1,6 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import timedelta
 from app.routes.helper_bot_routes import helper_bot_bp
 import os
@@ -10,21 +11,45 @@ load_dotenv('/home/MikeAubry02025/email_agent/.env')
 
 db = SQLAlchemy()
 
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL lets the web workers read while the ingestion worker writes"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+def _engine_options(database_uri):
+    """Connection pool settings suited to the database backend"""
+    if database_uri.startswith('sqlite'):
+        if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+            # Flask-SQLAlchemy gives in-memory databases a single shared connection
+            return {}
+        # A file connection is cheap and SQLite serialises writers anyway, so keep
+        # a few per process and have writers wait for the lock instead of failing
+        return {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            'connect_args': {'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 30))}
+        }
+    return {
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+        'pool_size': 10,
+        'max_overflow': 20
+    }
+
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
 
     # Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(os.path.dirname(__file__), "email_agent.db")}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL', f'sqlite:///{os.path.join(os.path.dirname(__file__), "email_agent.db")}'
+    )
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     # Database connection pooling optimization
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True,
-        'pool_recycle': 3600,
-        'pool_size': 10,
-        'max_overflow': 20
-    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
     app.config['SESSION_COOKIE_SECURE'] = True
     app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -47,6 +72,8 @@ def create_app():
 
     # Create tables
     with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _configure_sqlite_connection)
         db.create_all()
 
     return app
\ No newline at end of file
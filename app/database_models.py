@@ -144,10 +144,20 @@ class ProcessingLog(db.Model):
     emails_processed = db.Column(db.Integer, default=0)
     emails_new = db.Column(db.Integer, default=0)
     errors = db.Column(db.Text)  # JSON array of error messages
+    lag_stats = db.Column(db.Text)  # JSON: ingestion lag percentiles per category
 
     def __repr__(self):
         return f'<ProcessingLog {self.started_at}: {self.status}>'
 
+    def get_lag_stats(self):
+        """Get lag percentiles as dict"""
+        if self.lag_stats:
+            try:
+                return json.loads(self.lag_stats)
+            except ValueError:
+                return {}
+        return {}
+
     def get_errors(self):
         """Get errors as list"""
         if self.errors:
@@ -171,6 +181,8 @@ class EmailCategories(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True)
     description = db.Column(db.Text)
     keywords = db.Column(db.Text)  # JSON array of keywords
+    sender_patterns = db.Column(db.Text)  # JSON array of sender addresses, '*' wildcards allowed
+    domain_patterns = db.Column(db.Text)  # JSON array of sender domains, subdomains included
     priority_default = db.Column(db.String(20), default='Medium')
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -188,6 +200,44 @@ class EmailCategories(db.Model):
         """Set keywords from list"""
         self.keywords = json.dumps(keywords_list) if keywords_list else None
 
+    def get_sender_patterns(self):
+        """Get sender patterns as list"""
+        if self.sender_patterns:
+            try:
+                return json.loads(self.sender_patterns)
+            except ValueError:
+                return []
+        return []
+
+    def set_sender_patterns(self, patterns):
+        """Set sender patterns from list"""
+        self.sender_patterns = json.dumps(patterns) if patterns else None
+
+    def get_domain_patterns(self):
+        """Get domain patterns as list"""
+        if self.domain_patterns:
+            try:
+                return json.loads(self.domain_patterns)
+            except ValueError:
+                return []
+        return []
+
+    def set_domain_patterns(self, patterns):
+        """Set domain patterns from list"""
+        self.domain_patterns = json.dumps(patterns) if patterns else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'keywords': self.get_keywords(),
+            'sender_patterns': self.get_sender_patterns(),
+            'domain_patterns': self.get_domain_patterns(),
+            'priority_default': self.priority_default,
+            'is_active': self.is_active
+        }
+
 class FollowUpReminder(db.Model):
     """Follow-up reminders for emails and clients"""
     __tablename__ = 'follow_up_reminders'
@@ -323,4 +373,203 @@ class MaintenanceRequest(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
-        return f'<MaintenanceRequest {self.title}: {self.status}>'
\ No newline at end of file
+        return f'<MaintenanceRequest {self.title}: {self.status}>'
+
+class MailboxSyncState(db.Model):
+    """Gmail history cursor used for incremental mailbox sync"""
+    __tablename__ = 'mailbox_sync_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mailbox = db.Column(db.String(255), nullable=False, unique=True, index=True)
+    history_id = db.Column(db.String(64))  # Last Gmail historyId fully processed
+    last_synced_at = db.Column(db.DateTime)
+    last_full_sync_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MailboxSyncState {self.mailbox}: {self.history_id}>'
+
+class BackfillRun(db.Model):
+    """Historical import split into day windows so it can resume after a restart"""
+    __tablename__ = 'backfill_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    range_start = db.Column(db.DateTime, nullable=False)
+    range_end = db.Column(db.DateTime, nullable=False)
+    window_hours = db.Column(db.Integer, nullable=False, default=24)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, running, completed, failed
+
+    # Progress since the run was last (re)started, for rate and ETA
+    resumed_at = db.Column(db.DateTime)
+    processed_at_resume = db.Column(db.Integer, default=0)
+    windows_done_at_resume = db.Column(db.Integer, default=0)
+    heartbeat_at = db.Column(db.DateTime)
+
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    windows = db.relationship('BackfillWindow', backref='run', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<BackfillRun {self.id}: {self.status}>'
+
+class BackfillWindow(db.Model):
+    """One time window of a backfill run; done windows are never fetched again"""
+    __tablename__ = 'backfill_windows'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('backfill_runs.id'), nullable=False, index=True)
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, running, done, failed
+
+    processed = db.Column(db.Integer, default=0)
+    new = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BackfillWindow {self.window_start:%Y-%m-%d}: {self.status}>'
+
+class ProcessingJob(db.Model):
+    """Durable background job; workers claim it with a lease and renew it by heartbeat"""
+    __tablename__ = 'processing_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)
+    payload = db.Column(db.Text)  # JSON arguments for the handler
+    dedupe_key = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, dead
+    priority = db.Column(db.Integer, nullable=False, default=0)  # Higher runs first
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = db.Column(db.Text)
+    result = db.Column(db.Text)  # JSON
+
+    # Lease held by the worker running the job
+    lease_owner = db.Column(db.String(255))
+    lease_expires_at = db.Column(db.DateTime, index=True)
+    heartbeat_at = db.Column(db.DateTime)
+
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # At most one queued or running job per dedupe key
+        db.Index('uq_processing_jobs_active_dedupe', 'dedupe_key', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"),
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    def get_payload(self):
+        """Get payload as dict"""
+        return json.loads(self.payload) if self.payload else {}
+
+    def get_result(self):
+        """Get result as dict"""
+        return json.loads(self.result) if self.result else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'last_error': self.last_error,
+            'result': self.get_result(),
+            'lease_owner': self.lease_owner,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ProcessingJob {self.id} {self.job_type}: {self.status}>'
+
+class MailboxLease(db.Model):
+    """Cross-process lock on a mailbox; fencing_token grows by one on every acquire"""
+    __tablename__ = 'mailbox_leases'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mailbox = db.Column(db.String(255), nullable=False)
+    scope = db.Column(db.String(50), nullable=False, default='ingest')  # ingest, backfill
+    owner = db.Column(db.String(255))  # NULL when released
+    fencing_token = db.Column(db.Integer, nullable=False, default=0)
+    acquired_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    released_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.UniqueConstraint('mailbox', 'scope', name='uq_mailbox_leases_mailbox_scope'),)
+
+    def to_dict(self):
+        return {
+            'mailbox': self.mailbox,
+            'scope': self.scope,
+            'owner': self.owner,
+            'fencing_token': self.fencing_token,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+    def __repr__(self):
+        return f'<MailboxLease {self.mailbox}/{self.scope}: {self.owner} #{self.fencing_token}>'
+
+class ClassificationCacheEntry(db.Model):
+    """AI classification reused for emails with the same normalized content, prompt version and model"""
+    __tablename__ = 'classification_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    prompt_version = db.Column(db.String(16), nullable=False)
+    model = db.Column(db.String(64), nullable=False)
+    classification = db.Column(db.Text, nullable=False)  # JSON of the AI result's labels, before post-processing
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'prompt_version', 'model', name='uq_classification_cache_key'),
+    )
+
+    def get_classification(self):
+        """Get classification as dict"""
+        return json.loads(self.classification)
+
+    def __repr__(self):
+        return f'<ClassificationCacheEntry {self.content_hash[:12]} {self.prompt_version}/{self.model}: {self.hit_count} hits>'
+
+class UrgencyKeyword(db.Model):
+    """Urgency keyword weight; overrides or extends the built-in list, an inactive row removes the keyword"""
+    __tablename__ = 'urgency_keywords'
+
+    id = db.Column(db.Integer, primary_key=True)
+    keyword = db.Column(db.String(100), nullable=False, unique=True)
+    weight = db.Column(db.Float, nullable=False, default=0.8)  # 0.0-1.0; URGENCY_OVERRIDE_SCORE and up forces Critical
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'keyword': self.keyword,
+            'weight': self.weight,
+            'is_active': self.is_active
+        }
+
+    def __repr__(self):
+        return f'<UrgencyKeyword {self.keyword}: {self.weight}>'
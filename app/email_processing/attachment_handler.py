@@ -1,11 +1,13 @@
 # app/email_processing/attachment_handler.py
 import os
 import re
+import time
 import shutil
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 from pathlib import Path
+from .gmail_fetcher import backoff_delay
 
 logger = logging.getLogger(__name__)
 
@@ -217,8 +219,7 @@ class AttachmentHandler:
                     logger.warning(f"Download attempt {attempt + 1} failed for {filename}: {download_error}")
                     if attempt == max_retries - 1:
                         raise download_error
-                    import time
-                    time.sleep(1)  # Wait 1 second before retry
+                    time.sleep(backoff_delay(attempt))  # Exponential backoff with jitter
                     
             if not file_data:
                 raise ValueError("Downloaded file data is empty")
@@ -275,6 +276,20 @@ class AttachmentHandler:
                 'status': 'error'
             }
 
+    def process_attachment_parts(self, parts: List[Dict], message_id: str, sender_email: str,
+                                 gmail_client) -> List[Dict]:
+        """Process several attachment parts, downloading them concurrently when possible"""
+        def process(part):
+            return self.process_attachment_part(part, message_id, sender_email, gmail_client)
+
+        fetcher = getattr(gmail_client, 'fetcher', None)
+        if fetcher is None or len(parts) < 2:
+            results = [process(part) for part in parts]
+        else:
+            results = fetcher.map(process, parts)
+
+        return [result for result in results if result]
+
     def get_attachment_path(self, relative_path: str) -> str:
         """Get full path from relative path"""
         return os.path.join(self.base_dir, relative_path)
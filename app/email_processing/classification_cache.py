@@ -0,0 +1,260 @@
+# app/email_processing/classification_cache.py
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from flask import has_app_context
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from ..database_models import db, ClassificationCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Parts of automated mail that change on every send without changing what it is about
+VOLATILE_PATTERNS = [
+    (re.compile(r'(https?://[^\s?#]+)[?#]\S*'), r'\1'),  # tracking query strings
+    (re.compile(r'\b\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}\b'), '<date>'),
+    (re.compile(r'\b\d{1,2}:\d{2}(:\d{2})?(\s*[ap]\.?m\.?)?'), '<time>'),
+    (re.compile(r'\b[0-9a-f]{16,}\b'), '<id>'),
+    (re.compile(r'\b\d{5,}\b'), '<number>'),  # ticket, invoice and confirmation numbers
+    (re.compile(r'\s+'), ' '),
+]
+
+# Only what the email is, never what it says: two emails that differ in masked details share an
+# entry, so summaries, phone numbers and amounts from one must not be stored on the other
+LABEL_FIELDS = ('category', 'sub_category', 'priority', 'requires_action', 'confidence_score', 'tags')
+
+
+class ClassificationCache:
+    """Persistent cache of AI classifications for repeated automated mail
+
+    Entries are keyed by a hash of the normalized email content, the prompt
+    version and the model, so alarm notices or billing reminders that differ
+    only in timestamps, reference numbers or tracking links are classified
+    once. Only the labels in LABEL_FIELDS are kept; a cached hit has no
+    summary or extracted details. Entries older than ttl_hours are not
+    served, and beyond max_entries the least recently used ones are deleted.
+    When the prompt or model changes, entries for the old version are purged
+    and the others kept. The cache needs an app context and is skipped
+    without one.
+    """
+
+    # Run eviction after this many new entries
+    EVICT_EVERY = 500
+
+    # Hit counts and last-use times are kept in memory and written in one statement per this many hits
+    TOUCH_FLUSH_EVERY = 100
+
+    def __init__(self, ttl_hours: float = None, max_entries: int = None):
+        self.ttl_hours = ttl_hours if ttl_hours is not None else float(
+            os.environ.get('CLASSIFICATION_CACHE_TTL_HOURS', 24 * 30))
+        self.max_entries = max_entries or int(os.environ.get('CLASSIFICATION_CACHE_MAX_ENTRIES', 20000))
+        self._lock = threading.Lock()
+        self._current_versions = set()
+        self._stores_since_evict = 0
+        self._touched = {}  # entry id -> (hits not yet written, last used at)
+        self._pending_touches = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_hours > 0 and has_app_context()
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """Hash of the email content with volatile details masked"""
+        text = content.lower()
+        for pattern, replacement in VOLATILE_PATTERNS:
+            text = pattern.sub(replacement, text)
+        return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+    def get(self, content_hash: str, prompt_version: str, model: str) -> Optional[Dict]:
+        """Cached classification for the content, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            entry = ClassificationCacheEntry.query.filter_by(
+                content_hash=content_hash, prompt_version=prompt_version, model=model
+            ).first()
+            if entry is not None and entry.created_at < self._cutoff():
+                db.session.delete(entry)
+                db.session.commit()
+                self._count(expired=1)
+                entry = None
+            if entry is None:
+                self._count(misses=1)
+                return None
+
+            stored = entry.get_classification()
+            self._count(hits=1)
+            if self._touch(entry.id):
+                self.flush_touches()
+            return {field: stored[field] for field in LABEL_FIELDS if field in stored}
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._count(errors=1, misses=1)
+            logger.warning(f"Classification cache lookup failed: {e}")
+            return None
+
+    def put(self, content_hash: str, prompt_version: str, model: str, classification: Dict):
+        """Remember the labels of an AI classification for the content"""
+        if not self.enabled:
+            return
+        if (prompt_version, model) not in self._current_versions:
+            self.invalidate_stale(prompt_version, model)
+
+        try:
+            db.session.add(ClassificationCacheEntry(
+                content_hash=content_hash,
+                prompt_version=prompt_version,
+                model=model,
+                classification=json.dumps({field: classification[field] for field in LABEL_FIELDS
+                                           if field in classification})
+            ))
+            db.session.commit()
+            self._count(stores=1)
+        except IntegrityError:
+            # Another worker classified the same content first
+            db.session.rollback()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._count(errors=1)
+            logger.warning(f"Classification cache store failed: {e}")
+
+        with self._lock:
+            self._stores_since_evict += 1
+            due = self._stores_since_evict >= self.EVICT_EVERY
+            if due:
+                self._stores_since_evict = 0
+        if due:
+            self.evict()
+
+    def invalidate_stale(self, prompt_version: str, model: str) -> int:
+        """Delete entries made with another prompt version or model"""
+        try:
+            deleted = ClassificationCacheEntry.query.filter(
+                (ClassificationCacheEntry.prompt_version != prompt_version) |
+                (ClassificationCacheEntry.model != model)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._count(errors=1)
+            logger.warning(f"Classification cache invalidation failed: {e}")
+            return 0
+
+        with self._lock:
+            self._current_versions.add((prompt_version, model))
+        if deleted:
+            self._count(invalidated=deleted)
+            logger.info(f"Classification cache: dropped {deleted} entries from older prompt versions or models")
+        return deleted
+
+    def _touch(self, entry_id: int) -> bool:
+        """Record a hit in memory; True when enough have piled up to write them"""
+        with self._lock:
+            hits, _ = self._touched.get(entry_id, (0, None))
+            self._touched[entry_id] = (hits + 1, datetime.utcnow())
+            self._pending_touches += 1
+            return self._pending_touches >= self.TOUCH_FLUSH_EVERY
+
+    def flush_touches(self) -> int:
+        """Write the hit counts and last-use times recorded since the last flush"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._pending_touches = 0
+        if not touched:
+            return 0
+
+        table = ClassificationCacheEntry.__table__
+        try:
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('entry_id')).values(
+                    hit_count=table.c.hit_count + bindparam('hits'), last_used_at=bindparam('used_at')
+                ),
+                [{'entry_id': entry_id, 'hits': hits, 'used_at': used_at}
+                 for entry_id, (hits, used_at) in touched.items()]
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # Only usage statistics are lost, the entries themselves are untouched
+            db.session.rollback()
+            self._count(errors=1)
+            logger.warning(f"Classification cache usage update failed: {e}")
+            return 0
+        return len(touched)
+
+    def evict(self) -> int:
+        """Delete expired entries, then the least recently used ones beyond max_entries"""
+        # Recency decides what goes, so write the pending hits first
+        self.flush_touches()
+        try:
+            expired = ClassificationCacheEntry.query.filter(
+                ClassificationCacheEntry.created_at < self._cutoff()
+            ).delete(synchronize_session=False)
+
+            evicted = 0
+            excess = ClassificationCacheEntry.query.count() - self.max_entries
+            if excess > 0:
+                oldest = db.session.query(ClassificationCacheEntry.id).order_by(
+                    ClassificationCacheEntry.last_used_at
+                ).limit(excess).scalar_subquery()
+                evicted = ClassificationCacheEntry.query.filter(
+                    ClassificationCacheEntry.id.in_(oldest)
+                ).delete(synchronize_session=False)
+            db.session.commit()
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._count(errors=1)
+            logger.warning(f"Classification cache eviction failed: {e}")
+            return 0
+
+        self._count(expired=expired, evicted=evicted)
+        if expired or evicted:
+            logger.info(f"Classification cache: {expired} expired, {evicted} least recently used entries evicted")
+        return expired + evicted
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(hours=self.ttl_hours)
+
+    def _count(self, **increments):
+        with self._lock:
+            for field, value in increments.items():
+                setattr(self, field, getattr(self, field) + value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            metrics = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'stores': self.stores,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'invalidated': self.invalidated,
+                'errors': self.errors,
+                'ttl_hours': self.ttl_hours,
+                'max_entries': self.max_entries,
+            }
+        if has_app_context():
+            metrics['entries'] = ClassificationCacheEntry.query.count()
+        return metrics
+
+
+# Shared by every classifier in this process
+classification_cache = ClassificationCache()
@@ -0,0 +1,190 @@
+# app/email_processing/classification_engine.py
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List
+
+import openai
+
+from .gmail_fetcher import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Errors worth another attempt: throttling, timeouts and transient server failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class EngineMetrics:
+    """Call, retry and latency counters for the classification engine"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.latency_seconds = 0.0
+
+    def update(self, **increments):
+        with self._lock:
+            for field, value in increments.items():
+                setattr(self, field, getattr(self, field) + value)
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'timeouts': self.timeouts,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'average_latency_seconds': round(self.latency_seconds / self.succeeded, 3) if self.succeeded else None,
+            }
+
+
+class ClassificationEngine:
+    """Runs OpenAI chat completions on a background asyncio loop with bounded concurrency
+
+    One AsyncOpenAI client is shared by every caller in the process. At most
+    `concurrency` requests are in flight, requests are paced to
+    requests_per_minute when it is set, and each request has its own timeout.
+    Rate limits, timeouts and 5xx responses are retried with exponential
+    backoff, honouring Retry-After. complete() is a blocking facade for
+    threaded callers; complete_many() runs a list of requests side by side.
+    """
+
+    def __init__(self, concurrency: int = None, timeout: float = None, max_retries: int = None,
+                 requests_per_minute: float = None, api_key: str = None):
+        self.concurrency = concurrency or int(os.environ.get('OPENAI_CONCURRENCY', 8))
+        self.timeout = timeout or float(os.environ.get('OPENAI_TIMEOUT_SECONDS', 30))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get('OPENAI_MAX_RETRIES', 4))
+        self.requests_per_minute = requests_per_minute or float(os.environ.get('OPENAI_REQUESTS_PER_MINUTE', 0))
+        self.api_key = api_key
+        self.metrics = EngineMetrics()
+
+        self._lock = threading.Lock()
+        self._event_loop = None
+        self._pid = None
+        self._client = None
+        self._semaphore = None
+        self._next_slot = 0.0
+
+    def complete(self, messages: List[Dict], **params) -> str:
+        """Run one chat completion and return the reply text, blocking the calling thread"""
+        return self.submit(messages, **params).result()
+
+    def complete_many(self, requests: List[List[Dict]], **params) -> List:
+        """Run several chat completions concurrently; each entry is the reply text or the exception raised"""
+        futures = [self.submit(messages, **params) for messages in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def submit(self, messages: List[Dict], **params) -> Future:
+        """Schedule a chat completion on the engine's loop"""
+        return asyncio.run_coroutine_threadsafe(self.acomplete(messages, **params), self._loop())
+
+    async def acomplete(self, messages: List[Dict], **params) -> str:
+        """Chat completion with the engine's concurrency limit, pacing, timeout and retries"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            self.metrics.update(calls=1, in_flight=1)
+            try:
+                for attempt in range(self.max_retries + 1):
+                    await self._pace()
+                    start = time.monotonic()
+                    try:
+                        response = await self._async_client().chat.completions.create(
+                            messages=messages, timeout=self.timeout, **params
+                        )
+                        self.metrics.update(succeeded=1, latency_seconds=time.monotonic() - start)
+                        return response.choices[0].message.content
+
+                    except RETRYABLE_ERRORS as e:
+                        if isinstance(e, openai.RateLimitError):
+                            self.metrics.update(rate_limited=1)
+                        elif isinstance(e, openai.APITimeoutError):
+                            self.metrics.update(timeouts=1)
+                        if attempt == self.max_retries:
+                            raise
+
+                        # Keep the slot while backing off, so a throttled account sees less pressure
+                        delay = max(backoff_delay(attempt), self._retry_after(e))
+                        self.metrics.update(retries=1)
+                        logger.warning(f"OpenAI call failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+
+            except Exception:
+                self.metrics.update(failed=1)
+                raise
+            finally:
+                self.metrics.update(in_flight=-1)
+
+    async def _pace(self):
+        """Space requests evenly when a requests-per-minute limit is configured"""
+        if not self.requests_per_minute:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 60.0 / self.requests_per_minute
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> float:
+        response = getattr(error, 'response', None)
+        try:
+            return min(60.0, float(response.headers.get('retry-after', 0))) if response is not None else 0.0
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _async_client(self) -> openai.AsyncOpenAI:
+        # Created on the loop thread, where its connection pool lives; retries are handled here
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(api_key=self.api_key or os.environ.get('OPENAI_API_KEY'),
+                                              timeout=self.timeout, max_retries=0)
+        return self._client
+
+    def _loop(self) -> asyncio.AbstractEventLoop:
+        """The engine's event loop, started on first use and again in a forked child"""
+        with self._lock:
+            if self._event_loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='classification-engine', daemon=True).start()
+                self._event_loop = loop
+                self._pid = os.getpid()
+                self._client = None
+                self._semaphore = None
+            return self._event_loop
+
+    def snapshot(self) -> Dict:
+        metrics = self.metrics.snapshot()
+        metrics.update(concurrency=self.concurrency, timeout_seconds=self.timeout, max_retries=self.max_retries,
+                       requests_per_minute=self.requests_per_minute or None)
+        return metrics
+
+
+# Shared by every classifier in this process, so the concurrency limit is process-wide
+classification_engine = ClassificationEngine()
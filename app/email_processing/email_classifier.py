@@ -1,17 +1,96 @@
 # app/email_processing/email_classifier.py - FIXED VERSION
 import os
 import json
+import hashlib
 import logging
 from typing import Dict, List
-import openai
+from .classification_engine import ClassificationEngine, classification_engine
+from .classification_cache import ClassificationCache, classification_cache
+from .local_classifier import LocalClassifier, local_classifier
+from .rule_engine import RuleEngine, rule_engine
+from .urgency_scanner import urgency_scanner
 
 logger = logging.getLogger(__name__)
 
 class EmailClassifier:
     """Handles AI-powered email classification and information extraction"""
     
-    def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+    # Urgency score at which the AI classification is overridden to Critical
+    URGENCY_OVERRIDE_SCORE = 0.8
+    
+    # Category and priority definitions shared by the single and batch prompts
+    CLASSIFICATION_GUIDE = """**CATEGORIES:**
+1. **Critical Alerts** - Emergency situations requiring immediate attention (fire, flood, break-ins, water leaks, safety issues)
+2. **New Leads** - Potential clients, property inquiries, people wanting to buy/sell/rent
+3. **Maintenance Requests** - Property maintenance, repairs, broken items, tenant complaints about property issues
+4. **Offers & Contracts** - Purchase offers, contracts, legal documents, escrow matters
+5. **Tenant Communications** - Communications with current tenants (rent payments, lease issues, move-in/out)
+6. **Vendor Communications** - Contractors, suppliers, service providers, invoices, estimates
+7. **Legal & Compliance** - Legal matters, attorney communications, compliance issues, violations
+8. **Marketing & Listings** - Property marketing, MLS listings, photos, open houses
+9. **Financial** - Commission payments, accounting, invoices, financial transactions
+10. **General** - Everything else that doesn't fit the above categories
+
+**PRIORITY LEVELS:**
+- Critical: Emergency situations, urgent deadlines, critical business matters
+- High: New leads, important deadlines, maintenance issues, legal matters
+- Medium: Regular business communications, vendor correspondence
+- Low: General information, marketing materials, newsletters"""
+    
+    CLASSIFICATION_INSTRUCTIONS = """**INSTRUCTIONS:**
+- Use EXACT category names from the list above
+- Choose the MOST SPECIFIC category that fits
+- Water leaks, broken pipes, fires, floods = "Critical Alerts" with "Critical" priority
+- Property inquiries from potential clients = "New Leads" with "High" priority  
+- Repair requests, broken appliances, maintenance = "Maintenance Requests" with "High" priority
+- Current tenant issues (rent, lease questions) = "Tenant Communications" with "Medium" priority
+- Contractor estimates, vendor invoices = "Vendor Communications" with "Medium" priority
+- Extract contact info, property addresses, phone numbers, action items
+- Be concise but informative in summary"""
+    
+    RESULT_FORMAT = """{
+    "category": "EXACT category name",
+    "sub_category": "More specific classification if applicable",
+    "priority": "Critical/High/Medium/Low",
+    "summary": "Brief 1-2 sentence summary of the email",
+    "extracted_info": {
+        "contact_name": "Name if mentioned",
+        "contact_phone": "Phone number if mentioned", 
+        "contact_email": "Email if different from sender",
+        "property_address": "Address if mentioned",
+        "urgency_level": "Description of urgency if applicable",
+        "action_required": "What action is needed if any"
+    },
+    "requires_action": true/false,
+    "confidence_score": 0.0-1.0,
+    "tags": ["relevant", "keywords", "extracted"]
+}"""
+    
+    MODEL = "gpt-4-turbo-preview"
+    SYSTEM_PROMPT = "You are a professional email classification assistant for real estate professionals. Always respond with valid JSON. Pay special attention to emergency and critical situations."
+    
+    # Batch classification: emails per prompt, estimated prompt tokens per batch, reply tokens per email
+    BATCH_SIZE = int(os.environ.get('CLASSIFY_BATCH_SIZE', 10))
+    BATCH_TOKEN_BUDGET = int(os.environ.get('CLASSIFY_BATCH_TOKENS', 8000))
+    PROMPT_OVERHEAD_TOKENS = 900
+    RESULT_TOKENS = 350
+    MAX_OUTPUT_TOKENS = 4096
+    
+    def __init__(self, engine: ClassificationEngine = None, cache: ClassificationCache = None,
+                 local_model: LocalClassifier = None, rules: RuleEngine = None):
+        # Shared async engine: bounded concurrency, timeouts and retries across all classifiers
+        self.engine = engine or classification_engine
+        # Repeated automated mail reuses earlier results made with the same prompt and model
+        self.cache = cache or classification_cache
+        self.prompt_version = hashlib.sha256(
+            (self.SYSTEM_PROMPT + self._build_classification_prompt('') + self._build_batch_prompt([''])).encode('utf-8')
+        ).hexdigest()[:12]
+        # Trained on earlier results; answers confident non-critical cases without an API call
+        self.local_model = local_model or local_classifier
+        # Sender and domain rules from EmailCategories, checked before anything else
+        self.rules = rules or rule_engine
+        # Weighted urgency keywords, shared with the ingestion priority ranking
+        self.urgency_scanner = urgency_scanner
     
     def classify_email(self, email_data: Dict) -> Dict:
         """Use AI to classify and extract information from email with improved critical detection"""
@@ -43,45 +122,197 @@ class EmailClassifier:
             'tags': ['sent', 'outbound']
         }
     
-    def _classify_received_email(self, email_data: Dict) -> Dict:
-        """Full AI classification for received emails"""
-        # Calculate urgency score first
-        subject = email_data.get('subject', '')
-        body = email_data.get('body_cleaned', '')
-        urgency_score = self._calculate_urgency_score(subject, body)
+    def classify_emails(self, email_list: List[Dict]) -> List[Dict]:
+        """Classify several emails, packing received ones into shared batch prompts
         
-        # Check for attachments
-        attachments = email_data.get('attachments', [])
-        attachment_info = ""
-        if attachments:
-            attachment_info = f"\nAttachments: {len(attachments)} files - {', '.join([att['filename'] for att in attachments])}"
+        Received emails are grouped into batches of at most BATCH_SIZE emails and
+        BATCH_TOKEN_BUDGET estimated prompt tokens, and the batches run side by side
+        on the engine. A batch whose reply cannot be parsed is split in half and sent
+        again; an email whose result is missing or malformed is classified on its own.
+        """
+        results = [None] * len(email_list)
+        contents = {}
+        for index, email_data in enumerate(email_list):
+            if email_data.get('is_sent', False):
+                results[index] = self._classify_sent_email(email_data)
+            else:
+                contents[index] = self._email_content(email_data)
         
-        # Prepare content for AI
-        content = f"""
-Subject: {subject}
-From: {email_data.get('sender_name', '')} <{email_data.get('sender_email', '')}>
-Body: {body[:2000]}{attachment_info}
-"""
+        needs_api = []
+        for index, content in contents.items():
+            classification = self._without_api(email_list[index], content)
+            if classification is None:
+                needs_api.append(index)
+            else:
+                results[index] = self._finish_classification(email_list[index], classification)
+        
+        singles = []
+        pending = self._pack_batches(needs_api, contents)
+        while pending:
+            replies = self.engine.complete_many(
+                [self._messages(self._build_batch_prompt([contents[index] for index in batch])) for batch in pending],
+                model=self.MODEL,
+                temperature=0.1,
+                max_tokens=min(self.MAX_OUTPUT_TOKENS, self.RESULT_TOKENS * self.BATCH_SIZE)
+            )
+            
+            retry = []
+            for batch, reply in zip(pending, replies):
+                if isinstance(reply, Exception):
+                    # The engine already retried; splitting would only add load to a failing API
+                    logger.error(f"AI batch classification error: {reply}")
+                    for index in batch:
+                        results[index] = self._get_fallback_classification()
+                    continue
+                
+                parsed = self._parse_batch_response(reply)
+                if parsed is None:
+                    if len(batch) > 1:
+                        logger.warning(f"Unparseable batch reply for {len(batch)} emails, splitting")
+                        middle = len(batch) // 2
+                        retry.extend([batch[:middle], batch[middle:]])
+                    else:
+                        singles.append(batch[0])
+                    continue
+                
+                for number, index in enumerate(batch, 1):
+                    classification = parsed.get(str(number))
+                    if isinstance(classification, dict) and classification.get('category') and classification.get('priority'):
+                        classification.pop('id', None)
+                        self._remember(contents[index], classification)
+                        results[index] = self._finish_classification(email_list[index], classification)
+                    else:
+                        singles.append(index)
+            pending = retry
+        
+        if singles:
+            logger.info(f"Re-running {len(singles)} emails without a usable batch result one at a time")
+            replies = self.engine.complete_many(
+                [self._messages(self._build_classification_prompt(contents[index])) for index in singles],
+                model=self.MODEL,
+                temperature=0.1,
+                max_tokens=1000
+            )
+            for index, reply in zip(singles, replies):
+                try:
+                    if isinstance(reply, Exception):
+                        raise reply
+                    classification = self._parse_ai_response(reply)
+                    self._remember(contents[index], classification)
+                    results[index] = self._finish_classification(email_list[index], classification)
+                except Exception as e:
+                    logger.error(f"AI classification error: {e}")
+                    results[index] = self._get_fallback_classification()
+        
+        return results
+    
+    def _pack_batches(self, indexes: List[int], contents: Dict[int, str]) -> List[List[int]]:
+        """Group emails in order into batches that fit BATCH_SIZE and BATCH_TOKEN_BUDGET"""
+        batches = []
+        batch, tokens = [], self.PROMPT_OVERHEAD_TOKENS
+        for index in indexes:
+            email_tokens = len(contents[index]) // 4 + 1
+            if batch and (len(batch) >= self.BATCH_SIZE or tokens + email_tokens > self.BATCH_TOKEN_BUDGET):
+                batches.append(batch)
+                batch, tokens = [], self.PROMPT_OVERHEAD_TOKENS
+            batch.append(index)
+            tokens += email_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _parse_batch_response(self, ai_response: str):
+        """Map email id to result object from a batch reply, or None when the reply is not a JSON array"""
+        try:
+            data = self._parse_ai_response(ai_response)
+        except ValueError:
+            return None
+        if isinstance(data, dict):
+            data = data.get('results', data.get('emails'))
+        if not isinstance(data, list):
+            return None
+        return {str(item.get('id')): item for item in data if isinstance(item, dict)}
+    
+    def _classify_received_email(self, email_data: Dict) -> Dict:
+        """Full AI classification for received emails"""
+        content = self._email_content(email_data)
+        classification = self._without_api(email_data, content)
+        if classification is not None:
+            return self._finish_classification(email_data, classification)
         
         # Enhanced AI prompt with better critical detection
         prompt = self._build_classification_prompt(content)
         
         # Call OpenAI API
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": "You are a professional email classification assistant for real estate professionals. Always respond with valid JSON. Pay special attention to emergency and critical situations."},
-                {"role": "user", "content": prompt}
-            ],
+        response_text = self.engine.complete(
+            model=self.MODEL,
+            messages=self._messages(prompt),
             temperature=0.1,
             max_tokens=1000
         )
         
         # Parse AI response
-        classification = self._parse_ai_response(response.choices[0].message.content)
+        classification = self._parse_ai_response(response_text)
+        self._remember(content, classification)
+        return self._finish_classification(email_data, classification)
+    
+    def _without_api(self, email_data: Dict, content: str):
+        """Classification from sender rules, the cache or the local model, or None when the API is needed"""
+        classification = self.rules.classify(email_data)
+        if classification is None:
+            classification = self._cached(content)
+        if classification is None:
+            classification = self._local_classification(email_data)
+        return classification
+    
+    def _cached(self, content: str):
+        """Labels of an earlier AI result for the same content, prompt version and model, if cached
+
+        A hit carries no summary or extracted details, which belong to the
+        email the AI actually read, so the default summary applies.
+        """
+        return self.cache.get(self.cache.content_hash(content), self.prompt_version, self.MODEL)
+    
+    def _local_classification(self, email_data: Dict):
+        """Local model's answer when it is confident enough to skip the API call"""
+        self.local_model.maybe_refresh()
+        return self.local_model.classify(email_data)
+    
+    def _remember(self, content: str, classification: Dict):
+        # Stored before post-processing, which runs again for every email served from the cache;
+        # the cache keeps only the labels
+        self.cache.put(self.cache.content_hash(content), self.prompt_version, self.MODEL, classification)
+    
+    def _email_content(self, email_data: Dict) -> str:
+        """Subject, sender, body and attachment names of one email, as the prompts present it"""
+        # Check for attachments
+        attachments = email_data.get('attachments', [])
+        attachment_info = ""
+        if attachments:
+            attachment_info = f"\nAttachments: {len(attachments)} files - {', '.join([att['filename'] for att in attachments])}"
+        
+        return f"""
+Subject: {email_data.get('subject', '')}
+From: {email_data.get('sender_name', '')} <{email_data.get('sender_email', '')}>
+Body: {email_data.get('body_cleaned', '')[:2000]}{attachment_info}
+"""
+    
+    def _messages(self, prompt: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _finish_classification(self, email_data: Dict, classification: Dict) -> Dict:
+        """Apply the urgency override, attachment details and defaults to a parsed AI result"""
+        subject = email_data.get('subject', '')
+        body = email_data.get('body_cleaned', '')
+        urgency_hits = self.urgency_scanner.scan(f"{subject} {body}")
+        urgency_score = max((hit.weight for hit in urgency_hits), default=0.0)
+        attachments = email_data.get('attachments', [])
         
         # Post-process: Override AI if urgency score is very high
-        if urgency_score >= 0.8:
+        if urgency_score >= self.URGENCY_OVERRIDE_SCORE:
             classification = self._apply_urgency_override(classification, urgency_score, body)
         
         # Add attachment info to extracted info
@@ -95,7 +326,7 @@ Body: {body[:2000]}{attachment_info}
         if urgency_score > 0:
             extracted_info = classification.get('extracted_info', {})
             if 'urgency_indicators' not in extracted_info:
-                extracted_info['urgency_indicators'] = []
+                extracted_info['urgency_indicators'] = sorted({hit.keyword for hit in urgency_hits})
             classification['extracted_info'] = extracted_info
         
         # Validate and set defaults
@@ -104,39 +335,6 @@ Body: {body[:2000]}{attachment_info}
         logger.info(f"Email classified: {classification['category']} - {classification['priority']} (urgency: {urgency_score})")
         return classification
     
-    def _calculate_urgency_score(self, subject: str, body: str) -> float:
-        """Calculate urgency score based on critical keywords"""
-        critical_keywords = {
-            'emergency': 1.0,
-            'urgent': 0.9,
-            'immediate': 0.9,
-            'asap': 0.8,
-            'critical': 0.9,
-            'fire': 1.0,
-            'flood': 1.0,
-            'water leak': 0.9,
-            'leak': 0.8,
-            'broken pipe': 0.9,
-            'no heat': 0.8,
-            'no electricity': 0.9,
-            'break in': 1.0,
-            'broken': 0.6,
-            'not working': 0.5,
-            'health and safety': 0.9,
-            'injuries': 0.8,
-            'damage': 0.7
-        }
-        
-        combined_text = f"{subject} {body}".lower()
-        max_score = 0.0
-        
-        for keyword, score in critical_keywords.items():
-            if keyword in combined_text:
-                max_score = max(max_score, score)
-                logger.info(f"Found critical keyword '{keyword}' with score {score}")
-        
-        return max_score
-    
     def _build_classification_prompt(self, content: str) -> str:
         """Build the AI classification prompt - FIXED COMPLETE VERSION"""
         return f"""
@@ -144,56 +342,36 @@ You are an AI assistant helping a California real estate agent and property mana
 
 Classify this email into one of these EXACT categories:
 
-**CATEGORIES:**
-1. **Critical Alerts** - Emergency situations requiring immediate attention (fire, flood, break-ins, water leaks, safety issues)
-2. **New Leads** - Potential clients, property inquiries, people wanting to buy/sell/rent
-3. **Maintenance Requests** - Property maintenance, repairs, broken items, tenant complaints about property issues
-4. **Offers & Contracts** - Purchase offers, contracts, legal documents, escrow matters
-5. **Tenant Communications** - Communications with current tenants (rent payments, lease issues, move-in/out)
-6. **Vendor Communications** - Contractors, suppliers, service providers, invoices, estimates
-7. **Legal & Compliance** - Legal matters, attorney communications, compliance issues, violations
-8. **Marketing & Listings** - Property marketing, MLS listings, photos, open houses
-9. **Financial** - Commission payments, accounting, invoices, financial transactions
-10. **General** - Everything else that doesn't fit the above categories
-
-**PRIORITY LEVELS:**
-- Critical: Emergency situations, urgent deadlines, critical business matters
-- High: New leads, important deadlines, maintenance issues, legal matters
-- Medium: Regular business communications, vendor correspondence
-- Low: General information, marketing materials, newsletters
+{self.CLASSIFICATION_GUIDE}
 
 **EMAIL TO CLASSIFY:**
 {content}
 
-**INSTRUCTIONS:**
-- Use EXACT category names from the list above
-- Choose the MOST SPECIFIC category that fits
-- Water leaks, broken pipes, fires, floods = "Critical Alerts" with "Critical" priority
-- Property inquiries from potential clients = "New Leads" with "High" priority  
-- Repair requests, broken appliances, maintenance = "Maintenance Requests" with "High" priority
-- Current tenant issues (rent, lease questions) = "Tenant Communications" with "Medium" priority
-- Contractor estimates, vendor invoices = "Vendor Communications" with "Medium" priority
-- Extract contact info, property addresses, phone numbers, action items
-- Be concise but informative in summary
+{self.CLASSIFICATION_INSTRUCTIONS}
 
 Respond with ONLY valid JSON in this format:
-{{
-    "category": "EXACT category name",
-    "sub_category": "More specific classification if applicable",
-    "priority": "Critical/High/Medium/Low",
-    "summary": "Brief 1-2 sentence summary of the email",
-    "extracted_info": {{
-        "contact_name": "Name if mentioned",
-        "contact_phone": "Phone number if mentioned", 
-        "contact_email": "Email if different from sender",
-        "property_address": "Address if mentioned",
-        "urgency_level": "Description of urgency if applicable",
-        "action_required": "What action is needed if any"
-    }},
-    "requires_action": true/false,
-    "confidence_score": 0.0-1.0,
-    "tags": ["relevant", "keywords", "extracted"]
-}}
+{self.RESULT_FORMAT}
+"""
+    
+    def _build_batch_prompt(self, contents: List[str]) -> str:
+        """Build one prompt classifying several emails, each tagged with its position as id"""
+        emails = '\n'.join(f'<email id="{number}">{content}</email>' for number, content in enumerate(contents, 1))
+        result_format = self.RESULT_FORMAT.replace('{\n', '{\n    "id": "the email id",\n', 1)
+        return f"""
+You are an AI assistant helping a California real estate agent and property manager organize emails.
+
+Classify each of the {len(contents)} emails below into one of these EXACT categories:
+
+{self.CLASSIFICATION_GUIDE}
+
+**EMAILS TO CLASSIFY:**
+{emails}
+
+{self.CLASSIFICATION_INSTRUCTIONS}
+- Classify every email on its own and return exactly one result per email id
+
+Respond with ONLY a valid JSON array with one object per email, each in this format:
+{result_format}
 """
     
     def _parse_ai_response(self, ai_response: str) -> Dict:
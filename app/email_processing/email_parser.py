@@ -2,6 +2,7 @@
 import base64
 import re
 import logging
+import threading
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import html2text
@@ -14,9 +15,18 @@ class EmailParser:
 
     def __init__(self, attachment_handler: AttachmentHandler):
         self.attachment_handler = attachment_handler
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_links = True
-        self.html_converter.ignore_images = True
+        self._local = threading.local()
+
+    @property
+    def html_converter(self) -> html2text.HTML2Text:
+        """HTML2Text keeps state between calls, so each parsing thread gets its own"""
+        converter = getattr(self._local, 'html_converter', None)
+        if converter is None:
+            converter = html2text.HTML2Text()
+            converter.ignore_links = True
+            converter.ignore_images = True
+            self._local.html_converter = converter
+        return converter
 
     def parse_gmail_message(self, message: Dict, gmail_client, is_sent: bool = False) -> Optional[Dict]:
         """Parse Gmail message with improved attachment handling"""
@@ -37,9 +47,12 @@ class EmailParser:
             attachments = []
 
             if 'parts' in message['payload']:
-                # Pass sender_email for attachment organization
-                body_html, body_text, attachments = self._process_message_parts(
-                    message['payload']['parts'], message['id'], sender_email, gmail_client
+                body_html, body_text, attachment_parts = self._process_message_parts(
+                    message['payload']['parts']
+                )
+                # Download all attachments of the message together (sender_email organizes storage)
+                attachments = self.attachment_handler.process_attachment_parts(
+                    attachment_parts, message['id'], sender_email, gmail_client
                 )
             else:
                 # Single part message - check for both text content AND attachments
@@ -111,12 +124,11 @@ class EmailParser:
             logger.error(f"Error parsing message: {e}")
             return None
 
-    def _process_message_parts(self, parts: List[Dict], message_id: str,
-                             sender_email: str, gmail_client) -> Tuple[str, str, List[Dict]]:
-        """Process message parts to extract text and attachments with sender context"""
+    def _process_message_parts(self, parts: List[Dict]) -> Tuple[str, str, List[Dict]]:
+        """Process message parts to extract text and collect attachment parts"""
         body_html = ''
         body_text = ''
-        attachments = []
+        attachment_parts = []
 
         for part in parts:
             mime_type = part.get('mimeType', '')
@@ -124,12 +136,10 @@ class EmailParser:
 
             # Handle nested parts (multipart messages)
             if 'parts' in part:
-                sub_html, sub_text, sub_attachments = self._process_message_parts(
-                    part['parts'], message_id, sender_email, gmail_client
-                )
+                sub_html, sub_text, sub_attachment_parts = self._process_message_parts(part['parts'])
                 body_html += sub_html
                 body_text += sub_text
-                attachments.extend(sub_attachments)
+                attachment_parts.extend(sub_attachment_parts)
                 continue
 
             # Handle text content
@@ -142,15 +152,11 @@ class EmailParser:
                 if data:
                     body_text += base64.urlsafe_b64decode(data).decode('utf-8')
 
-            # Handle attachments with sender context
+            # Collect attachments so they can be downloaded together
             elif filename or part['body'].get('attachmentId'):
-                attachment_info = self.attachment_handler.process_attachment_part(
-                    part, message_id, sender_email, gmail_client
-                )
-                if attachment_info:
-                    attachments.append(attachment_info)
+                attachment_parts.append(part)
 
-        return body_html, body_text, attachments
+        return body_html, body_text, attachment_parts
 
     def _clean_email_body(self, body: str) -> str:
         """Clean email body for processing"""
@@ -0,0 +1,150 @@
+# app/email_processing/email_writer.py
+import json
+import logging
+from typing import Dict, List, Tuple
+
+from ..database_models import db, Email, ClassifiedEmail
+
+logger = logging.getLogger(__name__)
+
+class BatchEmailWriter:
+    """Saves parsed and classified emails in batches, one transaction per batch
+
+    Emails and classifications go in with one multi-row INSERT each, property
+    links and maintenance requests join the same transaction, and the batch is
+    committed once. If the batch fails it is split in half and retried until
+    the bad rows are isolated, so one bad email never costs the others.
+    """
+
+    def __init__(self, property_manager, known_messages):
+        self.property_manager = property_manager
+        self.known_messages = known_messages
+
+    def write_batch(self, items: List[Tuple[Dict, Dict]]) -> List:
+        """Save (email_data, classification) pairs
+
+        Returns one entry per pair: True if saved, False if already stored,
+        or the exception that stopped it from being saved.
+        """
+        results = [False] * len(items)
+
+        # One IN query finds everything already stored; repeats inside the batch count as stored too
+        message_ids = [email_data['message_id'] for email_data, _ in items]
+        stored = {row.message_id for row in
+                  db.session.query(Email.message_id).filter(Email.message_id.in_(message_ids)).all()}
+        if stored:
+            logger.info(f"{len(stored)} emails in batch already exist")
+            self.known_messages.mark_known(stored)
+
+        pending = []
+        for index, message_id in enumerate(message_ids):
+            if message_id not in stored:
+                stored.add(message_id)
+                pending.append(index)
+
+        if pending:
+            self._write(items, pending, results)
+        return results
+
+    def _write(self, items: List[Tuple[Dict, Dict]], indexes: List[int], results: List,
+               link_properties: bool = True):
+        """Insert and commit the given rows, bisecting on failure"""
+        try:
+            self._insert(items, indexes, link_properties)
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            if len(indexes) > 1:
+                middle = len(indexes) // 2
+                self._write(items, indexes[:middle], results, link_properties)
+                self._write(items, indexes[middle:], results, link_properties)
+            elif link_properties:
+                # Property linking is best effort, as it was when each email committed on its own
+                logger.warning(f"Retrying {items[indexes[0]][0]['message_id']} without property link: {e}")
+                self._write(items, indexes, results, link_properties=False)
+            else:
+                logger.error(f"Database save error: {e}")
+                results[indexes[0]] = e
+            return
+
+        # Read from the inputs, committed rows are expired and would reload one by one
+        self.known_messages.mark_known(items[index][0]['message_id'] for index in indexes)
+        for index in indexes:
+            results[index] = True
+            email_data, classification = items[index]
+            logger.debug(f"Saved {'sent' if email_data.get('is_sent') else 'received'} email: "
+                         f"{email_data.get('subject')} -> {classification['category']} ({classification['priority']})")
+        logger.info(f"Saved batch of {len(indexes)} emails")
+
+    def _insert(self, items: List[Tuple[Dict, Dict]], indexes: List[int], link_properties: bool) -> List[Email]:
+        """Stage the rows for the given items in the current transaction"""
+        emails = [self._build_email(items[index][0]) for index in indexes]
+        db.session.add_all(emails)
+        db.session.flush()
+
+        classified_rows = [
+            self._build_classification(email, items[index][0], items[index][1])
+            for email, index in zip(emails, indexes)
+        ]
+        db.session.add_all(classified_rows)
+        db.session.flush()
+
+        if link_properties:
+            # Property lookups would otherwise flush each maintenance request on its own
+            with db.session.no_autoflush:
+                for email, classified, index in zip(emails, classified_rows, indexes):
+                    self.property_manager.link_email_to_property(
+                        email.id, items[index][1], commit=False, email=email, classified=classified
+                    )
+            db.session.flush()
+
+        return emails
+
+    @staticmethod
+    def _build_email(email_data: Dict) -> Email:
+        email_record = Email(
+            message_id=email_data['message_id'],
+            thread_id=email_data.get('thread_id'),
+            received_at=email_data['received_at'],
+            sender_name=email_data.get('sender_name'),
+            sender_email=email_data['sender_email'],
+            recipient_name=email_data.get('recipient_name'),
+            recipient_email=email_data.get('recipient_email'),
+            is_sent=email_data.get('is_sent', False),
+            subject=email_data.get('subject'),
+            body_raw=email_data.get('body_raw'),
+            body_cleaned=email_data.get('body_cleaned'),
+            labels=json.dumps(email_data.get('labels', []))
+        )
+
+        # Save attachments info
+        attachments = email_data.get('attachments', [])
+        if attachments:
+            email_record.set_attachments(attachments)
+        return email_record
+
+    @staticmethod
+    def _build_classification(email_record: Email, email_data: Dict, classification: Dict) -> ClassifiedEmail:
+        extracted_info = dict(classification.get('extracted_info', {}))
+        attachments = email_data.get('attachments', [])
+        if attachments:
+            extracted_info['attachment_count'] = len(attachments)
+            extracted_info['attachment_types'] = [att.get('mime_type') for att in attachments]
+
+        return ClassifiedEmail(
+            email_id=email_record.id,
+            category=classification['category'],
+            sub_category=classification.get('sub_category'),
+            priority=classification['priority'],
+            confidence_score=classification.get('confidence_score'),
+            summary=classification.get('summary'),
+            extracted_info=json.dumps(extracted_info),
+            tags=json.dumps(classification.get('tags', [])),
+            property_address=extracted_info.get('property_address'),
+            property_type=extracted_info.get('property_type'),
+            contact_name=extracted_info.get('contact_name'),
+            contact_phone=extracted_info.get('contact_phone'),
+            contact_email=extracted_info.get('contact_email'),
+            requires_action=classification.get('requires_action', False)
+        )
@@ -1,15 +1,35 @@
 # app/email_processing/gmail_client.py
 import os
+import json
+import time
+import base64
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple, Callable
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from .gmail_fetcher import GmailFetcher, QUOTA_UNITS, backoff_delay, is_retryable_error
 
 logger = logging.getLogger(__name__)
 
+# Takes a page of listed message IDs and returns the ones to fetch
+IdFilter = Optional[Callable[[List[str]], List[str]]]
+
+# Takes a format='metadata' message and returns whether to fetch the full payload
+MetadataFilter = Optional[Callable[[Dict], bool]]
+
+
+class HistoryExpiredError(Exception):
+    """Raised when a stored historyId is too old for users.history.list"""
+
 class GmailClient:
     """Handles Gmail API authentication and email fetching"""
 
@@ -18,14 +38,37 @@ class GmailClient:
         'https://www.googleapis.com/auth/gmail.send'
     ]
 
-    def __init__(self):
-        self.service = None
+    # Gmail accepts up to 100 calls per batch request but recommends 50,
+    # larger batches are more likely to trip the per-user rate limit
+    BATCH_SIZE = 50
+    MAX_BATCH_SIZE = 100
+    MAX_BATCH_RETRIES = 5
+
+    # messages.list returns at most 500 IDs per page
+    LIST_PAGE_SIZE = 500
+
+    def __init__(self, service=None, max_buffered_messages: int = None, fetcher: GmailFetcher = None):
+        self.service = service
+        self.credentials = None
+        # Runs batches and attachment downloads concurrently under the shared quota
+        self.fetcher = fetcher or GmailFetcher()
+        # Upper bound on full message payloads held in memory while streaming
+        self.max_buffered_messages = max_buffered_messages or int(
+            os.environ.get('GMAIL_MAX_BUFFERED_MESSAGES', self.BATCH_SIZE * self.fetcher.max_workers)
+        )
+        # httplib2 connections are not thread-safe, so each thread gets its own
+        self._local = threading.local()
 
     # Replace the authenticate method in your app/email_processing/gmail_client.py
 
     def authenticate(self) -> bool:
         """Authenticate with Gmail API - Web-friendly version"""
         try:
+            # A local stand-in such as tests/fake_gmail_service.py needs no credentials
+            root_url = os.environ.get('GMAIL_API_ROOT_URL')
+            if root_url:
+                return self._connect_offline(root_url)
+
             creds = None
             token_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
                                     'credentials', 'token.json')
@@ -58,6 +101,7 @@ class GmailClient:
                     return False
 
             # Build service with valid credentials
+            self.credentials = creds
             self.service = build('gmail', 'v1', credentials=creds)
             logger.info("Gmail authentication successful")
             return True
@@ -66,44 +110,24 @@ class GmailClient:
             logger.error(f"Gmail authentication error: {e}")
             return False
 
+    def _connect_offline(self, root_url: str) -> bool:
+        """Build an unauthenticated service against a Gmail-compatible endpoint"""
+        document = json.loads(get_static_doc('gmail', 'v1'))
+        document['rootUrl'] = root_url.rstrip('/') + '/'
+        self.service = build_from_document(document, http=httplib2.Http())
+        logger.info(f"Gmail client using offline endpoint {root_url}")
+        return True
+
     def get_recent_emails(self, hours_back: int = 24, max_results: int = 100, include_sent: bool = False) -> List[Dict]:
         """Fetch recent emails from Gmail"""
         try:
             if not self.service and not self.authenticate():
                 raise Exception("Gmail authentication failed")
 
-            # Calculate date range
-            after_date = datetime.now() - timedelta(hours=hours_back)
-
-            # Build query
-            if include_sent:
-                query = f'after:{after_date.strftime("%Y/%m/%d")}'
-            else:
-                query = f'after:{after_date.strftime("%Y/%m/%d")} -in:sent'
-
-            # Get message list
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=max_results
-            ).execute()
-
-            messages = results.get('messages', [])
-            email_messages = []
-
-            for message in messages:
-                try:
-                    # Get full message
-                    msg = self.service.users().messages().get(
-                        userId='me',
-                        id=message['id'],
-                        format='full'
-                    ).execute()
-                    email_messages.append(msg)
-
-                except Exception as e:
-                    logger.error(f"Error fetching message {message['id']}: {e}")
-                    continue
+            # List message IDs page by page, then fetch full payloads in batches
+            query = self._received_query(hours_back, include_sent)
+            message_ids = self.iter_message_ids(query, max_results=max_results)
+            email_messages = list(self.fetch_messages(message_ids))
 
             logger.info(f"Retrieved {len(email_messages)} emails")
             return email_messages
@@ -118,32 +142,10 @@ class GmailClient:
             if not self.service and not self.authenticate():
                 raise Exception("Gmail authentication failed")
 
-            # Calculate date range
-            after_date = datetime.now() - timedelta(hours=hours_back)
-            query = f'after:{after_date.strftime("%Y/%m/%d")} in:sent'
-
-            # Get message list
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=max_results
-            ).execute()
-
-            messages = results.get('messages', [])
-            email_messages = []
-
-            for message in messages:
-                try:
-                    msg = self.service.users().messages().get(
-                        userId='me',
-                        id=message['id'],
-                        format='full'
-                    ).execute()
-                    email_messages.append(msg)
-
-                except Exception as e:
-                    logger.error(f"Error fetching sent message {message['id']}: {e}")
-                    continue
+            # List message IDs page by page, then fetch full payloads in batches
+            query = f'{self._after_query(hours_back)} in:sent'
+            message_ids = self.iter_message_ids(query, max_results=max_results)
+            email_messages = list(self.fetch_messages(message_ids))
 
             logger.info(f"Retrieved {len(email_messages)} sent emails")
             return email_messages
@@ -152,16 +154,293 @@ class GmailClient:
             logger.error(f"Error fetching sent emails: {e}")
             return []
 
+    def stream_recent_emails(self, hours_back: int = 24, include_sent: bool = False,
+                             id_filter: IdFilter = None, metadata_filter: MetadataFilter = None,
+                             metadata_headers: Optional[List[str]] = None,
+                             failed_ids: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every recent email lazily, following all result pages"""
+        yield from self.iter_messages(
+            self._received_query(hours_back, include_sent), id_filter=id_filter,
+            metadata_filter=metadata_filter, metadata_headers=metadata_headers, failed_ids=failed_ids
+        )
+
+    def stream_sent_emails(self, hours_back: int = 24, id_filter: IdFilter = None,
+                           failed_ids: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every recent sent email lazily, following all result pages"""
+        yield from self.iter_messages(f'{self._after_query(hours_back)} in:sent', id_filter=id_filter,
+                                      failed_ids=failed_ids)
+
+    def stream_window(self, start: datetime, end: datetime, sent: bool = False,
+                      id_filter: IdFilter = None, metadata_filter: MetadataFilter = None,
+                      metadata_headers: Optional[List[str]] = None,
+                      failed_ids: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield received (or sent) emails that arrived between start and end"""
+        query = f'after:{int(start.timestamp()) - 1} before:{int(end.timestamp())} ' \
+                f'{"in:sent" if sent else "-in:sent"}'
+        yield from self.iter_messages(
+            query, id_filter=id_filter, metadata_filter=metadata_filter, metadata_headers=metadata_headers,
+            failed_ids=failed_ids
+        )
+
+    def iter_messages(self, query: str, format: str = 'full', max_buffered: int = None,
+                      id_filter: IdFilter = None, metadata_filter: MetadataFilter = None,
+                      metadata_headers: Optional[List[str]] = None,
+                      failed_ids: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield messages matching a query, keeping at most max_buffered payloads in memory
+
+        id_filter receives each page of listed IDs and returns the ones worth
+        fetching, so already-stored messages are never downloaded. When
+        metadata_filter is given, survivors first go through a cheap
+        format='metadata' pass and only accepted messages are fetched in full.
+        IDs that could not be fetched in either pass are appended to failed_ids.
+        """
+        # Every worker may hold one batch, so size batches to respect the memory ceiling
+        max_buffered = max_buffered or self.max_buffered_messages
+        batch_size = max(1, min(self.BATCH_SIZE, max_buffered // self.fetcher.max_workers))
+
+        message_ids = self.iter_message_ids(query)
+        if id_filter:
+            message_ids = self._filter_ids(message_ids, id_filter)
+        if metadata_filter:
+            message_ids = self._triage_ids(message_ids, metadata_filter, metadata_headers, batch_size,
+                                           failed_ids=failed_ids)
+
+        count = 0
+        for message in self.fetch_messages(message_ids, format=format, batch_size=batch_size, failed_ids=failed_ids):
+            count += 1
+            yield message
+
+        logger.info(f"Streamed {count} messages for query '{query}'")
+
+    def iter_message_ids(self, query: str, max_results: Optional[int] = None) -> Iterator[str]:
+        """Yield message IDs matching a query, following nextPageToken until exhausted"""
+        if not self.service and not self.authenticate():
+            raise Exception("Gmail authentication failed")
+
+        page_token = None
+        listed = 0
+
+        while True:
+            page_size = self.LIST_PAGE_SIZE
+            if max_results is not None:
+                page_size = min(page_size, max_results - listed)
+
+            request = self.service.users().messages().list(
+                userId='me',
+                q=query,
+                maxResults=page_size,
+                pageToken=page_token
+            )
+            results = self._execute(request, QUOTA_UNITS['messages.list'])
+
+            for message in results.get('messages', []):
+                listed += 1
+                yield message['id']
+
+            page_token = results.get('nextPageToken')
+            if not page_token or (max_results is not None and listed >= max_results):
+                break
+
+    def _filter_ids(self, message_ids: Iterator[str], id_filter: IdFilter) -> Iterator[str]:
+        """Apply id_filter one listing page at a time"""
+        listed = 0
+        kept = 0
+
+        while True:
+            page = list(islice(message_ids, self.LIST_PAGE_SIZE))
+            if not page:
+                break
+            new_ids = id_filter(page)
+            listed += len(page)
+            kept += len(new_ids)
+            yield from new_ids
+
+        logger.info(f"Listed {listed} messages, skipped {listed - kept} already stored")
+
+    def _triage_ids(self, message_ids: Iterator[str], metadata_filter: MetadataFilter,
+                    metadata_headers: Optional[List[str]], batch_size: int,
+                    failed_ids: Optional[List[str]] = None) -> Iterator[str]:
+        """Run the metadata pass and yield only the IDs worth a full fetch"""
+        checked = 0
+        kept = 0
+
+        for metadata in self.fetch_messages(message_ids, format='metadata', batch_size=batch_size,
+                                            metadata_headers=metadata_headers, failed_ids=failed_ids):
+            checked += 1
+            if metadata_filter(metadata):
+                kept += 1
+                yield metadata['id']
+
+        logger.info(f"Metadata triage: {kept} of {checked} messages need a full fetch")
+
+    def fetch_messages(self, message_ids: Iterable[str], format: str = 'full',
+                       batch_size: int = BATCH_SIZE, metadata_headers: Optional[List[str]] = None,
+                       failed_ids: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Fetch messages through the Gmail batch endpoint, yielding them batch by batch
+
+        Batches run concurrently on the fetcher's pool, paced by the Gmail
+        quota bucket, and are yielded in listing order. IDs that fail for good
+        are appended to failed_ids, so the caller can count them as errors.
+        """
+        if not self.service and not self.authenticate():
+            raise Exception("Gmail authentication failed")
+
+        batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+
+        def chunks():
+            ids = iter(message_ids)
+            while True:
+                chunk = list(islice(ids, batch_size))
+                if not chunk:
+                    return
+                yield chunk
+
+        for messages, failed in self.fetcher.map_ordered(
+            lambda chunk: self._execute_get_batch(chunk, format, metadata_headers), chunks()
+        ):
+            if failed and failed_ids is not None:
+                failed_ids.extend(failed)
+            yield from messages
+
+    def _execute_get_batch(self, message_ids: List[str], format: str,
+                           metadata_headers: Optional[List[str]] = None) -> Tuple[List[Dict], List[str]]:
+        """Run one batch of messages.get calls, retrying throttled items with backoff
+
+        Returns the fetched messages and the IDs that could not be fetched.
+        """
+        results = {}
+        failed = []
+        pending = list(message_ids)
+
+        for attempt in range(self.MAX_BATCH_RETRIES):
+            retry_ids = []
+
+            def on_response(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = response
+                elif is_retryable_error(exception):
+                    retry_ids.append(request_id)
+                else:
+                    logger.error(f"Error fetching message {request_id}: {exception}")
+                    failed.append(request_id)
+
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for message_id in pending:
+                params = {'userId': 'me', 'id': message_id, 'format': format}
+                if format == 'metadata' and metadata_headers:
+                    params['metadataHeaders'] = metadata_headers
+                batch.add(self.service.users().messages().get(**params), request_id=message_id)
+
+            # Each call inside a batch is billed separately against the quota
+            units = len(pending) * QUOTA_UNITS['messages.get']
+            self.fetcher.throttle(units)
+            try:
+                with self.fetcher.metrics.track(units):
+                    batch.execute(http=self._thread_http())
+            except HttpError as e:
+                if not is_retryable_error(e):
+                    logger.error(f"Batch fetch of {len(pending)} messages failed: {e}")
+                    self.fetcher.metrics.record_failure(len(pending))
+                    failed.extend(message_id for message_id in pending if message_id not in results and message_id not in failed)
+                    break
+                retry_ids = [message_id for message_id in pending if message_id not in results]
+
+            if not retry_ids:
+                break
+
+            delay = backoff_delay(attempt)
+            self.fetcher.metrics.record_retry(len(retry_ids))
+            logger.warning(f"Gmail throttled {len(retry_ids)} messages, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            pending = retry_ids
+        else:
+            logger.error(f"Giving up on {len(pending)} messages after {self.MAX_BATCH_RETRIES} attempts")
+            self.fetcher.metrics.record_failure(len(pending))
+            failed.extend(pending)
+
+        # Keep the listing order so callers see newest messages first
+        return [results[message_id] for message_id in message_ids if message_id in results], failed
+
+    def get_profile(self) -> Dict:
+        """Get the mailbox address and its current historyId"""
+        if not self.service and not self.authenticate():
+            raise Exception("Gmail authentication failed")
+
+        return self._execute(self.service.users().getProfile(userId='me'), QUOTA_UNITS['getProfile'])
+
+    def list_history(self, start_history_id: str) -> Tuple[List[Dict], str]:
+        """List messages added since a historyId, returning (messages, latest historyId)"""
+        if not self.service and not self.authenticate():
+            raise Exception("Gmail authentication failed")
+
+        added = {}
+        latest_history_id = start_history_id
+        page_token = None
+
+        while True:
+            try:
+                request = self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    pageToken=page_token
+                )
+                results = self._execute(request, QUOTA_UNITS['history.list'])
+            except HttpError as e:
+                # Gmail answers 404 once the start historyId falls out of its retention window
+                if e.resp.status == 404:
+                    raise HistoryExpiredError(f"historyId {start_history_id} is no longer available")
+                raise
+
+            for record in results.get('history', []):
+                for item in record.get('messagesAdded', []):
+                    message = item['message']
+                    added[message['id']] = message
+
+            latest_history_id = results.get('historyId', latest_history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        logger.info(f"History since {start_history_id}: {len(added)} messages added")
+        return list(added.values()), latest_history_id
+
+    @staticmethod
+    def _after_query(hours_back: int) -> str:
+        """Build an after: search term with second precision (Gmail accepts epoch seconds)"""
+        after_date = datetime.now() - timedelta(hours=hours_back)
+        return f'after:{int(after_date.timestamp())}'
+
+    def _received_query(self, hours_back: int, include_sent: bool = False) -> str:
+        """Build the search query for received (optionally also sent) mail"""
+        if include_sent:
+            return self._after_query(hours_back)
+        return f'{self._after_query(hours_back)} -in:sent'
+
+    def _execute(self, request, units: int) -> Dict:
+        """Execute one API request on this thread's connection, under the quota"""
+        return self.fetcher.call(lambda: request.execute(http=self._thread_http()), units)
+
+    def _thread_http(self):
+        """Return this thread's HTTP connection, creating it on first use"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = httplib2.Http()
+            if self.credentials is not None:
+                http = AuthorizedHttp(self.credentials, http=http)
+            self._local.http = http
+        return http
+
     def download_attachment(self, message_id: str, attachment_id: str) -> bytes:
         """Download attachment data from Gmail"""
         try:
-            attachment_data = self.service.users().messages().attachments().get(
+            request = self.service.users().messages().attachments().get(
                 userId='me',
                 messageId=message_id,
                 id=attachment_id
-            ).execute()
+            )
+            attachment_data = self._execute(request, QUOTA_UNITS['messages.attachments.get'])
 
-            import base64
             return base64.urlsafe_b64decode(attachment_data['data'])
 
         except Exception as e:
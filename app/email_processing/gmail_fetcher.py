@@ -0,0 +1,210 @@
+# app/email_processing/gmail_fetcher.py
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+# Gmail API cost per call in quota units (the per-user limit is 250 units/second)
+QUOTA_UNITS = {
+    'getProfile': 1,
+    'history.list': 2,
+    'messages.list': 5,
+    'messages.get': 5,
+    'messages.attachments.get': 5,
+    'messages.send': 100,
+}
+
+# HTTP statuses Gmail uses for quota exhaustion and transient backend errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Check whether a Gmail API error is a rate limit or transient failure"""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status == 403 and b'ateLimitExceeded' in (error.content or b'')
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 32.0) -> float:
+    """Exponential backoff with jitter: half the window fixed, half random"""
+    window = min(cap, base * (2 ** attempt))
+    return window / 2 + random.uniform(0, window / 2)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed rate of quota units per second"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float = 1) -> float:
+        """Block until units are available, returning the seconds spent waiting"""
+        waited = 0.0
+        # Requests larger than the bucket are paid for in bucket-sized installments
+        while units > self.capacity:
+            waited += self._acquire(self.capacity)
+            units -= self.capacity
+        return waited + self._acquire(units)
+
+    def _acquire(self, units: float) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= units:
+                    self._tokens -= units
+                    return waited
+                shortfall = (units - self._tokens) / self.rate
+            time.sleep(shortfall)
+            waited += shortfall
+
+
+class FetchMetrics:
+    """Counters for Gmail request concurrency, retries and throttling"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.requests = 0
+            self.retries = 0
+            self.failures = 0
+            self.quota_units = 0
+            self.throttle_waits = 0
+            self.throttled_seconds = 0.0
+
+    @contextmanager
+    def track(self, units: int):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.requests += 1
+            self.quota_units += units
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def record_throttle(self, seconds: float):
+        with self._lock:
+            self.throttle_waits += 1
+            self.throttled_seconds += seconds
+
+    def record_retry(self, count: int = 1):
+        with self._lock:
+            self.retries += count
+
+    def record_failure(self, count: int = 1):
+        with self._lock:
+            self.failures += count
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'quota_units': self.quota_units,
+                'throttle_waits': self.throttle_waits,
+                'throttled_seconds': round(self.throttled_seconds, 3),
+            }
+
+
+# Gmail quota is per user, so every client in this process shares one bucket
+gmail_quota = TokenBucket(float(os.environ.get('GMAIL_QUOTA_UNITS_PER_SECOND', 250)))
+fetch_metrics = FetchMetrics()
+
+
+class GmailFetcher:
+    """Runs Gmail calls on a thread pool, paced by the shared quota bucket"""
+
+    MAX_RETRIES = 5
+
+    def __init__(self, max_workers: int = None, bucket: TokenBucket = None, metrics: FetchMetrics = None):
+        self.max_workers = max_workers or int(os.environ.get('GMAIL_FETCH_WORKERS', 4))
+        self.bucket = bucket or gmail_quota
+        self.metrics = metrics or fetch_metrics
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='gmail-fetch')
+            return self._pool
+
+    def throttle(self, units: int):
+        """Wait for quota before issuing a call worth `units`"""
+        waited = self.bucket.acquire(units)
+        if waited:
+            self.metrics.record_throttle(waited)
+
+    def call(self, fn: Callable, units: int):
+        """Run one Gmail call under the quota, retrying 429/5xx with backoff"""
+        for attempt in range(self.MAX_RETRIES):
+            self.throttle(units)
+            try:
+                with self.metrics.track(units):
+                    return fn()
+            except Exception as e:
+                if not is_retryable_error(e) or attempt == self.MAX_RETRIES - 1:
+                    self.metrics.record_failure()
+                    raise
+                delay = backoff_delay(attempt)
+                self.metrics.record_retry()
+                logger.warning(f"Gmail call throttled ({e.resp.status}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """Run fn over items concurrently, returning results in input order"""
+        return list(self.map_ordered(fn, items))
+
+    def map_ordered(self, fn: Callable, items: Iterable, lookahead: int = None) -> Iterator:
+        """Yield fn(item) in input order with at most `lookahead` calls outstanding
+
+        Items are pulled from the iterable on the calling thread, so lazy
+        producers (listing, database filters) never run on pool threads.
+        """
+        lookahead = lookahead or self.max_workers
+        pending = deque()
+
+        for item in items:
+            pending.append(self.pool.submit(fn, item))
+            if len(pending) >= lookahead:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
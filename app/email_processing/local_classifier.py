@@ -0,0 +1,244 @@
+# app/email_processing/local_classifier.py
+import os
+import re
+import time
+import zlib
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from flask import has_app_context
+from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..database_models import db, Email, ClassifiedEmail
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9'&]*")
+
+
+class LocalClassifier:
+    """Multinomial Naive Bayes over hashed tokens, trained on stored AI classifications
+
+    Every category/priority pair in classified_emails is one class. Subject and
+    body words plus the sender address and domain are hashed into n_features
+    buckets, and per-class counts are kept so new rows are added incrementally
+    by refresh(). classify() answers only when the top class is at least
+    `threshold` likely, so the caller can skip the LLM. Without NumPy the
+    model is never trained.
+
+    The model only labels mail: its answers have the subject as summary and
+    no extracted contact or property details, so the email gets no contact
+    columns or property link. It therefore only answers for the categories
+    in LOCAL_CLASSIFIER_CATEGORIES, where those details do not matter, and
+    never for Critical mail; everything else goes to the LLM.
+    """
+
+    TRAIN_CHUNK_SIZE = 1000
+
+    # Mail that is filed rather than acted on, so a result without extracted details loses little
+    DEFAULT_CATEGORIES = 'General,Marketing & Listings'
+
+    # Rows the model answered itself, that fell back, or that a sender rule decided are not training
+    # data; learning rule output would keep reproducing a rule after it is edited or deactivated
+    EXCLUDED_TAGS = ('local_model', 'classification_failed', 'sender_rule')
+
+    def __init__(self, threshold: float = None, min_rows: int = None, refresh_seconds: float = None,
+                 n_features: int = 2 ** 16, alpha: float = 0.1):
+        self.enabled = HAS_NUMPY and os.environ.get('LOCAL_CLASSIFIER', '1') == '1'
+        self.threshold = threshold or float(os.environ.get('LOCAL_CLASSIFIER_THRESHOLD', 0.98))
+        self.min_rows = min_rows if min_rows is not None else int(os.environ.get('LOCAL_CLASSIFIER_MIN_ROWS', 500))
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else float(
+            os.environ.get('LOCAL_CLASSIFIER_REFRESH_SECONDS', 300))
+        self.categories = {c.strip() for c in os.environ.get('LOCAL_CLASSIFIER_CATEGORIES',
+                                                             self.DEFAULT_CATEGORIES).split(',') if c.strip()}
+        self.n_features = n_features
+        self.alpha = alpha
+
+        self._lock = threading.Lock()
+        # Counters have their own lock, so classify() never waits for a training chunk
+        self._stats_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.labels = []
+        self._label_index = {}
+        self._feature_counts = None
+        self._class_counts = None
+        self._action_counts = None
+        self._model = None  # (log_prior, log_likelihood, action_rate), replaced whole after training
+        self.trained_rows = 0
+        self.last_row_id = 0
+
+        self.predictions = 0
+        self.served = 0
+        self.predict_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self._model is not None and self.trained_rows >= self.min_rows and len(self.labels) > 1
+
+    def features(self, email_data: Dict):
+        """Hashed token bucket of every word, subject word and sender feature in the email"""
+        subject = (email_data.get('subject') or '').lower()
+        body = (email_data.get('body_cleaned') or '')[:2000].lower()
+        sender = (email_data.get('sender_email') or '').lower()
+
+        tokens = TOKEN_PATTERN.findall(f"{subject} {body}")
+        tokens += ['subject:' + token for token in TOKEN_PATTERN.findall(subject)]
+        tokens += ['from:' + sender, 'domain:' + sender.rpartition('@')[2]]
+        # crc32 rather than hash(), which is salted per process
+        return np.fromiter((zlib.crc32(token.encode('utf-8')) % self.n_features for token in tokens),
+                           dtype=np.int64, count=len(tokens))
+
+    def partial_fit(self, rows: Iterable[Tuple[Dict, str, str, bool]]) -> int:
+        """Add (email_data, category, priority, requires_action) examples to the counts"""
+        if not self.enabled:
+            return 0
+
+        added = 0
+        with self._lock:
+            for email_data, category, priority, requires_action in rows:
+                label = (category, priority)
+                index = self._label_index.get(label)
+                if index is None:
+                    index = self._add_label(label)
+                np.add.at(self._feature_counts[index], self.features(email_data), 1.0)
+                self._class_counts[index] += 1
+                self._action_counts[index] += 1 if requires_action else 0
+                added += 1
+
+            if added:
+                self.trained_rows += added
+                self._fit()
+        return added
+
+    def _add_label(self, label: Tuple[str, str]) -> int:
+        index = len(self.labels)
+        self.labels.append(label)
+        self._label_index[label] = index
+        if self._feature_counts is None:
+            self._feature_counts = np.zeros((1, self.n_features))
+            self._class_counts = np.zeros(1)
+            self._action_counts = np.zeros(1)
+        else:
+            self._feature_counts = np.vstack([self._feature_counts, np.zeros(self.n_features)])
+            self._class_counts = np.append(self._class_counts, 0.0)
+            self._action_counts = np.append(self._action_counts, 0.0)
+        return index
+
+    def _fit(self):
+        smoothed = self._feature_counts + self.alpha
+        log_likelihood = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        log_prior = np.log(self._class_counts / self._class_counts.sum())
+        action_rate = self._action_counts / self._class_counts
+        self._model = (log_prior, log_likelihood, action_rate)
+
+    def predict(self, email_data: Dict) -> Tuple[Tuple[str, str], float, float]:
+        """Most likely (category, priority), its probability and that class's requires_action rate"""
+        log_prior, log_likelihood, action_rate = self._model
+        scores = log_prior + log_likelihood[:, self.features(email_data)].sum(axis=1)
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best]), float(action_rate[best])
+
+    def can_serve(self, category: str, priority: str) -> bool:
+        """Whether a prediction of this class may replace the LLM"""
+        return category in self.categories and category != 'Critical Alerts' and priority != 'Critical'
+
+    def classify(self, email_data: Dict) -> Optional[Dict]:
+        """Classification when the model is confident in a servable class, else None"""
+        if not self.ready:
+            return None
+
+        start = time.perf_counter()
+        (category, priority), confidence, action_rate = self.predict(email_data)
+        served = confidence >= self.threshold and self.can_serve(category, priority)
+        with self._stats_lock:
+            self.predictions += 1
+            self.served += 1 if served else 0
+            self.predict_seconds += time.perf_counter() - start
+        if not served:
+            return None
+
+        return {
+            'category': category,
+            'sub_category': 'Local model',
+            'priority': priority,
+            'summary': email_data.get('subject') or 'Email requires review',
+            'extracted_info': {},
+            'requires_action': action_rate >= 0.5,
+            'confidence_score': round(confidence, 3),
+            'tags': ['local_model']
+        }
+
+    def refresh(self) -> int:
+        """Train on classified received emails stored since the last refresh"""
+        added = 0
+        while True:
+            rows = db.session.query(
+                ClassifiedEmail.id, ClassifiedEmail.category, ClassifiedEmail.priority,
+                ClassifiedEmail.requires_action, Email.subject, Email.sender_email, Email.body_cleaned
+            ).join(Email, ClassifiedEmail.email_id == Email.id).filter(
+                ClassifiedEmail.id > self.last_row_id,
+                Email.is_sent == False,
+                *[or_(ClassifiedEmail.tags == None, ~ClassifiedEmail.tags.contains(f'"{tag}"'))
+                  for tag in self.EXCLUDED_TAGS]
+            ).order_by(ClassifiedEmail.id).limit(self.TRAIN_CHUNK_SIZE).all()
+            if not rows:
+                break
+
+            added += self.partial_fit(
+                ({'subject': row.subject, 'sender_email': row.sender_email, 'body_cleaned': row.body_cleaned},
+                 row.category, row.priority, row.requires_action)
+                for row in rows
+            )
+            self.last_row_id = rows[-1].id
+
+        if added:
+            logger.info(f"Local classifier trained on {added} new rows ({self.trained_rows} total, "
+                        f"{len(self.labels)} classes)")
+        return added
+
+    def maybe_refresh(self):
+        """Refresh at most every refresh_seconds; other threads keep classifying meanwhile"""
+        if not self.enabled or not has_app_context() or time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_refresh = time.monotonic()
+            self.refresh()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Local classifier refresh failed: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def snapshot(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'enabled': self.enabled,
+                'has_numpy': HAS_NUMPY,
+                'ready': self.ready,
+                'threshold': self.threshold,
+                'categories': sorted(self.categories),
+                'classes': len(self.labels),
+                'trained_rows': self.trained_rows,
+                'predictions': self.predictions,
+                'served': self.served,
+                'served_rate': round(self.served / self.predictions, 3) if self.predictions else None,
+                'average_predict_microseconds': round(self.predict_seconds / self.predictions * 1e6, 1)
+                if self.predictions else None,
+            }
+
+
+# Shared by every classifier in this process, so it is trained once
+local_classifier = LocalClassifier()
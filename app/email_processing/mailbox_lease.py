@@ -0,0 +1,197 @@
+# app/email_processing/mailbox_lease.py
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+
+from ..database_models import db, MailboxLease
+
+logger = logging.getLogger(__name__)
+
+
+class MailboxBusyError(Exception):
+    """Raised when another process holds the mailbox lease"""
+
+    def __init__(self, mailbox: str, scope: str, holder: Optional[Dict]):
+        super().__init__(f"Mailbox {mailbox} ({scope}) is being processed by "
+                         f"{holder['owner'] if holder else 'another worker'}")
+        self.holder = holder
+
+
+class LeaseLostError(Exception):
+    """Raised when a write is fenced off because the lease has passed to another owner"""
+
+
+class LeaseHandle:
+    """A held lease: the owner and the fencing token it was granted"""
+
+    def __init__(self, mailbox: str, scope: str, owner: str, token: int):
+        self.mailbox = mailbox
+        self.scope = scope
+        self.owner = owner
+        self.token = token
+        self.lost = False
+
+    def __repr__(self):
+        return f'<LeaseHandle {self.mailbox}/{self.scope} #{self.token}>'
+
+
+class MailboxLeaseManager:
+    """Single-flight lock per mailbox, shared by every process through the database
+
+    A lease is taken with a conditional UPDATE that only succeeds when the row
+    is free or its lease has expired, and each grant bumps the fencing token.
+    Holders renew the lease while they work; a holder that stalls past the
+    expiry loses it, and fence() then refuses its writes.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('MAILBOX_LEASE_SECONDS', 300))
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+
+    def owner_id(self) -> str:
+        return f"{self._owner_prefix}:{threading.get_ident()}"
+
+    def acquire(self, mailbox: str, scope: str = 'ingest', owner: str = None) -> Optional[LeaseHandle]:
+        """Take the lease if it is free or expired; None if someone else holds it"""
+        owner = owner or self.owner_id()
+        try:
+            if not MailboxLease.query.filter_by(mailbox=mailbox, scope=scope).first():
+                db.session.add(MailboxLease(mailbox=mailbox, scope=scope))
+                db.session.commit()
+        except IntegrityError:
+            # Another process created the row first
+            db.session.rollback()
+
+        now = datetime.utcnow()
+        granted = db.session.execute(
+            update(MailboxLease)
+            .where(MailboxLease.mailbox == mailbox, MailboxLease.scope == scope,
+                   or_(MailboxLease.owner.is_(None), MailboxLease.expires_at < now))
+            .values(owner=owner, fencing_token=MailboxLease.fencing_token + 1, acquired_at=now,
+                    heartbeat_at=now, expires_at=now + timedelta(seconds=self.ttl_seconds), released_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not granted:
+            return None
+
+        token = db.session.query(MailboxLease.fencing_token).filter_by(
+            mailbox=mailbox, scope=scope, owner=owner).scalar()
+        logger.info(f"Acquired {scope} lease on {mailbox} (token {token})")
+        return LeaseHandle(mailbox, scope, owner, token)
+
+    def renew(self, lease: LeaseHandle) -> bool:
+        """Push the expiry out; False once the lease has passed to someone else"""
+        now = datetime.utcnow()
+        renewed = db.session.execute(
+            update(MailboxLease)
+            .where(MailboxLease.mailbox == lease.mailbox, MailboxLease.scope == lease.scope,
+                   MailboxLease.owner == lease.owner, MailboxLease.fencing_token == lease.token)
+            .values(heartbeat_at=now, expires_at=now + timedelta(seconds=self.ttl_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not renewed:
+            lease.lost = True
+        return bool(renewed)
+
+    def release(self, lease: LeaseHandle):
+        """Give the lease up; a no-op if it was already taken over"""
+        try:
+            db.session.execute(
+                update(MailboxLease)
+                .where(MailboxLease.mailbox == lease.mailbox, MailboxLease.scope == lease.scope,
+                       MailboxLease.owner == lease.owner, MailboxLease.fencing_token == lease.token)
+                .values(owner=None, expires_at=None, released_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            logger.info(f"Released {lease.scope} lease on {lease.mailbox} (token {lease.token})")
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not release lease on {lease.mailbox}: {e}")
+
+    def fence(self, lease: LeaseHandle):
+        """Check the token inside the caller's transaction, before it commits
+
+        The row update takes the SQLite write lock, so no other process can take
+        the lease between this check and the caller's commit.
+        """
+        current = db.session.execute(
+            update(MailboxLease)
+            .where(MailboxLease.mailbox == lease.mailbox, MailboxLease.scope == lease.scope,
+                   MailboxLease.owner == lease.owner, MailboxLease.fencing_token == lease.token)
+            .values(heartbeat_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not current:
+            lease.lost = True
+            raise LeaseLostError(f"Lease on {lease.mailbox} (token {lease.token}) is no longer held")
+
+    def holder(self, mailbox: str, scope: str = 'ingest') -> Optional[Dict]:
+        """Current holder of an unexpired lease, if any"""
+        row = MailboxLease.query.filter(
+            MailboxLease.mailbox == mailbox, MailboxLease.scope == scope,
+            MailboxLease.owner.isnot(None), MailboxLease.expires_at >= datetime.utcnow()
+        ).first()
+        return row.to_dict() if row else None
+
+    @contextmanager
+    def hold(self, mailbox: str, scope: str = 'ingest', wait_seconds: float = 0):
+        """Hold the lease for the duration of the block, renewing it in the background
+
+        Raises MailboxBusyError if it is still held elsewhere after wait_seconds.
+        Nested holds in the same thread reuse the outer lease.
+        """
+        held = self._local.__dict__.setdefault('held', {})
+        if (mailbox, scope) in held:
+            yield held[(mailbox, scope)]
+            return
+
+        from flask import current_app
+        app = current_app._get_current_object()
+
+        deadline = time.monotonic() + wait_seconds
+        lease = self.acquire(mailbox, scope)
+        while lease is None and time.monotonic() < deadline:
+            time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            lease = self.acquire(mailbox, scope)
+        if lease is None:
+            raise MailboxBusyError(mailbox, scope, self.holder(mailbox, scope))
+
+        finished = threading.Event()
+
+        def keep_alive():
+            with app.app_context():
+                try:
+                    while not finished.wait(self.ttl_seconds / 3):
+                        if not self.renew(lease):
+                            logger.warning(f"Lost {scope} lease on {mailbox} (token {lease.token})")
+                            return
+                except Exception as e:
+                    logger.warning(f"Lease renewal failed for {mailbox}: {e}")
+                finally:
+                    db.session.remove()
+
+        renewer = threading.Thread(target=keep_alive, name=f"lease-{scope}", daemon=True)
+        renewer.start()
+        held[(mailbox, scope)] = lease
+        try:
+            yield lease
+        finally:
+            del held[(mailbox, scope)]
+            finished.set()
+            renewer.join()
+            self.release(lease)
+
+
+mailbox_leases = MailboxLeaseManager()
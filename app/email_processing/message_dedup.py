@@ -0,0 +1,72 @@
+# app/email_processing/message_dedup.py
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, List
+
+from ..database_models import db, Email
+
+logger = logging.getLogger(__name__)
+
+class KnownMessageFilter:
+    """Drops Gmail message IDs that need no fetch: already stored, or skipped by triage
+
+    Positive answers come from a bounded in-process LRU of IDs known to be in
+    the emails table or rejected by a SKIP_SENDERS rule; everything else is
+    resolved with one IN query per chunk. Skipped IDs are not stored, so after
+    a restart they pay for one more metadata fetch before being remembered.
+    """
+
+    # Stay well under SQLite's bound-parameter limit
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._known = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.db_hits = 0
+
+    def filter_new(self, message_ids: Iterable[str]) -> List[str]:
+        """Return the IDs that are not stored yet, preserving order"""
+        message_ids = list(message_ids)
+
+        with self._lock:
+            unknown = []
+            for message_id in message_ids:
+                if message_id in self._known:
+                    self._known.move_to_end(message_id)
+                    self.cache_hits += 1
+                else:
+                    unknown.append(message_id)
+
+        stored = set()
+        for start in range(0, len(unknown), self.QUERY_CHUNK_SIZE):
+            chunk = unknown[start:start + self.QUERY_CHUNK_SIZE]
+            rows = db.session.query(Email.message_id).filter(Email.message_id.in_(chunk)).all()
+            stored.update(row.message_id for row in rows)
+
+        if stored:
+            self.db_hits += len(stored)
+            self.mark_known(stored)
+
+        new_ids = [message_id for message_id in unknown if message_id not in stored]
+        logger.debug(f"Dedup: {len(message_ids)} listed, {len(new_ids)} new")
+        return new_ids
+
+    def mark_known(self, message_ids: Iterable[str]):
+        """Remember IDs that are now stored, or that triage decided never to fetch"""
+        with self._lock:
+            for message_id in message_ids:
+                self._known[message_id] = True
+                self._known.move_to_end(message_id)
+            while len(self._known) > self.capacity:
+                self._known.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._known.clear()
+
+
+# Shared across EmailProcessor instances in this process
+known_messages = KnownMessageFilter()
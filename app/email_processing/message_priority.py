@@ -0,0 +1,70 @@
+# app/email_processing/message_priority.py
+import logging
+from typing import Dict, Iterable, List
+
+from .email_classifier import EmailClassifier
+from .urgency_scanner import urgency_scanner
+
+logger = logging.getLogger(__name__)
+
+class MessagePriority:
+    """Ranks a Gmail message before classification, from headers, labels and snippet alone
+
+    Works on full payloads and on history records, which carry labelIds
+    only. Lower ranks go first: ingestion fetches, classifies and saves
+    likely Critical mail ahead of bulk mail. The rank only orders the work, the AI classification still
+    decides the stored priority.
+    """
+
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    BULK = 3
+
+    NAMES = {CRITICAL: 'critical', HIGH: 'high', NORMAL: 'normal', BULK: 'bulk'}
+
+    # Keyword score that makes the classifier force Critical, and the score worth moving ahead of routine mail
+    CRITICAL_SCORE = EmailClassifier.URGENCY_OVERRIDE_SCORE
+    HIGH_SCORE = 0.5
+
+    IMPORTANT_LABELS = {'IMPORTANT', 'STARRED'}
+    BULK_LABELS = {'CATEGORY_PROMOTIONS', 'CATEGORY_SOCIAL', 'CATEGORY_FORUMS', 'CATEGORY_UPDATES'}
+
+    def rank(self, message: Dict) -> int:
+        """Rank one message; lower is more urgent"""
+        headers = {h['name'].lower(): h['value'] for h in message.get('payload', {}).get('headers', [])}
+        labels = set(message.get('labelIds', []))
+        score = self.urgency_score(f"{headers.get('subject', '')} {message.get('snippet', '')}")
+
+        if score >= self.CRITICAL_SCORE:
+            return self.CRITICAL
+        if self._is_bulk(headers, labels):
+            return self.BULK
+        if score >= self.HIGH_SCORE or labels & self.IMPORTANT_LABELS or self._flagged_urgent(headers):
+            return self.HIGH
+        return self.NORMAL
+
+    def order(self, messages: Iterable[Dict]) -> List[Dict]:
+        """Most urgent first; messages of equal rank keep their listing order"""
+        return sorted(messages, key=self.rank)
+
+    @staticmethod
+    def urgency_score(text: str) -> float:
+        """Highest weight among the classifier's urgency keywords found in text"""
+        return urgency_scanner.score(text)
+
+    def _is_bulk(self, headers: Dict, labels: set) -> bool:
+        if labels & self.BULK_LABELS:
+            return True
+        if headers.get('precedence', '').lower() in ('bulk', 'list', 'junk'):
+            return True
+        if headers.get('auto-submitted', 'no').lower() != 'no':
+            return True
+        return 'list-unsubscribe' in headers
+
+    @staticmethod
+    def _flagged_urgent(headers: Dict) -> bool:
+        if headers.get('importance', '').lower() == 'high':
+            return True
+        # X-Priority is "1 (Highest)" .. "5 (Lowest)"
+        return headers.get('x-priority', '').strip()[:1] in ('1', '2')
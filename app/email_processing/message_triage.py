@@ -0,0 +1,72 @@
+# app/email_processing/message_triage.py
+import os
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .message_dedup import KnownMessageFilter
+
+logger = logging.getLogger(__name__)
+
+class MessageTriage:
+    """Decides from metadata headers alone whether a received message needs a full fetch"""
+
+    # Headers requested in the format='metadata' pass
+    HEADERS = ['From', 'To', 'Subject', 'Date']
+
+    FETCH = 'fetch'
+    SENT_COPY = 'sent_copy'
+    SENDER_RULE = 'sender_rule'
+
+    def __init__(self, skip_senders: Optional[List[str]] = None, known_messages: Optional[KnownMessageFilter] = None):
+        # Skipped senders are remembered here so later listings drop them before the metadata fetch
+        self.known_messages = known_messages
+
+        # SKIP_SENDERS is a comma separated list of addresses and @domains
+        if skip_senders is None:
+            skip_senders = os.environ.get('SKIP_SENDERS', '').split(',')
+        patterns = [p.strip().lower() for p in skip_senders if p.strip()]
+        self.skip_addresses = {p for p in patterns if not p.startswith('@')}
+        self.skip_domains = {p[1:] for p in patterns if p.startswith('@')}
+
+        self.decisions = Counter()
+
+    @property
+    def has_rules(self) -> bool:
+        """Whether a skip rule is configured
+
+        The metadata pass costs as much quota as the full fetch it may save,
+        and received listings already exclude sent mail, so without a rule it
+        would skip nothing and callers should go straight to the full fetch.
+        """
+        return bool(self.skip_addresses or self.skip_domains)
+
+    def decide(self, metadata: Dict) -> str:
+        """Classify a metadata-only message as fetch, sent_copy or sender_rule"""
+        if 'SENT' in metadata.get('labelIds', []):
+            return self.SENT_COPY
+
+        headers = {h['name']: h['value'] for h in metadata.get('payload', {}).get('headers', [])}
+        sender = self._extract_email(headers.get('From', ''))
+
+        if sender and (sender in self.skip_addresses or sender.rsplit('@', 1)[-1] in self.skip_domains):
+            return self.SENDER_RULE
+
+        return self.FETCH
+
+    def wants_full_fetch(self, metadata: Dict) -> bool:
+        """Metadata filter for GmailClient.iter_messages"""
+        decision = self.decide(metadata)
+        self.decisions[decision] += 1
+        if decision != self.FETCH:
+            logger.debug(f"Triage skipped {metadata.get('id')}: {decision}")
+        # Sent copies are not marked: the sent pass still has to store them, and marks them known when it does
+        if decision == self.SENDER_RULE and self.known_messages is not None:
+            self.known_messages.mark_known([metadata['id']])
+        return decision == self.FETCH
+
+    @staticmethod
+    def _extract_email(value: str) -> str:
+        match = re.search(r'[\w\.\+-]+@[\w\.-]+\.\w+', value)
+        return match.group(0).lower() if match else ''
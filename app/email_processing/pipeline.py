@@ -0,0 +1,337 @@
+# app/email_processing/pipeline.py
+import os
+import math
+import time
+import queue
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class PipelineStage:
+    """One step of the pipeline: a handler run by its own pool of worker threads
+
+    The handler takes an item and returns the item for the next stage, or None
+    to drop it. With batch_size > 1 the handler takes a list of up to batch_size
+    items and returns one result per item, where an exception marks that item
+    as failed; a partial batch is handed over batch_wait seconds after its
+    first item arrived. Stages flagged with app_context run inside a Flask app context.
+    """
+
+    def __init__(self, name: str, handler: Callable, workers: int = 1, app_context: bool = False,
+                 batch_size: int = 1, batch_wait: float = 0.5):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.app_context = app_context
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+
+
+class StageMetrics:
+    """Throughput counters for one stage"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.peak_queue = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def snapshot(self) -> Dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at if self.started_at else 0.0
+        return {
+            'workers': self.workers,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'per_second': round(self.processed / elapsed, 2) if elapsed else 0.0,
+            # Share of worker time spent in the handler rather than waiting
+            'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'peak_queue': self.peak_queue,
+        }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 3) if values else 0.0
+
+
+class VisibilityStats:
+    """How long items of one label took to come out of the last stage, over recent runs"""
+
+    def __init__(self, history_size: int = 1000):
+        self.count = 0
+        self.since_start = deque(maxlen=history_size)
+        self.since_fetch = deque(maxlen=history_size)
+
+    def snapshot(self) -> Dict:
+        since_start = sorted(self.since_start)
+        since_fetch = sorted(self.since_fetch)
+        return {
+            'count': self.count,
+            # Seconds from the start of the run, what a user waiting on the sync sees
+            'since_run_start': {'p50': _percentile(since_start, 0.5), 'p95': _percentile(since_start, 0.95),
+                                'max': round(since_start[-1], 3) if since_start else 0.0},
+            # Seconds from fetch, the time spent queued and processed inside the pipeline
+            'since_fetch': {'p50': _percentile(since_fetch, 0.5), 'p95': _percentile(since_fetch, 0.95),
+                            'max': round(since_fetch[-1], 3) if since_fetch else 0.0},
+        }
+
+
+class PipelineMetrics:
+    """Per-stage counters for the most recent run of each named pipeline, and time-to-visibility across runs
+
+    `stages` is the most recently started run, whichever pipeline it was.
+    Only the MAX_PIPELINES most recently started names are kept, since
+    backfill windows each run under a name of their own.
+    """
+
+    MAX_PIPELINES = 20
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.pipelines = {}
+        self.visibility = {}
+        self.runs = 0
+
+    def start_run(self, stages: List[StageMetrics], name: str = 'pipeline'):
+        with self._lock:
+            self.stages = {stage.name: stage for stage in stages}
+            # Re-inserting moves the name to the end, so the oldest started is evicted first
+            self.pipelines.pop(name, None)
+            self.pipelines[name] = self.stages
+            while len(self.pipelines) > self.MAX_PIPELINES:
+                self.pipelines.pop(next(iter(self.pipelines)))
+            self.runs += 1
+
+    def update(self, stage: StageMetrics, **increments):
+        with self._lock:
+            for field, value in increments.items():
+                setattr(stage, field, getattr(stage, field) + value)
+
+    def observe_queue(self, stage: StageMetrics, depth: int):
+        with self._lock:
+            stage.peak_queue = max(stage.peak_queue, depth)
+
+    def observe_visibility(self, label: str, since_start: float, since_fetch: float):
+        with self._lock:
+            stats = self.visibility.setdefault(label, VisibilityStats())
+            stats.count += 1
+            stats.since_start.append(since_start)
+            stats.since_fetch.append(since_fetch)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'stages': {name: s.snapshot() for name, s in self.stages.items()},
+                'pipelines': {pipeline: {name: s.snapshot() for name, s in stages.items()}
+                              for pipeline, stages in self.pipelines.items()},
+                'visibility': {label: v.snapshot() for label, v in self.visibility.items()}
+            }
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+class StagedPipeline:
+    """Runs items from a source through stages connected by bounded queues
+
+    The source is iterated on the calling thread (it is the fetch stage), so
+    lazy producers that use the database keep the caller's app context. Each
+    later stage has its own worker threads; a full queue blocks the stage
+    before it, so memory stays bounded and total time tracks the slowest stage.
+    Items are not kept in order.
+
+    With priority, every item is ranked as it leaves the source and each stage
+    takes the lowest-ranked item waiting in its queue; items at or below
+    urgent_rank also skip the batch_wait of batching stages. visibility_label
+    names the item reaching the last stage, for time-to-visibility metrics.
+    Pipelines that may run at the same time need different names to keep
+    their metrics apart.
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = None, source_name: str = 'fetch',
+                 metrics: PipelineMetrics = None, app=None, priority: Callable = None, urgent_rank: int = 0,
+                 visibility_label: Callable = None, name: str = 'pipeline'):
+        self.name = name
+        self.stages = stages
+        self.queue_size = queue_size or int(os.environ.get('PIPELINE_QUEUE_SIZE', 50))
+        self.source_name = source_name
+        self.metrics = metrics or pipeline_metrics
+        self.app = app
+        self.priority = priority
+        self.urgent_rank = urgent_rank
+        self.visibility_label = visibility_label
+
+    def run(self, source: Iterable, describe: Callable = None) -> Dict:
+        """Drain source through every stage, returning counts and error messages"""
+        describe = describe or (lambda item: 'item')
+        # Entries are (rank, sequence, fetched_at, item): lowest rank first, FIFO within a rank
+        queues = [queue.PriorityQueue(maxsize=self.queue_size) for _ in self.stages]
+        sequence = itertools.count()
+        run_started = time.monotonic()
+        source_metrics = StageMetrics(self.source_name, 1)
+        stage_metrics = [StageMetrics(stage.name, stage.workers) for stage in self.stages]
+        self.metrics.start_run([source_metrics] + stage_metrics, self.name)
+
+        errors = []
+        completed = [0]
+        errors_lock = threading.Lock()
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        app = self.app
+        if app is None and any(stage.app_context for stage in self.stages):
+            from flask import current_app
+            app = current_app._get_current_object()
+
+        def put(index: int, entry, metrics: StageMetrics):
+            """Hand an entry to stage `index`, recording time blocked on backpressure"""
+            if index == len(self.stages):
+                return
+            start = time.monotonic()
+            queues[index].put(entry)
+            self.metrics.update(metrics, blocked_seconds=time.monotonic() - start)
+            self.metrics.observe_queue(stage_metrics[index], queues[index].qsize())
+
+        def close(index: int):
+            # Ranked after every real item, so workers drain their queue before stopping
+            queues[index].put((math.inf, next(sequence), None, _DONE))
+
+        def take(index: int):
+            """Take the next entry, or up to batch_size entries for a batching stage"""
+            stage = self.stages[index]
+            entry = queues[index].get()
+            if entry[3] is _DONE:
+                return [], True
+
+            entries = [entry]
+            # An urgent item only picks up what is already waiting instead of holding out for a full batch
+            urgent = self.priority is not None and entry[0] <= self.urgent_rank
+            deadline = time.monotonic() + (0.0 if urgent else stage.batch_wait)
+            while len(entries) < stage.batch_size:
+                try:
+                    entry = queues[index].get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry[3] is _DONE:
+                    return entries, True
+                entries.append(entry)
+            return entries, False
+
+        def work(index: int):
+            stage = self.stages[index]
+            metrics = stage_metrics[index]
+            done = False
+            while not done:
+                entries, done = take(index)
+                if not entries:
+                    continue
+                items = [entry[3] for entry in entries]
+
+                start = time.monotonic()
+                try:
+                    if stage.batch_size > 1:
+                        results = stage.handler(items)
+                    else:
+                        results = [stage.handler(items[0])]
+                except Exception as e:
+                    results = [e] * len(items)
+                self.metrics.update(metrics, busy_seconds=time.monotonic() - start)
+
+                for (rank, _, fetched_at, item), result in zip(entries, results):
+                    if isinstance(result, Exception):
+                        message = f"Error processing {describe(item)} in {stage.name} stage: {result}"
+                        logger.error(message)
+                        with errors_lock:
+                            errors.append(message)
+                        self.metrics.update(metrics, errors=1)
+                    elif result is None or result is False:
+                        self.metrics.update(metrics, dropped=1)
+                    else:
+                        self.metrics.update(metrics, processed=1)
+                        if index == len(self.stages) - 1:
+                            with errors_lock:
+                                completed[0] += 1
+                            if self.visibility_label:
+                                now = time.monotonic()
+                                self.metrics.observe_visibility(self.visibility_label(item), now - run_started,
+                                                                now - fetched_at)
+                        else:
+                            put(index + 1, (rank, next(sequence), fetched_at, result), metrics)
+
+        def worker(index: int):
+            stage = self.stages[index]
+            try:
+                if stage.app_context:
+                    from .. import db
+                    with app.app_context():
+                        try:
+                            work(index)
+                        finally:
+                            db.session.remove()
+                else:
+                    work(index)
+            finally:
+                # The last worker of a stage to finish closes the next stage's input
+                with remaining_lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last:
+                    stage_metrics[index].finished_at = time.monotonic()
+                    if index + 1 < len(self.stages):
+                        for _ in range(self.stages[index + 1].workers):
+                            close(index + 1)
+
+        threads = []
+        now = run_started
+        source_metrics.started_at = now
+        for index, stage in enumerate(self.stages):
+            stage_metrics[index].started_at = now
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index,), daemon=True,
+                                          name=f"pipeline-{stage.name}-{n}")
+                thread.start()
+                threads.append(thread)
+
+        consumed = 0
+        try:
+            iterator = iter(source)
+            while True:
+                start = time.monotonic()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                fetched_at = time.monotonic()
+                self.metrics.update(source_metrics, busy_seconds=fetched_at - start, processed=1)
+                consumed += 1
+                rank = self.priority(item) if self.priority else 0
+                put(0, (rank, next(sequence), fetched_at, item), source_metrics)
+        finally:
+            # Let the stages drain whatever was already fetched, even if the source failed
+            source_metrics.finished_at = time.monotonic()
+            if self.stages:
+                for _ in range(self.stages[0].workers):
+                    close(0)
+            for thread in threads:
+                thread.join()
+
+        logger.info(f"Pipeline {self.name} finished: {consumed} consumed, {completed[0]} completed, {len(errors)} errors")
+        return {'consumed': consumed, 'completed': completed[0], 'errors': errors}
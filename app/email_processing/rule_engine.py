@@ -0,0 +1,189 @@
+# app/email_processing/rule_engine.py
+import os
+import re
+import time
+import fnmatch
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import has_app_context
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..database_models import db, EmailCategories
+from .urgency_scanner import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryRule:
+    """Classification given by one category's sender rules, and its optional keyword condition"""
+
+    def __init__(self, category: EmailCategories):
+        self.category = category.name
+        self.priority = category.priority_default or 'Medium'
+        keywords = {keyword: 1.0 for keyword in category.get_keywords() if isinstance(keyword, str) and keyword.strip()}
+        self.keywords = KeywordMatcher(keywords) if keywords else None
+
+    def accepts(self, text: str) -> bool:
+        return self.keywords is None or self.keywords.search(text)
+
+
+class RuleMatcher:
+    """Sender and domain patterns of the active categories, indexed for lookup
+
+    Exact addresses and domains are dictionary lookups, and a domain also
+    covers its subdomains. Wildcard addresses are screened with one combined
+    regex. The most specific pattern is tried first: exact address, then
+    wildcard address, then the longest matching domain.
+    """
+
+    def __init__(self, categories: List[EmailCategories]):
+        self.addresses = {}
+        self.domains = {}
+        self.wildcards = []
+        self.rules = 0
+
+        for category in categories:
+            rule = CategoryRule(category)
+            for pattern in category.get_sender_patterns():
+                pattern = pattern.strip().lower() if isinstance(pattern, str) else ''
+                if not pattern:
+                    continue
+                if any(char in pattern for char in '*?['):
+                    self.wildcards.append((re.compile(fnmatch.translate(pattern)), pattern, rule))
+                else:
+                    self.addresses.setdefault(pattern, []).append((pattern, rule))
+                self.rules += 1
+
+            for pattern in category.get_domain_patterns():
+                domain = pattern.strip().lower().lstrip('@*.') if isinstance(pattern, str) else ''
+                if domain:
+                    self.domains.setdefault(domain, []).append((domain, rule))
+                    self.rules += 1
+
+        self._any_wildcard = re.compile('|'.join(
+            f"(?:{regex.pattern})" for regex, _, _ in self.wildcards
+        )) if self.wildcards else None
+
+    def match(self, email_data: Dict) -> Optional[Tuple[str, CategoryRule]]:
+        """(pattern, rule) of the first matching rule whose keywords, if any, appear in the email"""
+        sender = (email_data.get('sender_email') or '').strip().lower()
+        if not sender:
+            return None
+
+        text = None
+        for pattern, rule in self._candidates(sender):
+            if rule.keywords is not None and text is None:
+                text = f"{email_data.get('subject') or ''} {(email_data.get('body_cleaned') or '')[:2000]}"
+            if rule.accepts(text):
+                return pattern, rule
+        return None
+
+    def _candidates(self, sender: str) -> Iterator[Tuple[str, CategoryRule]]:
+        yield from self.addresses.get(sender, ())
+
+        if self._any_wildcard is not None and self._any_wildcard.match(sender):
+            for regex, pattern, rule in self.wildcards:
+                if regex.match(sender):
+                    yield pattern, rule
+
+        labels = sender.rpartition('@')[2].split('.')
+        for start in range(len(labels)):
+            yield from self.domains.get('.'.join(labels[start:]), ())
+
+
+class RuleEngine:
+    """Classifies mail from known senders with the EmailCategories rules, without a network call
+
+    A category's sender_patterns and domain_patterns choose the mail it
+    claims; if the category also has keywords, one of them must appear in the
+    subject or body. Categories without sender or domain patterns never match
+    on keywords alone. The matcher is built once and rebuilt when the rules
+    change, checked at most every reload_seconds.
+    """
+
+    def __init__(self, reload_seconds: float = None):
+        self.reload_seconds = reload_seconds if reload_seconds is not None else float(
+            os.environ.get('RULES_RELOAD_SECONDS', 30))
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._matcher = None
+        self._signature = None
+        self._checked_at = 0.0
+        self.reloads = 0
+        self.checked = 0
+        self.matched = 0
+
+    def classify(self, email_data: Dict) -> Optional[Dict]:
+        """Classification from the first matching rule, or None"""
+        matcher = self._current_matcher()
+        if matcher is None or not matcher.rules:
+            return None
+
+        found = matcher.match(email_data)
+        with self._lock:
+            self.checked += 1
+            self.matched += 1 if found else 0
+        if found is None:
+            return None
+
+        pattern, rule = found
+        return {
+            'category': rule.category,
+            'sub_category': 'Sender rule',
+            'priority': rule.priority,
+            'summary': email_data.get('subject') or 'Email requires review',
+            'extracted_info': {'matched_rule': pattern},
+            'requires_action': rule.priority in ('Critical', 'High'),
+            'confidence_score': 1.0,
+            'tags': ['sender_rule']
+        }
+
+    def reload(self):
+        """Rebuild the matcher on the next classification"""
+        self._checked_at = 0.0
+
+    def _current_matcher(self) -> Optional[RuleMatcher]:
+        if not has_app_context() or time.monotonic() - self._checked_at < self.reload_seconds:
+            return self._matcher
+        if not self._reload_lock.acquire(blocking=False):
+            return self._matcher
+
+        try:
+            self._checked_at = time.monotonic()
+            # The table holds one row per category, so comparing the rows themselves is cheap
+            categories = EmailCategories.query.filter(
+                (EmailCategories.is_active == True) | (EmailCategories.is_active == None)
+            ).order_by(EmailCategories.id).all()
+            signature = tuple(
+                (c.id, c.name, c.priority_default, c.keywords, c.sender_patterns, c.domain_patterns)
+                for c in categories
+            )
+            if signature != self._signature:
+                self._matcher = RuleMatcher(categories)
+                self._signature = signature
+                self.reloads += 1
+                logger.info(f"Sender rules loaded: {self._matcher.rules} patterns across {len(categories)} categories")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Sender rules reload failed: {e}")
+        finally:
+            self._reload_lock.release()
+        return self._matcher
+
+    def snapshot(self) -> Dict:
+        matcher = self._matcher
+        with self._lock:
+            return {
+                'patterns': matcher.rules if matcher else 0,
+                'reloads': self.reloads,
+                'checked': self.checked,
+                'matched': self.matched,
+                'match_rate': round(self.matched / self.checked, 3) if self.checked else None,
+                'reload_seconds': self.reload_seconds,
+            }
+
+
+# Shared by every classifier in this process, so rules are compiled once
+rule_engine = RuleEngine()
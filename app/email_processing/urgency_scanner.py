@@ -0,0 +1,208 @@
+# app/email_processing/urgency_scanner.py
+import os
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, NamedTuple
+
+from flask import has_app_context
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..database_models import db, UrgencyKeyword
+
+logger = logging.getLogger(__name__)
+
+# Built-in keyword weights behind the urgency score; urgency_keywords rows override or extend them
+DEFAULT_KEYWORDS = {
+    'emergency': 1.0,
+    'urgent': 0.9,
+    'immediate': 0.9,
+    'asap': 0.8,
+    'critical': 0.9,
+    'fire': 1.0,
+    'flood': 1.0,
+    'water leak': 0.9,
+    'leak': 0.8,
+    'broken pipe': 0.9,
+    'no heat': 0.8,
+    'no electricity': 0.9,
+    'break in': 1.0,
+    'broken': 0.6,
+    'not working': 0.5,
+    'health and safety': 0.9,
+    'injuries': 0.8,
+    'damage': 0.7
+}
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    weight: float
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """Finds every occurrence of a set of weighted keywords in one pass of one compiled regex
+
+    Keywords match whole words, with plural and tense endings ('leaks',
+    'flooded', 'urgently'), and the words of a phrase may be split across
+    lines. A keyword only needs its own ends to border non-word characters,
+    so one ending in punctuation such as 'c++' matches too. The keywords are compiled into a prefix tree, so the regex engine
+    steps through the text once instead of trying every keyword at every word.
+    The longest keyword wins, so 'water leak' is reported instead of the
+    'leak' inside it, and carries the higher of the two weights.
+    """
+
+    # (?!\w) rather than \b, which could never follow a keyword that ends in punctuation
+    SUFFIX = r'(?:s|es|d|ed|ing|ly)?(?!\w)'
+
+    def __init__(self, weights: Dict[str, float]):
+        keywords = {' '.join(keyword.lower().split()): float(weight)
+                    for keyword, weight in weights.items() if keyword and keyword.strip()}
+        # A single pass never reports the keywords inside a longer one, so the phrase takes their weight
+        self.weights = {
+            keyword: max(weight for inner, weight in keywords.items()
+                         if inner == keyword or re.search(rf'(?<!\w){re.escape(inner)}(?!\w)', keyword))
+            for keyword in keywords
+        }
+        # No leading \b: it would stop the regex engine from skipping ahead to a keyword's first letter,
+        # so the start of each match is checked in scan() instead
+        tree = self._prefix_tree(self.weights) if self.weights else None
+        self._pattern = re.compile(f"({tree}){self.SUFFIX}") if tree else None
+        self._pattern_ignorecase = re.compile(f"({tree}){self.SUFFIX}", re.IGNORECASE) if tree else None
+
+    def __len__(self):
+        return len(self.weights)
+
+    @classmethod
+    def _prefix_tree(cls, keywords) -> str:
+        """Regex alternation of the keywords factored by common prefix, longest alternative first"""
+        root = {}
+        for keyword in keywords:
+            node = root
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node) -> str:
+            branches = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                        for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # A keyword ending here is the shorter alternative; the greedy ? tries the longer one first
+            return f"(?:{pattern})?" if '' in node else pattern
+
+        return build(root)
+
+    def _matches(self, text: str):
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Lowercasing changed the length (e.g. dotted capital I), so match case-insensitively in place
+            lowered, pattern = text, self._pattern_ignorecase
+        else:
+            pattern = self._pattern
+        for match in pattern.finditer(lowered):
+            start = match.start()
+            if start and (lowered[start - 1].isalnum() or lowered[start - 1] == '_'):
+                continue
+            yield match
+
+    def scan(self, text: str) -> List[KeywordHit]:
+        """Every keyword occurrence in text, in order, with its position"""
+        if self._pattern is None or not text:
+            return []
+        weights = self.weights
+        hits = []
+        for match in self._matches(text):
+            keyword = match.group(1).lower()
+            if keyword not in weights:
+                keyword = ' '.join(keyword.split())
+            hits.append(KeywordHit(keyword, weights[keyword], match.start(), match.end()))
+        return hits
+
+    def score(self, text: str) -> float:
+        """Highest weight among the keywords in text, 0.0 if none"""
+        return max((hit.weight for hit in self.scan(text)), default=0.0)
+
+    def search(self, text: str) -> bool:
+        """Whether any keyword appears in text"""
+        if self._pattern is None or not text:
+            return False
+        return next(self._matches(text), None) is not None
+
+
+class UrgencyScanner:
+    """Urgency keyword scanner with weights from the urgency_keywords table
+
+    Rows override the weight of a built-in keyword or add a new one, and an
+    inactive row removes a keyword. The matcher is compiled once and rebuilt
+    when the table changes, checked at most every reload_seconds. Without an
+    app context the current keywords keep being used.
+    """
+
+    def __init__(self, reload_seconds: float = None):
+        self.reload_seconds = reload_seconds if reload_seconds is not None else float(
+            os.environ.get('URGENCY_KEYWORDS_RELOAD_SECONDS', 60))
+        self._reload_lock = threading.Lock()
+        self._matcher = KeywordMatcher(DEFAULT_KEYWORDS)
+        self._signature = None
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        self._maybe_reload()
+        return self._matcher
+
+    def scan(self, text: str) -> List[KeywordHit]:
+        return self.matcher.scan(text)
+
+    def score(self, text: str) -> float:
+        return self.matcher.score(text)
+
+    def reload(self):
+        """Pick up database changes now, or on the next scan when there is no app context"""
+        self._checked_at = 0.0
+        self._maybe_reload()
+
+    def _maybe_reload(self):
+        if not has_app_context() or time.monotonic() - self._checked_at < self.reload_seconds:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+
+        try:
+            self._checked_at = time.monotonic()
+            rows = UrgencyKeyword.query.order_by(UrgencyKeyword.id).all()
+            signature = tuple((row.keyword, row.weight, row.is_active) for row in rows)
+            if signature != self._signature:
+                weights = dict(DEFAULT_KEYWORDS)
+                for row in rows:
+                    keyword = ' '.join(row.keyword.lower().split())
+                    if row.is_active is False:
+                        weights.pop(keyword, None)
+                    else:
+                        weights[keyword] = row.weight
+                self._matcher = KeywordMatcher(weights)
+                self._signature = signature
+                self.reloads += 1
+                logger.info(f"Urgency keywords loaded: {len(self._matcher)} keywords, {len(rows)} from the database")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Urgency keywords reload failed: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def snapshot(self) -> Dict:
+        return {
+            'keywords': dict(sorted(self._matcher.weights.items())),
+            'reloads': self.reloads,
+            'reload_seconds': self.reload_seconds,
+        }
+
+
+# Shared by the classifier and the ingestion priority ranking
+urgency_scanner = UrgencyScanner()
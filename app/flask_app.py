@@ -1,3 +1,4 @@
+import os
 import logging
 from app import create_app, db  # Import both create_app AND db
 from app.services.background_service import BackgroundService
@@ -13,12 +14,16 @@ app = create_app()
 __all__ = ['app', 'db']
 
 if __name__ == '__main__':
-    # Start background email processing
-    try:
-        background_service = BackgroundService()
-        background_service.start()
-    except Exception as e:
-        logging.error(f"Failed to start background service: {e}")
+    # Background processing runs here only for local development; in production set
+    # INLINE_WORKER=0 and run `python -m app.worker` as its own process.
+    # The reloader's parent process only watches files, so it never starts one.
+    inline_worker = os.environ.get('INLINE_WORKER', '1') == '1'
+    if inline_worker and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        try:
+            background_service = BackgroundService(app)
+            background_service.start()
+        except Exception as e:
+            logging.error(f"Failed to start background service: {e}")
     
     # Run the Flask app
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -61,6 +61,9 @@ def run_migrations():
             # Add missing columns if they don't exist
             "ALTER TABLE classified_emails ADD COLUMN is_archived BOOLEAN DEFAULT 0",
             "ALTER TABLE classified_emails ADD COLUMN is_important BOOLEAN DEFAULT 0",
+            "ALTER TABLE processing_logs ADD COLUMN lag_stats TEXT",
+            "ALTER TABLE email_categories ADD COLUMN sender_patterns TEXT",
+            "ALTER TABLE email_categories ADD COLUMN domain_patterns TEXT",
             
             # Update existing NULL values
             "UPDATE classified_emails SET is_archived = 0 WHERE is_archived IS NULL",
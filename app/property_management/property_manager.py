@@ -9,8 +9,14 @@ logger = logging.getLogger(__name__)
 class PropertyManager:
     """Handles property-related email processing and management"""
 
-    def link_email_to_property(self, email_id: int, classification: Dict) -> bool:
-        """Link an email to a property and create maintenance request if needed"""
+    def link_email_to_property(self, email_id: int, classification: Dict, commit: bool = True,
+                               email: Email = None, classified: ClassifiedEmail = None) -> bool:
+        """Link an email to a property and create maintenance request if needed
+
+        With commit=False the work joins the caller's transaction and errors are
+        raised so the caller can decide what to roll back. Passing the email and
+        classification rows saves looking them up again.
+        """
         try:
             property_address = classification.get('extracted_info', {}).get('property_address')
             if not property_address:
@@ -20,17 +26,20 @@ class PropertyManager:
             property_obj = self._find_or_create_property(property_address, classification)
 
             # Update classification with property link
-            self._update_classification_with_property(email_id, property_obj.address)
+            self._update_classification_with_property(email_id, property_obj.address, classified)
 
             # Create maintenance request if it's a maintenance email
             if classification.get('category') == 'Maintenance Requests':
-                self._create_maintenance_request(email_id, property_obj.id, classification)
+                self._create_maintenance_request(email_id, property_obj.id, classification, email)
 
-            db.session.commit()
+            if commit:
+                db.session.commit()
             logger.info(f"Linked email {email_id} to property {property_obj.address}")
             return True
 
         except Exception as e:
+            if not commit:
+                raise
             logger.error(f"Error linking email to property: {e}")
             db.session.rollback()
             return False
@@ -55,15 +64,19 @@ class PropertyManager:
 
         return property_obj
 
-    def _update_classification_with_property(self, email_id: int, property_address: str):
+    def _update_classification_with_property(self, email_id: int, property_address: str,
+                                             classified_email: ClassifiedEmail = None):
         """Update email classification with property information"""
-        classified_email = ClassifiedEmail.query.filter_by(email_id=email_id).first()
+        if classified_email is None:
+            classified_email = ClassifiedEmail.query.filter_by(email_id=email_id).first()
         if classified_email:
             classified_email.property_address = property_address
 
-    def _create_maintenance_request(self, email_id: int, property_id: int, classification: Dict):
+    def _create_maintenance_request(self, email_id: int, property_id: int, classification: Dict,
+                                    email: Email = None):
         """Create maintenance request for maintenance emails"""
-        email = Email.query.get(email_id)
+        if email is None:
+            email = Email.query.get(email_id)
         if not email:
             return
 
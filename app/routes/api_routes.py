@@ -120,40 +120,14 @@ def mark_replied_basic(email_id):
 @api_bp.route('/process_emails', methods=['POST'])
 @add_security_headers()
 def process_emails():
-    """Process new emails from Gmail inbox"""
+    """Queue processing of new emails from Gmail inbox"""
     try:
         print("=== PROCESSING NEW EMAILS API CALLED ===")
         
-        # Import processing service
-        try:
-            from app.services.processing_service import ProcessingService
-            processing_service = ProcessingService()
-            print("✅ Using ProcessingService")
-        except ImportError as e:
-            print(f"ProcessingService not available ({e}), using EmailProcessor")
-            # Fallback: import email processor directly
-            try:
-                from app.email_processor import EmailProcessor
-                email_processor = EmailProcessor()
-                
-                # Process emails directly
-                result = email_processor.process_new_emails(hours_back=24)
-                print(f"✅ EmailProcessor result: {result}")
-                return jsonify(result)
-                
-            except ImportError as e2:
-                print(f"EmailProcessor also not available: {e2}")
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Email processing components not available: {e2}',
-                    'processed': 0,
-                    'new': 0,
-                    'errors': 1
-                })
-        
-        # Use processing service
-        result = processing_service.process_new_emails(hours_back=24)
-        print(f"✅ ProcessingService result: {result}")
+        # The job worker does the processing; a second click joins the queued job
+        from app.services.job_queue import job_queue
+        result = job_queue.enqueue('process_new_emails', {'hours_back': 24}, dedupe_key='process_new_emails')
+        print(f"✅ Queued new email processing: {result}")
         return jsonify(result)
         
     except Exception as e:
@@ -169,44 +143,13 @@ def process_emails():
 @api_bp.route('/process_emails_historical', methods=['POST'])
 @add_security_headers()
 def process_emails_historical():
-    """Process historical emails (last 2 months)"""
+    """Queue processing of historical emails (last 2 months)"""
     try:
         print("=== PROCESSING HISTORICAL EMAILS API CALLED ===")
         
-        # Import processing service
-        try:
-            from app.services.processing_service import ProcessingService
-            processing_service = ProcessingService()
-            print("✅ Using ProcessingService for historical")
-        except ImportError as e:
-            print(f"ProcessingService not available ({e}), using EmailProcessor")
-            # Fallback: import email processor directly
-            try:
-                from app.email_processor import EmailProcessor
-                email_processor = EmailProcessor()
-                
-                # Start background processing
-                import threading
-                def background_process():
-                    try:
-                        result = email_processor.process_new_emails(hours_back=1440)  # 60 days
-                        print(f"Historical processing completed: {result}")
-                    except Exception as e:
-                        print(f"Historical processing error: {e}")
-                
-                thread = threading.Thread(target=background_process)
-                thread.start()
-                
-                return jsonify({'status': 'processing_started'})
-                
-            except ImportError as e2:
-                print(f"EmailProcessor also not available: {e2}")
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Email processing components not available: {e2}'
-                })
+        from app.services.processing_service import ProcessingService
+        processing_service = ProcessingService()
         
-        # Use processing service
         result = processing_service.process_historical_emails(hours_back=1440)
         print(f"✅ Historical ProcessingService result: {result}")
         return jsonify(result)
@@ -225,13 +168,17 @@ def processing_status():
     try:
         # Check if processing is active
         try:
-            from app.services.processing_service import ProcessingService
-            processing_service = ProcessingService()
+            from app.services.backfill_service import backfill_service
+            from app.services.job_queue import job_queue
             
-            # Check if processing is active
-            is_processing = hasattr(processing_service, '_processing_active') and processing_service._processing_active
+            # Historical backfill progress is checkpointed in the database
+            progress = backfill_service.progress()
+            is_processing = progress['is_processing'] or job_queue.has_active(
+                ['process_new_emails', 'sync_mailbox', 'historical_backfill'])
             
             return jsonify({
+                **progress,
+                'backfill_status': progress['status'],
                 'is_processing': is_processing,
                 'status': 'active' if is_processing else 'idle'
             })
@@ -251,6 +198,262 @@ def processing_status():
             'message': str(e)
         })
 
+@api_bp.route('/gmail_fetch_metrics', methods=['GET'])
+@add_security_headers()
+def gmail_fetch_metrics():
+    """Get Gmail fetch concurrency and throttling counters for this process"""
+    try:
+        from app.email_processing.gmail_fetcher import fetch_metrics, gmail_quota
+
+        metrics = fetch_metrics.snapshot()
+        metrics['quota_units_per_second'] = gmail_quota.rate
+        return jsonify(metrics)
+
+    except Exception as e:
+        print(f"Gmail fetch metrics error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/classification_metrics', methods=['GET'])
+@add_security_headers()
+def classification_metrics():
+    """Get OpenAI classification engine limits, retries, latency, cache, local model and rule counters for this process"""
+    try:
+        from app.email_processing.classification_engine import classification_engine
+        from app.email_processing.classification_cache import classification_cache
+        from app.email_processing.local_classifier import local_classifier
+        from app.email_processing.rule_engine import rule_engine
+
+        metrics = classification_engine.snapshot()
+        metrics['cache'] = classification_cache.snapshot()
+        metrics['local_model'] = local_classifier.snapshot()
+        metrics['rules'] = rule_engine.snapshot()
+        return jsonify(metrics)
+
+    except Exception as e:
+        print(f"Classification metrics error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/category_rules', methods=['GET'])
+@add_security_headers()
+def category_rules():
+    """Get every category with its sender, domain and keyword rules"""
+    try:
+        from app.database_models import EmailCategories
+        from app.email_processing.rule_engine import rule_engine
+
+        categories = EmailCategories.query.order_by(EmailCategories.id).all()
+        return jsonify({
+            'categories': [category.to_dict() for category in categories],
+            'engine': rule_engine.snapshot()
+        })
+
+    except Exception as e:
+        print(f"Category rules error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/category_rules/<int:category_id>', methods=['POST'])
+@add_security_headers()
+@require_auth(require_csrf=True)
+def update_category_rules(category_id):
+    """Update a category's sender, domain and keyword rules; other processes pick them up on their next reload"""
+    try:
+        from app import db
+        from app.database_models import EmailCategories
+        from app.email_processing.rule_engine import rule_engine
+
+        category = db.session.get(EmailCategories, category_id)
+        if not category:
+            return jsonify({'status': 'error', 'message': 'Category not found'}), 404
+
+        data = request.get_json(silent=True) or {}
+        setters = {
+            'sender_patterns': category.set_sender_patterns,
+            'domain_patterns': category.set_domain_patterns,
+            'keywords': category.set_keywords,
+        }
+        for field, setter in setters.items():
+            if field in data:
+                values = data[field]
+                if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                    return jsonify({'status': 'error', 'message': f"{field} must be a list of strings"}), 400
+                setter([value.strip() for value in values if value.strip()])
+
+        if 'priority_default' in data:
+            if data['priority_default'] not in ('Critical', 'High', 'Medium', 'Low'):
+                return jsonify({'status': 'error', 'message': 'priority_default must be Critical, High, Medium or Low'}), 400
+            category.priority_default = data['priority_default']
+        if 'is_active' in data:
+            category.is_active = bool(data['is_active'])
+
+        db.session.commit()
+        rule_engine.reload()
+        return jsonify({'status': 'success', 'category': category.to_dict()})
+
+    except Exception as e:
+        print(f"Category rules update error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/urgency_keywords', methods=['GET'])
+@add_security_headers()
+def urgency_keywords():
+    """Get the urgency keyword weights in effect and the database rows behind them"""
+    try:
+        from app.database_models import UrgencyKeyword
+        from app.email_processing.urgency_scanner import urgency_scanner
+
+        urgency_scanner.reload()
+        return jsonify({
+            'rows': [row.to_dict() for row in UrgencyKeyword.query.order_by(UrgencyKeyword.keyword).all()],
+            'scanner': urgency_scanner.snapshot()
+        })
+
+    except Exception as e:
+        print(f"Urgency keywords error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/urgency_keywords', methods=['POST'])
+@add_security_headers()
+@require_auth(require_csrf=True)
+def update_urgency_keyword():
+    """Set an urgency keyword's weight, or deactivate it; other processes pick it up on their next reload"""
+    try:
+        from app import db
+        from app.database_models import UrgencyKeyword
+        from app.email_processing.urgency_scanner import urgency_scanner
+
+        data = request.get_json(silent=True) or {}
+        keyword = ' '.join(str(data.get('keyword', '')).lower().split())
+        if not keyword:
+            return jsonify({'status': 'error', 'message': 'keyword is required'}), 400
+        if not any(char.isalnum() for char in keyword):
+            return jsonify({'status': 'error', 'message': 'keyword must contain a letter or digit'}), 400
+        try:
+            weight = float(data.get('weight', 0.8))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'weight must be a number'}), 400
+        if not 0.0 <= weight <= 1.0:
+            return jsonify({'status': 'error', 'message': 'weight must be between 0 and 1'}), 400
+        # bool('false') is True, so strings are read by value
+        is_active = data.get('is_active', True)
+        if isinstance(is_active, str):
+            is_active = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}.get(
+                is_active.strip().lower())
+        if not isinstance(is_active, bool):
+            return jsonify({'status': 'error', 'message': 'is_active must be true or false'}), 400
+
+        row = UrgencyKeyword.query.filter_by(keyword=keyword).first()
+        if not row:
+            row = UrgencyKeyword(keyword=keyword)
+            db.session.add(row)
+        row.weight = weight
+        row.is_active = is_active
+        db.session.commit()
+
+        urgency_scanner.reload()
+        return jsonify({'status': 'success', 'keyword': row.to_dict()})
+
+    except Exception as e:
+        print(f"Urgency keyword update error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/pipeline_metrics', methods=['GET'])
+@add_security_headers()
+def pipeline_metrics():
+    """Get per-stage throughput for the most recent ingestion pipeline run"""
+    try:
+        from app.email_processing.pipeline import pipeline_metrics as metrics
+
+        return jsonify(metrics.snapshot())
+
+    except Exception as e:
+        print(f"Pipeline metrics error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/ingestion_lag', methods=['GET'])
+@add_security_headers()
+def ingestion_lag():
+    """Get lag percentiles from Gmail delivery to dashboard visibility for recent sync runs"""
+    try:
+        from app.database_models import ProcessingLog
+
+        limit = min(request.args.get('runs', 20, type=int), 200)
+        logs = ProcessingLog.query.filter(
+            ProcessingLog.lag_stats.isnot(None)
+        ).order_by(ProcessingLog.started_at.desc()).limit(limit).all()
+
+        runs = [{
+            'id': log.id,
+            'started_at': log.started_at.isoformat() if log.started_at else None,
+            'completed_at': log.completed_at.isoformat() if log.completed_at else None,
+            'emails_new': log.emails_new,
+            'lag_stats': log.get_lag_stats()
+        } for log in logs]
+
+        return jsonify({'latest': runs[0] if runs else None, 'runs': runs})
+
+    except Exception as e:
+        print(f"Ingestion lag error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/scheduler_metrics', methods=['GET'])
+@add_security_headers()
+def scheduler_metrics():
+    """Get the adaptive sync scheduler's current interval and recent decisions"""
+    try:
+        from app.services.adaptive_scheduler import sync_scheduler
+
+        return jsonify(sync_scheduler.snapshot())
+
+    except Exception as e:
+        print(f"Scheduler metrics error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/sync_now', methods=['POST'])
+@add_security_headers()
+def sync_now():
+    """Run a mailbox sync now instead of waiting for the next scheduled one"""
+    try:
+        from app.services.adaptive_scheduler import sync_scheduler
+        from app.services.job_queue import job_queue
+
+        # The queued job reaches a worker in any process; the trigger restarts this process's timer
+        result = job_queue.enqueue('sync_mailbox', dedupe_key='sync_mailbox', priority=10)
+        sync_scheduler.trigger('api')
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"Sync trigger error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/jobs', methods=['GET'])
+@add_security_headers()
+def jobs():
+    """Get job queue counts and recent dead-lettered jobs"""
+    try:
+        from app.services.job_queue import job_queue
+
+        return jsonify(job_queue.stats())
+
+    except Exception as e:
+        print(f"Job queue stats error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@api_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@add_security_headers()
+@require_auth(require_csrf=True)
+def retry_job(job_id):
+    """Requeue a dead-lettered job"""
+    try:
+        from app.services.job_queue import job_queue
+
+        result = job_queue.retry_dead(job_id)
+        status_codes = {'not_found': 404, 'not_retryable': 409}
+        return jsonify(result), status_codes.get(result['status'], 200)
+
+    except Exception as e:
+        print(f"Job retry error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @api_bp.route('/test')
 @add_security_headers()
 def test_api():
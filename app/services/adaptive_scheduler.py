@@ -0,0 +1,127 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveScheduler:
+    """Picks the delay before the next mailbox sync from what recent runs found
+
+    Critical mail drops the interval straight to the minimum, other new mail
+    halves it, and an idle run stretches it by backoff_factor up to the
+    maximum. Errors retry after error_interval. trigger() cuts the current
+    wait short. Every decision is kept for the metrics endpoint.
+    """
+
+    def __init__(self, min_interval: float = None, max_interval: float = None, backoff_factor: float = None,
+                 error_interval: float = None, history_size: int = 50):
+        self.min_interval = min_interval or float(os.environ.get('SYNC_MIN_INTERVAL_SECONDS', 60))
+        self.max_interval = max_interval or float(os.environ.get('SYNC_MAX_INTERVAL_SECONDS', 1800))
+        self.backoff_factor = backoff_factor or float(os.environ.get('SYNC_BACKOFF_FACTOR', 2.0))
+        self.error_interval = error_interval or float(os.environ.get('SYNC_ERROR_INTERVAL_SECONDS', 300))
+        self.interval = self.min_interval
+
+        self._lock = threading.Lock()
+        self._trigger = threading.Event()
+        self._trigger_reason = None
+        self.decisions = deque(maxlen=history_size)
+        self.reasons = Counter()
+        self.runs = 0
+        self.triggered_runs = 0
+        self.seconds_waited = 0.0
+        self.next_run_at = None
+
+    def _clamp(self, interval: float) -> float:
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def record_run(self, result: Dict, critical: int = 0) -> float:
+        """Update the interval from a finished run and return it"""
+        new = result.get('new', 0) or 0
+        with self._lock:
+            if result.get('status') == 'error':
+                reason = 'error'
+                interval = self._clamp(self.error_interval)
+            elif result.get('status') == 'skipped':
+                # Another worker ran it; nothing learned about the mailbox
+                reason = 'skipped'
+                interval = self.interval
+            elif critical:
+                reason = 'critical'
+                interval = self.min_interval
+            elif new:
+                reason = 'new_mail'
+                interval = self._clamp(self.interval / self.backoff_factor)
+            else:
+                reason = 'idle'
+                interval = self._clamp(self.interval * self.backoff_factor)
+
+            # An error interval is a one-off retry, it should not reset the learned cadence
+            if reason not in ('error', 'skipped'):
+                self.interval = interval
+            self.runs += 1
+            self.reasons[reason] += 1
+            self.next_run_at = datetime.now() + timedelta(seconds=interval)
+            self.decisions.append({
+                'at': datetime.now().isoformat(),
+                'reason': reason,
+                'new': new,
+                'critical': critical,
+                'interval_seconds': round(interval, 1)
+            })
+
+        logger.info(f"Next sync in {interval:.0f}s ({reason}: {new} new, {critical} critical)")
+        return interval
+
+    def trigger(self, reason: str = 'manual'):
+        """Run the next sync now instead of waiting out the interval"""
+        self._trigger_reason = reason
+        self._trigger.set()
+
+    def wait(self, interval: float, stop_event: threading.Event = None) -> Optional[str]:
+        """Sleep until the interval passes, a trigger arrives or stop_event is set
+
+        Returns 'timer', the trigger reason, or None when stopping.
+        """
+        deadline = time.monotonic() + interval
+        start = time.monotonic()
+        try:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                if self._trigger.is_set():
+                    self._trigger.clear()
+                    with self._lock:
+                        self.triggered_runs += 1
+                    return self._trigger_reason or 'manual'
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return 'timer'
+                # Poll so a stop or a trigger is noticed within a second
+                self._trigger.wait(min(1.0, remaining))
+        finally:
+            with self._lock:
+                self.seconds_waited += time.monotonic() - start
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'interval_seconds': round(self.interval, 1),
+                'min_interval_seconds': self.min_interval,
+                'max_interval_seconds': self.max_interval,
+                'backoff_factor': self.backoff_factor,
+                'error_interval_seconds': self.error_interval,
+                'runs': self.runs,
+                'triggered_runs': self.triggered_runs,
+                # Average wait between runs; lower means fresher mail but more API and OpenAI spend
+                'average_wait_seconds': round(self.seconds_waited / self.runs, 1) if self.runs else None,
+                'decisions_by_reason': dict(self.reasons),
+                'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+                'recent_decisions': list(self.decisions)[-10:]
+            }
+
+
+sync_scheduler = AdaptiveScheduler()
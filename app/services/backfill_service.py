@@ -0,0 +1,255 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import func
+
+from app import db
+from app.database_models import BackfillRun, BackfillWindow
+
+logger = logging.getLogger(__name__)
+
+class BackfillService:
+    """Resumable historical import, checkpointed per time window in the database
+
+    start() only enqueues a historical_backfill job; a job worker calls
+    execute(), which holds the job lease for the whole run.
+    """
+
+    WINDOW_HOURS = 24
+
+    # Window progress is written every this many fetched messages
+    PROGRESS_EVERY = 50
+
+    # A running run whose heartbeat is older than this is treated as interrupted
+    HEARTBEAT_TIMEOUT = timedelta(minutes=2)
+
+    def __init__(self, max_parallel: int = None):
+        self.max_parallel = max_parallel or int(os.environ.get('BACKFILL_MAX_PARALLEL_WINDOWS', 2))
+
+    def start(self, days: int = 60) -> Dict:
+        """Queue a backfill of the last `days` days; repeated requests join the queued one"""
+        from app.services.job_queue import job_queue
+
+        result = job_queue.enqueue('historical_backfill', {'days': days}, dedupe_key='historical_backfill')
+        if result['status'] == 'queued':
+            return {'status': 'processing_started', 'job_id': result['job_id']}
+        if result['status'] == 'already_queued':
+            return {'status': 'already_processing', 'job_id': result['job_id'], 'progress': self.progress()}
+        return result
+
+    def execute(self, days: int = 60) -> Dict:
+        """Run the backfill to the end in the calling thread, resuming any unfinished run"""
+        from app.email_processor import EmailProcessor
+        from app.email_processing.mailbox_lease import MailboxBusyError
+
+        processor = EmailProcessor()
+        try:
+            with processor.mailbox_lease(scope='backfill'):
+                return self._execute(processor, days)
+        except MailboxBusyError as e:
+            logger.info(f"Skipping backfill: {e}")
+            return {'status': 'skipped', 'reason': 'mailbox_busy', 'holder': e.holder}
+
+    def _execute(self, processor, days: int) -> Dict:
+        from flask import current_app
+        app = current_app._get_current_object()
+
+        run = BackfillRun.query.filter(
+            BackfillRun.status.in_(['pending', 'running', 'failed'])
+        ).order_by(BackfillRun.id.desc()).first()
+
+        if run:
+            # Windows cut off by a restart or a failure are simply run again
+            BackfillWindow.query.filter(
+                BackfillWindow.run_id == run.id,
+                BackfillWindow.status.in_(['running', 'failed'])
+            ).update({'status': 'pending', 'processed': 0, 'new': 0, 'errors': 0},
+                     synchronize_session=False)
+            logger.info(f"Resuming backfill run {run.id}")
+        else:
+            run = self._create_run(days)
+            logger.info(f"Starting backfill run {run.id} over {days} days")
+
+        totals = self._totals(run.id)
+        run.status = 'running'
+        run.started_at = run.started_at or datetime.now()
+        run.resumed_at = datetime.now()
+        run.heartbeat_at = datetime.now()
+        run.processed_at_resume = totals['processed']
+        run.windows_done_at_resume = totals['windows_done']
+        db.session.commit()
+
+        run_id = run.id
+        self._run(app, processor, run_id)
+
+        db.session.expire_all()
+        progress = self.progress(run_id)
+        if progress['status'] != 'completed':
+            # Failed windows are retried when the job is retried
+            return {'status': 'error', 'message': f"{progress['windows_failed']} backfill windows failed",
+                    **progress}
+        return {**progress, 'status': 'success'}
+
+    def _create_run(self, days: int) -> BackfillRun:
+        """Create a run with one pending window per WINDOW_HOURS, newest first
+
+        The run stops where the sync's full resync window begins. The backfill
+        holds its own lease scope and runs alongside the sync, so mail the sync
+        may also fetch is left to the sync and is never classified twice.
+        """
+        from app.email_processor import EmailProcessor
+
+        now = datetime.now()
+        range_end = now - timedelta(hours=EmailProcessor.FULL_RESYNC_HOURS)
+        range_start = min(now - timedelta(days=days), range_end)
+        run = BackfillRun(range_start=range_start, range_end=range_end, window_hours=self.WINDOW_HOURS)
+        db.session.add(run)
+        db.session.flush()
+
+        window_end = range_end
+        while window_end > range_start:
+            window_start = max(range_start, window_end - timedelta(hours=self.WINDOW_HOURS))
+            db.session.add(BackfillWindow(run_id=run.id, window_start=window_start, window_end=window_end))
+            window_end = window_start
+        return run
+
+    def _is_alive(self, run: BackfillRun) -> bool:
+        """A recent heartbeat means a worker is still working on the run"""
+        return run.heartbeat_at is not None and datetime.now() - run.heartbeat_at < self.HEARTBEAT_TIMEOUT
+
+    def _run(self, app, processor, run_id: int):
+        """Work through the pending windows of a run, up to max_parallel at a time"""
+        with app.app_context():
+            try:
+                window_ids = [w.id for w in BackfillWindow.query.filter_by(run_id=run_id, status='pending')
+                              .order_by(BackfillWindow.window_end.desc())]
+
+                with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='backfill-window') as pool:
+                    list(pool.map(lambda window_id: self._run_window(app, processor, run_id, window_id), window_ids))
+
+                run = BackfillRun.query.get(run_id)
+                failed = BackfillWindow.query.filter_by(run_id=run_id, status='failed').count()
+                run.status = 'failed' if failed else 'completed'
+                run.completed_at = datetime.now()
+                db.session.commit()
+                logger.info(f"Backfill run {run_id} {run.status}: {self._totals(run_id)}")
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Backfill run {run_id} failed: {e}")
+                BackfillRun.query.filter_by(id=run_id).update({'status': 'failed'})
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def _run_window(self, app, processor, run_id: int, window_id: int):
+        """Process one window in its own app context and record the checkpoint"""
+        with app.app_context():
+            try:
+                window = BackfillWindow.query.get(window_id)
+                window.status = 'running'
+                window.attempts = (window.attempts or 0) + 1
+                window.started_at = datetime.now()
+                db.session.commit()
+
+                fetched = [0]
+
+                def on_message(message):
+                    fetched[0] += 1
+                    if fetched[0] % self.PROGRESS_EVERY == 0:
+                        self._record_progress(run_id, window_id, fetched[0])
+
+                result = processor.process_window(window.window_start, window.window_end, on_message=on_message)
+
+                # Per-message errors are recorded, the window still counts as done
+                window.status = 'done'
+                window.processed = result['processed']
+                window.new = result['new']
+                window.errors = result['errors']
+                window.last_error = '\n'.join(result['error_messages'][-5:]) or None
+                window.completed_at = datetime.now()
+                BackfillRun.query.filter_by(id=run_id).update({'heartbeat_at': datetime.now()})
+                db.session.commit()
+                logger.info(f"Backfill window {window.window_start:%Y-%m-%d %H:%M} done: "
+                            f"{result['processed']} processed, {result['new']} new")
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Backfill window {window_id} failed: {e}")
+                BackfillWindow.query.filter_by(id=window_id).update({
+                    'status': 'failed', 'last_error': str(e), 'completed_at': datetime.now()
+                })
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def _record_progress(self, run_id: int, window_id: int, processed: int):
+        """Write in-window progress and the run heartbeat"""
+        try:
+            BackfillWindow.query.filter_by(id=window_id).update({'processed': processed})
+            BackfillRun.query.filter_by(id=run_id).update({'heartbeat_at': datetime.now()})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not record backfill progress: {e}")
+
+    @staticmethod
+    def _totals(run_id: int) -> Dict:
+        """Window counts and message totals, aggregated in SQL"""
+        rows = db.session.query(
+            BackfillWindow.status,
+            func.count(BackfillWindow.id),
+            func.coalesce(func.sum(BackfillWindow.processed), 0),
+            func.coalesce(func.sum(BackfillWindow.new), 0),
+            func.coalesce(func.sum(BackfillWindow.errors), 0)
+        ).filter(BackfillWindow.run_id == run_id).group_by(BackfillWindow.status).all()
+
+        windows = {status: count for status, count, _, _, _ in rows}
+        return {
+            'windows_total': sum(windows.values()),
+            'windows_done': windows.get('done', 0),
+            'windows_running': windows.get('running', 0),
+            'windows_failed': windows.get('failed', 0),
+            'processed': sum(row[2] for row in rows),
+            'new': sum(row[3] for row in rows),
+            'errors': sum(row[4] for row in rows),
+        }
+
+    def progress(self, run_id: Optional[int] = None) -> Dict:
+        """Progress of the latest (or given) run, read from the database"""
+        run = BackfillRun.query.get(run_id) if run_id else BackfillRun.query.order_by(BackfillRun.id.desc()).first()
+        if not run:
+            return {'status': 'idle', 'is_processing': False}
+
+        totals = self._totals(run.id)
+        active = run.status == 'running' and self._is_alive(run)
+
+        rate = None
+        eta_seconds = None
+        if run.resumed_at:
+            end = datetime.now() if active else (run.completed_at or run.heartbeat_at or datetime.now())
+            elapsed = max((end - run.resumed_at).total_seconds(), 0.001)
+            rate = round((totals['processed'] - (run.processed_at_resume or 0)) / elapsed, 2)
+
+            windows_done = totals['windows_done'] - (run.windows_done_at_resume or 0)
+            remaining = totals['windows_total'] - totals['windows_done']
+            if active and windows_done:
+                eta_seconds = int(remaining * elapsed / windows_done)
+
+        return {
+            'run_id': run.id,
+            'status': run.status if active or run.status != 'running' else 'interrupted',
+            'is_processing': active,
+            'range_start': run.range_start.isoformat(),
+            'range_end': run.range_end.isoformat(),
+            'messages_per_second': rate,
+            'eta_seconds': eta_seconds,
+            **totals
+        }
+
+
+# Status lives in the database, so any process can report progress
+backfill_service = BackfillService()
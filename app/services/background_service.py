@@ -1,48 +1,106 @@
+import os
 import threading
-import time
 import logging
-from app.services.processing_service import ProcessingService
+from app.services.job_queue import job_queue, JobWorker
+from app.services.adaptive_scheduler import sync_scheduler
 
 logger = logging.getLogger(__name__)
 
 class BackgroundService:
     """Service class for background email processing"""
     
-    def __init__(self):
-        self.processing_service = ProcessingService()
+    def __init__(self, app=None, concurrency: int = None, job_types=None, schedule: bool = True):
+        if app is None:
+            from app import create_app
+            app = create_app()
+        self.app = app
+        self.job_worker = JobWorker(app, concurrency=concurrency, job_types=job_types)
+        self.scheduler = sync_scheduler
+        self.schedule = schedule
+        self.maintenance_interval = float(os.environ.get('MAINTENANCE_INTERVAL_HOURS', 24)) * 3600
         self.running = False
+        self._stop = threading.Event()
+        self._threads = []
     
     def start(self):
-        """Start background email processing every 30 minutes"""
+        """Start the job worker and queue mailbox syncs on the adaptive schedule"""
         if self.running:
             return
         
         self.running = True
-        thread = threading.Thread(target=self._process_loop, daemon=True)
-        thread.start()
+        self._stop.clear()
+        self.job_worker.start()
+        if self.schedule:
+            for target in (self._process_loop, self._maintenance_loop):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self._threads.append(thread)
         logger.info("Background email processing started")
     
-    def stop(self):
-        """Stop background processing"""
+    def stop(self, timeout: float = None):
+        """Stop scheduling and let running jobs finish for up to timeout seconds"""
         self.running = False
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+        self.job_worker.stop(timeout)
         logger.info("Background email processing stopped")
     
+    def _maintenance_loop(self):
+        """Queue housekeeping every MAINTENANCE_INTERVAL_HOURS"""
+        while not self._stop.wait(self.maintenance_interval):
+            try:
+                with self.app.app_context():
+                    try:
+                        job_queue.enqueue('maintenance', dedupe_key='maintenance', priority=-10)
+                    finally:
+                        from app import db
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Error queueing maintenance: {e}")
+    
     def _process_loop(self):
         """Main processing loop"""
         while self.running:
             try:
-                logger.info("Starting scheduled email processing...")
+                logger.info("Queueing scheduled email processing...")
                 
-                result = self.processing_service.process_new_emails()
+                with self.app.app_context():
+                    try:
+                        result, critical = self._run_sync()
+                    finally:
+                        from app import db
+                        db.session.remove()
                 
-                if result['status'] == 'processing_completed':
-                    logger.info(f"Scheduled processing completed: {result}")
-                else:
+                if result['status'] == 'error':
                     logger.warning(f"Scheduled processing had issues: {result}")
+                else:
+                    logger.info(f"Scheduled processing completed: {result}")
                 
-                # Sleep for 30 minutes
-                time.sleep(1800)
+                interval = self.scheduler.record_run(result, critical)
                 
             except Exception as e:
                 logger.error(f"Background processing error: {e}")
-                time.sleep(300)  # Wait 5 minutes on error
\ No newline at end of file
+                interval = self.scheduler.record_run({'status': 'error', 'message': str(e)})
+            
+            reason = self.scheduler.wait(interval, self._stop)
+            if reason and reason != 'timer':
+                logger.info(f"Sync triggered early: {reason}")
+    
+    def _run_sync(self):
+        """Queue a sync, wait for the job worker to finish it, and return its result and critical mail count"""
+        # Only fetch mail added since the last run's history cursor; the job worker runs it
+        queued = job_queue.enqueue('sync_mailbox', dedupe_key='sync_mailbox')
+        if queued['status'] not in ('queued', 'already_queued'):
+            return queued, 0
+        
+        job = job_queue.wait_for(queued['job_id'], timeout=self.scheduler.max_interval, stop_event=self._stop)
+        if job is None:
+            return {'status': 'error', 'message': 'Sync job did not finish in time'}, 0
+        if job['status'] != 'succeeded':
+            return {'status': 'error', 'message': job['last_error']}, 0
+        
+        # Counted by the sync itself, so backfill and other processes' mail never shortens the interval
+        result = job['result'] or {}
+        return result, result.get('critical', 0)
\ No newline at end of file
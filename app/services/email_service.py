@@ -82,27 +82,15 @@ class EmailService:
             # Process attachments
             attachment_files = self._process_attachments(files.getlist('attachments'))
             
-            # Send email
-            if self.email_processor.authenticate_gmail():
-                success = self.email_processor.send_enhanced_email(
-                    to_email=to_email,
-                    cc_emails=cc_emails,
-                    bcc_emails=bcc_emails,
-                    subject=subject,
-                    message_body=message_body,
-                    attachments=attachment_files,
-                    reply_type='compose'
-                )
-                
-                # Clean up temporary files
-                self._cleanup_temp_files(attachment_files)
-                
-                if success:
-                    return {'success': True, 'message': 'Email sent successfully!'}
-                else:
-                    return {'success': False, 'message': 'Failed to send email. Please try again.'}
+            # Hand the send to the worker
+            result = self._queue_send(to_email, cc_emails, bcc_emails, subject, message_body,
+                                      attachment_files, 'compose')
+            
+            if result['status'] == 'queued':
+                return {'success': True, 'message': 'Email queued for sending!'}
             else:
-                return {'success': False, 'message': 'Gmail authentication failed. Please try again.'}
+                self._cleanup_temp_files(attachment_files)
+                return {'success': False, 'message': 'Failed to queue email. Please try again.'}
                 
         except Exception as e:
             logger.error(f"Error sending email: {e}")
@@ -137,43 +125,27 @@ class EmailService:
             # Process attachments
             attachment_files = self._process_attachments(files.getlist('attachments'))
             
-            # Send reply
-            if self.email_processor.authenticate_gmail():
-                success = self.email_processor.send_enhanced_email(
-                    to_email=to_email,
-                    cc_emails=cc_emails,
-                    bcc_emails=bcc_emails,
-                    subject=subject,
-                    message_body=message_body,
-                    attachments=attachment_files,
-                    reply_type=reply_type
-                )
-                
-                # Clean up temporary files
-                self._cleanup_temp_files(attachment_files)
+            # Hand the send to the worker
+            result = self._queue_send(to_email, cc_emails, bcc_emails, subject, message_body,
+                                      attachment_files, reply_type)
+            
+            if result['status'] == 'queued':
+                action_text = {
+                    'reply': 'Reply',
+                    'replyAll': 'Reply All',
+                    'forward': 'Forward'
+                }.get(reply_type, 'Email')
                 
-                if success:
-                    action_text = {
-                        'reply': 'Reply sent',
-                        'replyAll': 'Reply All sent',
-                        'forward': 'Email forwarded'
-                    }.get(reply_type, 'Email sent')
-                    
-                    return {
-                        'success': True,
-                        'message': f'{action_text} successfully!',
-                        'original_email_id': original_email_id
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'message': 'Failed to send email. Please try again.',
-                        'original_email_id': original_email_id
-                    }
+                return {
+                    'success': True,
+                    'message': f'{action_text} queued for sending!',
+                    'original_email_id': original_email_id
+                }
             else:
+                self._cleanup_temp_files(attachment_files)
                 return {
                     'success': False,
-                    'message': 'Gmail authentication failed. Please re-authenticate.',
+                    'message': 'Failed to queue email. Please try again.',
                     'original_email_id': original_email_id
                 }
                 
@@ -185,6 +157,43 @@ class EmailService:
                 'original_email_id': form_data.get('original_email_id')
             }
     
+    def _queue_send(self, to_email: str, cc_emails: str, bcc_emails: str, subject: str,
+                    message_body: str, attachment_files: List[Dict], reply_type: str) -> Dict:
+        """Queue an outbound email for the worker; uploads stay in temp_uploads until it is sent"""
+        from app.services.job_queue import job_queue
+        
+        return job_queue.enqueue('send_email', {
+            'to_email': to_email,
+            'cc_emails': cc_emails,
+            'bcc_emails': bcc_emails,
+            'subject': subject,
+            'message_body': message_body,
+            'attachments': attachment_files,
+            'reply_type': reply_type
+        }, priority=5, max_attempts=3)
+    
+    @staticmethod
+    def send_queued_email(payload: Dict) -> Dict:
+        """Job handler: send an email queued by _queue_send"""
+        email_processor = EmailProcessor()
+        if not email_processor.authenticate_gmail():
+            raise RuntimeError('Gmail authentication failed')
+        
+        success = email_processor.send_enhanced_email(**payload)
+        if not success:
+            # Attachments are kept so the retry can send them
+            raise RuntimeError(f"Failed to send email to {payload['to_email']}")
+        
+        EmailService._cleanup_temp_files(payload.get('attachments') or [])
+        logger.info(f"Sent queued {payload['reply_type']} email to {payload['to_email']}")
+        return {'status': 'sent', 'to_email': payload['to_email']}
+    
+    @staticmethod
+    def discard_queued_email(payload: Dict):
+        """Dead-letter cleanup: remove the temp uploads of a send that will not be retried"""
+        EmailService._cleanup_temp_files(payload.get('attachments') or [])
+        logger.warning(f"Dropped attachments of undeliverable email to {payload.get('to_email')}")
+    
     def validate_and_get_attachment_path(self, filename: str) -> str:
         """Validate attachment access and return file path"""
         # Normalize and validate the path
@@ -353,7 +362,8 @@ class EmailService:
         
         return processed_files
     
-    def _cleanup_temp_files(self, attachment_files: List[Dict]):
+    @staticmethod
+    def _cleanup_temp_files(attachment_files: List[Dict]):
         """Clean up temporary attachment files"""
         for att in attachment_files:
             try:
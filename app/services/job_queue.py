@@ -0,0 +1,449 @@
+import os
+import json
+import time
+import random
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import db
+from app.database_models import ProcessingJob
+
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    """Durable job queue stored in the processing_jobs table
+
+    Workers claim a job with a conditional UPDATE, so two workers can never
+    hold the same job, and keep it by renewing a lease. A job whose lease runs
+    out (the worker died) goes back to the queue. Failed jobs are retried with
+    exponential backoff and dead-lettered after max_attempts.
+    """
+
+    def __init__(self):
+        self.lease_seconds = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+        self.max_attempts = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+        self.backoff_seconds = int(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', 30))
+        self.max_backoff_seconds = int(os.environ.get('JOB_MAX_BACKOFF_SECONDS', 3600))
+
+    def enqueue(self, job_type: str, payload: Dict = None, dedupe_key: str = None, priority: int = 0,
+                max_attempts: int = None, delay_seconds: int = 0) -> Dict:
+        """Add a job; with a dedupe_key, an already queued or running job is returned instead"""
+        try:
+            job = ProcessingJob(
+                job_type=job_type,
+                payload=json.dumps(payload or {}),
+                dedupe_key=dedupe_key,
+                priority=priority,
+                max_attempts=max_attempts or self.max_attempts,
+                run_after=datetime.utcnow() + timedelta(seconds=delay_seconds)
+            )
+            db.session.add(job)
+            db.session.commit()
+            logger.info(f"Enqueued job {job.id} ({job_type})")
+            return {'status': 'queued', 'job_id': job.id}
+
+        except IntegrityError:
+            # The partial unique index on dedupe_key makes this check race-free
+            db.session.rollback()
+            existing = ProcessingJob.query.filter(
+                ProcessingJob.dedupe_key == dedupe_key,
+                ProcessingJob.status.in_(['queued', 'running'])
+            ).first()
+            return {'status': 'already_queued', 'job_id': existing.id if existing else None,
+                    'job_status': existing.status if existing else None}
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error enqueuing {job_type} job: {e}")
+            return {'status': 'error', 'message': str(e)}
+
+    def claim(self, worker_id: str, job_types: List[str] = None) -> Optional[ProcessingJob]:
+        """Lease the next runnable job to worker_id, or return None"""
+        try:
+            self.requeue_expired()
+
+            now = datetime.utcnow()
+            query = db.session.query(ProcessingJob.id).filter(
+                ProcessingJob.status == 'queued',
+                ProcessingJob.run_after <= now
+            )
+            if job_types:
+                query = query.filter(ProcessingJob.job_type.in_(job_types))
+            candidates = [row.id for row in query.order_by(
+                ProcessingJob.priority.desc(), ProcessingJob.run_after, ProcessingJob.id
+            ).limit(5)]
+
+            for job_id in candidates:
+                # Only one worker's UPDATE can still see the job as queued
+                claimed = db.session.execute(
+                    update(ProcessingJob)
+                    .where(ProcessingJob.id == job_id, ProcessingJob.status == 'queued')
+                    .values(status='running', lease_owner=worker_id,
+                            lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                            heartbeat_at=now, started_at=now, attempts=ProcessingJob.attempts + 1)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.session.commit()
+                if claimed:
+                    job = db.session.get(ProcessingJob, job_id, populate_existing=True)
+                    logger.info(f"{worker_id} claimed job {job.id} ({job.job_type}, attempt {job.attempts})")
+                    return job
+            return None
+
+        except OperationalError as e:
+            # Another process holds the SQLite write lock; try again on the next poll
+            db.session.rollback()
+            logger.warning(f"Could not claim job: {e}")
+            return None
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extend the lease; False means the lease was lost to another worker"""
+        try:
+            now = datetime.utcnow()
+            renewed = db.session.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, ProcessingJob.status == 'running',
+                       ProcessingJob.lease_owner == worker_id)
+                .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            return bool(renewed)
+
+        except OperationalError as e:
+            db.session.rollback()
+            logger.warning(f"Job {job_id} heartbeat failed: {e}")
+            return True
+
+    def complete(self, job_id: int, worker_id: str, result: Dict = None) -> bool:
+        """Mark a job succeeded, if worker_id still holds it"""
+        done = self._finish(job_id, worker_id, status='succeeded', result=json.dumps(result, default=str),
+                            last_error=None)
+        if done:
+            logger.info(f"Job {job_id} succeeded")
+        return done
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> str:
+        """Requeue a failed job with backoff, or dead-letter it once attempts run out"""
+        job = db.session.get(ProcessingJob, job_id, populate_existing=True)
+        if not job or job.lease_owner != worker_id:
+            return 'lost'
+
+        if job.attempts >= job.max_attempts:
+            if self._finish(job_id, worker_id, status='dead', last_error=error):
+                self._on_dead(job)
+            logger.error(f"Job {job_id} ({job.job_type}) dead-lettered after {job.attempts} attempts: {error}")
+            return 'dead'
+
+        delay = self.retry_delay(job.attempts)
+        self._finish(job_id, worker_id, status='queued', last_error=error,
+                     run_after=datetime.utcnow() + timedelta(seconds=delay), finished_at=None)
+        logger.warning(f"Job {job_id} ({job.job_type}) failed, retrying in {delay:.0f}s: {error}")
+        return 'retry'
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter, so failing jobs do not retry in lockstep"""
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _finish(self, job_id: int, worker_id: str, **values) -> bool:
+        values.setdefault('finished_at', datetime.utcnow())
+        try:
+            updated = db.session.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, ProcessingJob.lease_owner == worker_id,
+                       ProcessingJob.status == 'running')
+                .values(lease_owner=None, lease_expires_at=None, **values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            return bool(updated)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error finishing job {job_id}: {e}")
+            return False
+
+    def requeue_expired(self) -> int:
+        """Return jobs whose worker stopped heartbeating to the queue"""
+        now = datetime.utcnow()
+        expired = (ProcessingJob.status == 'running', ProcessingJob.lease_expires_at < now)
+
+        # Final attempts are rare, so each is dead-lettered on its own to know which this worker moved
+        dead = []
+        for job in ProcessingJob.query.filter(*expired, ProcessingJob.attempts >= ProcessingJob.max_attempts).all():
+            if db.session.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job.id, *expired)
+                .values(status='dead', lease_owner=None, lease_expires_at=None, finished_at=now,
+                        last_error='Lease expired on the final attempt')
+                .execution_options(synchronize_session=False)
+            ).rowcount:
+                dead.append(job)
+        requeued = db.session.execute(
+            update(ProcessingJob)
+            .where(*expired)
+            .values(status='queued', lease_owner=None, lease_expires_at=None, run_after=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        for job in dead:
+            self._on_dead(job)
+        if dead or requeued:
+            logger.warning(f"Expired leases: {requeued} jobs requeued, {len(dead)} dead-lettered")
+        return requeued
+
+    @staticmethod
+    def _on_dead(job: ProcessingJob):
+        """Run the job type's dead-letter cleanup, e.g. removing a send's temp uploads"""
+        cleanup = dead_letter_handlers().get(job.job_type)
+        if cleanup is None:
+            return
+        try:
+            cleanup(job.get_payload())
+        except Exception as e:
+            logger.error(f"Dead-letter cleanup of job {job.id} ({job.job_type}) failed: {e}")
+
+    def purge_finished(self, older_than_days: int = None) -> int:
+        """Delete succeeded jobs older than the retention period; dead letters are kept"""
+        days = older_than_days or int(os.environ.get('JOB_RETENTION_DAYS', 14))
+        deleted = ProcessingJob.query.filter(
+            ProcessingJob.status == 'succeeded',
+            ProcessingJob.finished_at < datetime.utcnow() - timedelta(days=days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def retry_dead(self, job_id: int) -> Dict:
+        """Put a dead-lettered job back on the queue with fresh attempts
+
+        Job types with a dead-letter handler are refused: the handler already
+        released what the payload points to, such as a send's attachments.
+        """
+        try:
+            job = db.session.get(ProcessingJob, job_id)
+            if job is not None and job.status == 'dead' and job.job_type in dead_letter_handlers():
+                return {'status': 'not_retryable', 'job_id': job_id,
+                        'message': f"Dead {job.job_type} jobs cannot be retried, their resources were cleaned up"}
+
+            updated = db.session.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, ProcessingJob.status == 'dead')
+                .values(status='queued', attempts=0, run_after=datetime.utcnow(), finished_at=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            return {'status': 'queued' if updated else 'not_found', 'job_id': job_id}
+        except IntegrityError:
+            db.session.rollback()
+            return {'status': 'already_queued', 'job_id': job_id}
+
+    def wait_for(self, job_id: int, timeout: float, stop_event: threading.Event = None,
+                 poll_seconds: float = 1.0) -> Optional[Dict]:
+        """Wait until a job succeeds, is dead-lettered or fails an attempt; None on timeout
+
+        A queued job's last_error only counts once the job has been claimed
+        while waiting, so an error left from an earlier attempt is ignored.
+        """
+        deadline = datetime.utcnow() + timedelta(seconds=timeout)
+        first_attempts = None
+        claimed = False
+        while datetime.utcnow() < deadline:
+            job = db.session.get(ProcessingJob, job_id, populate_existing=True)
+            db.session.commit()
+            if job is None:
+                return None
+            if first_attempts is None:
+                first_attempts = job.attempts or 0
+            claimed = claimed or job.status == 'running' or (job.attempts or 0) > first_attempts
+            if job.status in ('succeeded', 'dead') or (job.status == 'queued' and job.last_error and claimed):
+                return job.to_dict()
+            if stop_event is not None:
+                if stop_event.wait(poll_seconds):
+                    return None
+            else:
+                time.sleep(poll_seconds)
+        return None
+
+    def has_active(self, job_types: List[str] = None) -> bool:
+        """Whether any job of the given types is queued or running"""
+        query = ProcessingJob.query.filter(ProcessingJob.status.in_(['queued', 'running']))
+        if job_types:
+            query = query.filter(ProcessingJob.job_type.in_(job_types))
+        return db.session.query(query.exists()).scalar()
+
+    def stats(self) -> Dict:
+        """Job counts by status, plus the most recent dead letters"""
+        counts = dict(db.session.query(ProcessingJob.status, db.func.count(ProcessingJob.id))
+                      .group_by(ProcessingJob.status).all())
+        dead = ProcessingJob.query.filter_by(status='dead').order_by(ProcessingJob.finished_at.desc()).limit(10)
+        return {
+            'counts': {status: counts.get(status, 0) for status in ('queued', 'running', 'succeeded', 'dead')},
+            'dead_letters': [job.to_dict() for job in dead]
+        }
+
+
+job_queue = JobQueue()
+
+
+def default_handlers() -> Dict[str, Callable]:
+    """Job type -> handler taking the payload dict and returning a result dict"""
+    from app.services.processing_service import ProcessingService
+    from app.services.backfill_service import backfill_service
+    from app.services.email_service import EmailService
+    from app.services.maintenance_service import run_maintenance
+
+    return {
+        'sync_mailbox': lambda payload: ProcessingService().sync_new_emails(),
+        'process_new_emails': lambda payload: ProcessingService().process_new_emails(
+            hours_back=payload.get('hours_back', 24)),
+        'historical_backfill': lambda payload: backfill_service.execute(days=payload.get('days', 60)),
+        'send_email': lambda payload: EmailService.send_queued_email(payload),
+        'maintenance': lambda payload: run_maintenance(),
+    }
+
+
+def dead_letter_handlers() -> Dict[str, Callable]:
+    """Job type -> cleanup taking the payload of a job that will not be retried"""
+    from app.services.email_service import EmailService
+
+    return {
+        'send_email': EmailService.discard_queued_email,
+    }
+
+
+class JobWorker:
+    """Threads that claim jobs from the queue and run them inside an app context
+
+    While a handler runs, a heartbeat renews the job's lease every third of
+    the lease time. A handler that raises, or returns a result with status
+    'error', fails the job and leaves the retry decision to the queue.
+
+    Long-running job types get a lane of their own threads, so a backfill
+    never holds the slots that sends and mailbox syncs need.
+    """
+
+    # Job type -> threads dedicated to it; concurrency covers every other type
+    DEDICATED_LANES = {'historical_backfill': int(os.environ.get('JOB_BACKFILL_CONCURRENCY', 1))}
+
+    def __init__(self, app, handlers: Dict[str, Callable] = None, concurrency: int = None,
+                 poll_interval: float = None, queue: JobQueue = None, job_types: List[str] = None):
+        self.app = app
+        self.handlers = handlers
+        self.job_types = job_types
+        self.concurrency = concurrency or int(os.environ.get('JOB_WORKER_CONCURRENCY', 1))
+        self.poll_interval = poll_interval or float(os.environ.get('JOB_POLL_SECONDS', 2))
+        self.queue = queue or job_queue
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+        self._running = {}  # worker_id -> job_id currently being run
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        if self.handlers is None:
+            self.handlers = default_handlers()
+        if self.job_types:
+            self.handlers = {job_type: handler for job_type, handler in self.handlers.items()
+                             if job_type in self.job_types}
+        self._stop.clear()
+        for lane, job_types, threads in self._lanes():
+            for n in range(threads):
+                thread = threading.Thread(target=self._loop, args=(f"{self.worker_name}:{lane}:{n}", job_types),
+                                          name=f"job-worker-{lane}-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Job worker started with {len(self._threads)} threads")
+
+    def _lanes(self) -> List[Tuple[str, List[str], int]]:
+        """(lane name, job types, threads) for the shared lane and each dedicated one this worker runs"""
+        shared = [job_type for job_type in self.handlers if job_type not in self.DEDICATED_LANES]
+        lanes = [('jobs', shared, self.concurrency)] if shared else []
+        for job_type, threads in self.DEDICATED_LANES.items():
+            if job_type in self.handlers:
+                lanes.append((job_type, [job_type], threads))
+        return lanes
+
+    def stop(self, timeout: float = None):
+        """Stop claiming new jobs and wait for running ones to finish
+
+        Jobs still running after timeout seconds are not released: their
+        handler may be mid-way through a side effect such as a send, so they
+        keep their lease and are only retried once it expires.
+        """
+        self._stop.set()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+        with self._running_lock:
+            unfinished = dict(self._running)
+        for worker_id, job_id in unfinished.items():
+            logger.warning(f"Job {job_id} still running on {worker_id}; it is retried once its lease expires")
+
+        self._threads = []
+        logger.info(f"Job worker stopped, {len(unfinished)} jobs still running")
+
+    def _loop(self, worker_id: str, job_types: List[str]):
+        while not self._stop.is_set():
+            ran = False
+            try:
+                with self.app.app_context():
+                    try:
+                        job = self.queue.claim(worker_id, job_types)
+                        if job:
+                            self._run(job, worker_id)
+                            ran = True
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}")
+
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+    def _run(self, job: ProcessingJob, worker_id: str):
+        """Run one claimed job, heartbeating until it finishes"""
+        job_id = job.id
+        finished = threading.Event()
+
+        def beat():
+            with self.app.app_context():
+                try:
+                    while not finished.wait(self.queue.lease_seconds / 3):
+                        if not self.queue.heartbeat(job_id, worker_id):
+                            logger.warning(f"{worker_id} lost the lease on job {job_id}")
+                            return
+                finally:
+                    db.session.remove()
+
+        heartbeat = threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True)
+        heartbeat.start()
+        with self._running_lock:
+            self._running[worker_id] = job_id
+        try:
+            result = self.handlers[job.job_type](job.get_payload())
+            if isinstance(result, dict) and result.get('status') == 'error':
+                raise RuntimeError(result.get('message') or result.get('error') or 'Job returned an error')
+        except Exception as e:
+            db.session.rollback()
+            finished.set()
+            heartbeat.join()
+            self.queue.fail(job_id, worker_id, str(e))
+            return
+        finally:
+            with self._running_lock:
+                self._running.pop(worker_id, None)
+
+        finished.set()
+        heartbeat.join()
+        self.queue.complete(job_id, worker_id, result)
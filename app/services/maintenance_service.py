@@ -0,0 +1,28 @@
+import logging
+from typing import Dict
+
+from sqlalchemy import text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+def run_maintenance() -> Dict:
+    """Periodic housekeeping run by the worker: prune old jobs and refresh query planner stats"""
+    from app.services.job_queue import job_queue
+
+    try:
+        purged = job_queue.purge_finished()
+
+        if db.engine.dialect.name == 'sqlite':
+            # Cheap incremental ANALYZE of the tables whose stats have drifted
+            db.session.execute(text('PRAGMA optimize'))
+            db.session.commit()
+
+        logger.info(f"Maintenance completed: {purged} finished jobs purged")
+        return {'status': 'success', 'jobs_purged': purged}
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Maintenance failed: {e}")
+        return {'status': 'error', 'message': str(e)}
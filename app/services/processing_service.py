@@ -13,9 +13,13 @@ class ProcessingService:
     def process_new_emails(self, hours_back: int = 24) -> Dict:
         """Process new emails from the last specified hours"""
         try:
-            # Process both received and sent emails
-            received_result = self.email_processor.process_new_emails(hours_back=hours_back)
-            sent_result = self.email_processor.process_sent_emails(hours_back=hours_back)
+            # Received and sent passes run concurrently under one mailbox lease
+            result = self.email_processor.process_recent_emails(hours_back=hours_back)
+            if result['status'] == 'skipped':
+                # Another worker is already processing this mailbox
+                return result
+            received_result = result['received']
+            sent_result = result['sent']
             
             logger.info(f"Processed {received_result.get('processed', 0)} received emails, {received_result.get('new', 0)} new")
             logger.info(f"Processed {sent_result.get('processed', 0)} sent emails, {sent_result.get('new', 0)} new")
@@ -33,7 +37,10 @@ class ProcessingService:
                 'processed': received_result.get('processed', 0) + sent_result.get('processed', 0),
                 'new': received_result.get('new', 0) + sent_result.get('new', 0),
                 'fixed': total_fixed,
-                'errors': received_result.get('errors', 0) + sent_result.get('errors', 0)
+                'errors': received_result.get('errors', 0) + sent_result.get('errors', 0),
+                'received': received_result,
+                'sent': sent_result,
+                'timings': result['timings']
             }
             
         except Exception as e:
@@ -46,34 +53,39 @@ class ProcessingService:
                 'errors': 1
             }
     
+    def sync_new_emails(self) -> Dict:
+        """Incrementally sync mail added since the last run (received and sent)"""
+        try:
+            result = self.email_processor.sync_mailbox()
+
+            logger.info(f"Mailbox sync ({result.get('mode', 'unknown')}): "
+                        f"{result.get('processed', 0)} processed, {result.get('new', 0)} new")
+
+            status = {'success': 'processing_completed', 'skipped': 'skipped'}.get(result['status'], 'error')
+            return {
+                'status': status,
+                'mode': result.get('mode'),
+                'processed': result.get('processed', 0),
+                'new': result.get('new', 0),
+                'errors': result.get('errors', 0),
+                'critical': result.get('critical', 0)
+            }
+
+        except Exception as e:
+            logger.error(f"Mailbox sync error: {e}")
+            return {
+                'status': 'error',
+                'message': str(e),
+                'processed': 0,
+                'new': 0,
+                'errors': 1
+            }
+
     def process_historical_emails(self, hours_back: int = 1440) -> Dict:
-        """Process historical emails (default: last 60 days)"""
+        """Process historical emails (default: last 60 days) as a resumable backfill"""
         try:
-            # Check if already processing
-            if hasattr(self, '_processing_active') and self._processing_active:
-                return {'status': 'already_processing'}
-            
-            # Start background processing
-            import threading
-            
-            def background_process():
-                self._processing_active = True
-                try:
-                    # Process last 60 days for both received and sent
-                    received_result = self.email_processor.process_new_emails(hours_back=hours_back)
-                    sent_result = self.email_processor.process_sent_emails(hours_back=hours_back)
-                    
-                    logger.info(f"Historical processing completed: received={received_result}, sent={sent_result}")
-                    
-                except Exception as e:
-                    logger.error(f"Historical email processing error: {e}")
-                finally:
-                    self._processing_active = False
-            
-            thread = threading.Thread(target=background_process)
-            thread.start()
-            
-            return {'status': 'processing_started'}
+            from app.services.backfill_service import backfill_service
+            return backfill_service.start(days=max(1, hours_back // 24))
             
         except Exception as e:
             logger.error(f"Error starting historical processing: {e}")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Background worker for Email AI Agent
+Runs mailbox ingestion, scheduled maintenance and outbound sends from the job
+queue in its own process, so the web tier can be restarted and scaled on its own.
+
+    python -m app.worker [--concurrency N] [--job-types a,b] [--no-schedule]
+
+Start one worker with the scheduler; extra workers started with --no-schedule
+only run queued jobs. SIGTERM or Ctrl+C stops claiming new jobs, waits up to
+WORKER_SHUTDOWN_TIMEOUT seconds for running ones, then exits; jobs still running
+are retried once their lease expires.
+"""
+
+import os
+import sys
+import signal
+import logging
+import argparse
+import threading
+
+from app import create_app
+from app.services.background_service import BackgroundService
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Email AI Agent background worker')
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('JOB_WORKER_CONCURRENCY', 2)),
+                        help='Jobs run in parallel by this process, besides the backfill lane '
+                             '(JOB_BACKFILL_CONCURRENCY threads)')
+    parser.add_argument('--job-types', default=os.environ.get('WORKER_JOB_TYPES'),
+                        help='Comma-separated job types to run (default: all)')
+    parser.add_argument('--no-schedule', action='store_true',
+                        help='Only run queued jobs; do not schedule syncs or maintenance')
+    parser.add_argument('--shutdown-timeout', type=float,
+                        default=float(os.environ.get('WORKER_SHUTDOWN_TIMEOUT', 30)),
+                        help='Seconds to let running jobs finish on shutdown')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                        format='%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s')
+
+    app = create_app()
+    job_types = [job_type.strip() for job_type in args.job_types.split(',')] if args.job_types else None
+    service = BackgroundService(app, concurrency=args.concurrency, job_types=job_types,
+                                schedule=not args.no_schedule)
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received {signal.Signals(signum).name}, shutting down")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    service.start()
+    logger.info(f"Worker {os.getpid()} running: concurrency={args.concurrency}, "
+                f"job_types={job_types or 'all'}, schedule={not args.no_schedule}")
+
+    # Wake up periodically so signals are handled promptly on every platform
+    while not stop.wait(1):
+        pass
+
+    service.stop(timeout=args.shutdown_timeout)
+    logger.info("Worker exited")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Gunicorn settings for Email AI Agent
+All values can be overridden from the environment; see README "Production serving".
+"""
+
+import os
+import multiprocessing
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# Requests are CPU-bound, so size by cores; see the benchmark in the README
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app once in the master so workers fork with imports and templates already loaded
+preload_app = True
+
+# Recycle workers now and then to cap slow memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+accesslog = os.environ.get('ACCESS_LOG', '-') or None  # ACCESS_LOG= (empty) turns it off
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections
+
+    The preloaded app opened connections in the master while creating tables;
+    sharing those SQLite handles across processes corrupts locking, so drop
+    them from the pool without closing the parent's copies.
+    """
+    from app import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    server.log.info(f"Worker {worker.pid} initialised with a fresh connection pool")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Classification engine benchmark
+Classifies synthetic emails through EmailClassifier and ClassificationEngine
+against the local fake OpenAI API at several concurrency limits and batch
+sizes, the way the ingestion pipeline's classify stage calls it, and reports
+throughput, retries, how many requests the server saw at once and the
+requests and estimated tokens spent. Batch size 1 is one prompt per email.
+
+    python tests/benchmark_classification.py --emails 200 --latency 0.5 --concurrency 1,4,8,16
+    python tests/benchmark_classification.py --server-limit 6   # account that throttles above 6 in flight
+    python tests/benchmark_classification.py --concurrency 8 --batch-sizes 1,5,10 --drop-every 7
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_service import FakeOpenAIServer
+from app.email_processing.classification_engine import ClassificationEngine
+from app.email_processing.email_classifier import EmailClassifier
+
+
+def make_email(index: int) -> dict:
+    emergency = index % 20 == 0
+    return {
+        'message_id': f"{index:016x}",
+        'subject': 'Water leak in unit 2B' if emergency else f"Question about listing #{index}",
+        'sender_name': f"Sender {index}",
+        'sender_email': f"sender{index}@example.com",
+        'body_cleaned': 'Water is coming through the ceiling.' if emergency else 'Is the property still available?',
+        'is_sent': False,
+    }
+
+
+def run(emails: list, concurrency: int, batch_size: int, latency: float, server_limit: int,
+        drop_every: int, timeout: float):
+    with FakeOpenAIServer(latency=latency, max_concurrent=server_limit, drop_every=drop_every) as server:
+        os.environ['OPENAI_BASE_URL'] = server.url
+        engine = ClassificationEngine(concurrency=concurrency, timeout=timeout, api_key='sk-offline-benchmark')
+        classifier = EmailClassifier(engine)
+        classifier.BATCH_SIZE = batch_size
+
+        start = time.perf_counter()
+        # One thread per allowed call, as the pipeline's classify stage sizes itself
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            if batch_size > 1:
+                batches = [emails[i:i + batch_size] for i in range(0, len(emails), batch_size)]
+                results = [r for batch in pool.map(classifier.classify_emails, batches) for r in batch]
+            else:
+                results = list(pool.map(classifier.classify_email, emails))
+        elapsed = time.perf_counter() - start
+
+    failed = sum(1 for r in results if 'classification_failed' in r.get('tags', []))
+    critical = sum(1 for r in results if r['category'] == 'Critical Alerts')
+    metrics = engine.snapshot()
+    print(f"{batch_size:>5} {concurrency:>11} {elapsed:>8.2f} {len(emails) / elapsed:>9.1f} {failed:>6} {critical:>8} "
+          f"{metrics['retries']:>7} {server.rate_limited:>5} {server.peak_in_flight:>9} {server.requests:>8} "
+          f"{server.prompt_tokens + server.completion_tokens:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--emails', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.5, help='fake completion latency in seconds')
+    parser.add_argument('--concurrency', default='1,4,8,16', help='comma-separated engine concurrency limits')
+    parser.add_argument('--batch-sizes', default='1', help='comma-separated emails per prompt, 1 for single prompts')
+    parser.add_argument('--server-limit', type=int, default=0, help='fake server returns 429 above this many in flight')
+    parser.add_argument('--drop-every', type=int, default=0, help='fake server leaves out every Nth batch result')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    emails = [make_email(i) for i in range(args.emails)]
+    print(f"Emails: {args.emails}, completion latency: {args.latency * 1000:.0f}ms, "
+          f"server limit: {args.server_limit or 'none'}")
+    print(f"{'batch':>5} {'concurrency':>11} {'seconds':>8} {'emails/s':>9} {'failed':>6} {'critical':>8} "
+          f"{'retries':>7} {'429s':>5} {'peak busy':>9} {'requests':>8} {'tokens':>8}")
+    for batch_size in [int(n) for n in args.batch_sizes.split(',')]:
+        for concurrency in [int(n) for n in args.concurrency.split(',')]:
+            run(emails, concurrency, batch_size, args.latency, args.server_limit, args.drop_every, args.timeout)
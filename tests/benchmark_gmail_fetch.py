@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Gmail fetch throughput benchmark
+Compares one-request-per-message fetching with the batched, concurrent
+GmailClient path against the local fake Gmail API, so no Google account is needed
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gmail_service import FakeGmailServer, make_message
+from app.email_processing.gmail_client import GmailClient
+from app.email_processing.gmail_fetcher import GmailFetcher, TokenBucket, FetchMetrics
+
+
+def fetch_serial(client, message_ids):
+    """The pre-batching behaviour: one messages.get round trip per message"""
+    return [
+        client.service.users().messages().get(userId='me', id=message_id, format='full').execute()
+        for message_id in message_ids
+    ]
+
+
+def run(count: int, latency: float, batch_size: int, workers: int, quota: float):
+    corpus = [make_message(i) for i in range(count)]
+    message_ids = [m['id'] for m in corpus]
+    metrics = FetchMetrics()
+    fetcher = GmailFetcher(max_workers=workers, bucket=TokenBucket(quota), metrics=metrics)
+
+    with FakeGmailServer(corpus, latency=latency) as fake:
+        client = GmailClient(service=fake.build_service(), fetcher=fetcher)
+
+        start = time.perf_counter()
+        serial = fetch_serial(client, message_ids)
+        serial_time = time.perf_counter() - start
+        serial_requests = fake.http_requests
+
+        fake.http_requests = 0
+        start = time.perf_counter()
+        batched = list(client.fetch_messages(message_ids, batch_size=batch_size))
+        batched_time = time.perf_counter() - start
+        batched_requests = fake.http_requests
+
+    fetcher.shutdown()
+    assert len(serial) == len(batched) == count
+
+    print(f"Messages: {count}, simulated RTT: {latency * 1000:.0f}ms, batch size: {batch_size}, "
+          f"workers: {workers}, quota: {quota:.0f} units/s")
+    print(f"  serial : {serial_time:7.2f}s  {count / serial_time:8.1f} msg/s  {serial_requests} HTTP requests")
+    print(f"  batched: {batched_time:7.2f}s  {count / batched_time:8.1f} msg/s  {batched_requests} HTTP requests")
+    print(f"  speedup: {serial_time / batched_time:.1f}x")
+    print(f"  fetcher: {metrics.snapshot()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated round trip in seconds')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--quota', type=float, default=250, help='Gmail quota units per second')
+    args = parser.parse_args()
+    run(args.count, args.latency, args.batch_size, args.workers, args.quota)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+End-to-end ingestion benchmark
+Runs EmailProcessor (list, fetch, parse, attachments, classify, save) against the
+local fake Gmail API and a scratch SQLite database, with a stub classifier in place
+of OpenAI so results are repeatable on an isolated machine
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Never touch the real database or call OpenAI from a benchmark
+WORK_DIR = tempfile.mkdtemp(prefix='email_agent_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ.setdefault('OPENAI_API_KEY', 'sk-offline-benchmark')
+
+from fake_gmail_service import FakeGmailServer, Cassette, load_corpus, make_message
+from app import create_app
+from app.database_models import Email
+from app.email_processor import EmailProcessor
+from app.email_processing.gmail_fetcher import GmailFetcher, TokenBucket
+from app.email_processing.pipeline import pipeline_metrics
+
+
+def stub_classifier(classifier, delay: float):
+    """Replace the OpenAI call with a fixed-cost local classification"""
+    def classify(email_data):
+        if delay:
+            time.sleep(delay)
+        result = classifier._classify_sent_email(email_data)
+        if not email_data.get('is_sent'):
+            result.update(sub_category='Benchmark', tags=['benchmark'])
+        return result
+    return classify
+
+
+def run(corpus: list, cassette: Cassette, latency: float, classify_delay: float, quota: float):
+    app = create_app()
+    with app.app_context(), FakeGmailServer(corpus, latency=latency, cassette=cassette) as fake:
+        processor = EmailProcessor()
+        processor.gmail_client = fake.gmail_client(fetcher=GmailFetcher(bucket=TokenBucket(quota)))
+        processor.attachment_handler.base_dir = os.path.join(WORK_DIR, 'attachments')
+        processor.known_messages.clear()
+
+        classify = stub_classifier(processor.email_classifier, classify_delay)
+        latencies = []
+
+        def timed_classify(email_data):
+            result = classify(email_data)
+            # Seconds from the start of the sync until this message was classified
+            latencies.append(time.perf_counter() - start)
+            return result
+        processor.email_classifier.classify_email = timed_classify
+
+        start = time.perf_counter()
+        result = processor.sync_mailbox(full_resync_hours=24 * 365 * 10)
+        elapsed = time.perf_counter() - start
+        stored = Email.query.count()
+        requests = fake.http_requests
+
+    print(f"Messages in mailbox: {len(fake.messages)}, simulated RTT: {latency * 1000:.0f}ms, "
+          f"classify cost: {classify_delay * 1000:.0f}ms")
+    print(f"  sync result : {result}")
+    print(f"  stored      : {stored} emails in {elapsed:.2f}s ({stored / elapsed if elapsed else 0:.1f} msg/s)")
+    print(f"  HTTP calls  : {requests}")
+    if cassette:
+        print(f"  cassette    : {cassette.hits} hits, {cassette.misses} misses")
+    # The last pipeline run is the sent pass of a full resync
+    for name, stage in pipeline_metrics.snapshot()['stages'].items():
+        print(f"  {name:<12}: {stage}")
+    if latencies:
+        latencies.sort()
+        print(f"  classified  : first {latencies[0]:.3f}s  p50 {statistics.median(latencies):.3f}s  "
+              f"p95 {latencies[max(0, int(len(latencies) * 0.95) - 1)]:.3f}s  last {latencies[-1]:.3f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=500, help='synthetic messages when no corpus is given')
+    parser.add_argument('--corpus', help='.json, .jsonl or directory of shards to ingest')
+    parser.add_argument('--cassette', help='recorded responses to replay')
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated round trip in seconds')
+    parser.add_argument('--classify-delay', type=float, default=0.0, help='stub classifier cost in seconds')
+    parser.add_argument('--quota', type=float, default=250, help='Gmail quota units per second')
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    elif args.cassette:
+        corpus = []
+    else:
+        corpus = [make_message(i, is_sent=(i % 5 == 0), attachment_size=(2048 if i % 10 == 3 else 0))
+                  for i in range(args.count)]
+
+    try:
+        run(corpus, Cassette.load(args.cassette) if args.cassette else None, args.latency, args.classify_delay,
+            args.quota)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Local classifier benchmark
+Trains the Naive Bayes fast path on labeled emails in chunks, as refresh()
+does when new rows arrive, and after each chunk reports on the held-out
+emails how many LLM calls it would skip at each confidence threshold, how
+often its answer agrees with the stored label, and its time per email.
+
+Labeled emails come from the app database (the LLM's own classifications,
+split by age) or are synthesized from the test data populator's templates,
+with a fraction of labels flipped to stand in for LLM inconsistency.
+
+    python tests/benchmark_local_classifier.py --source synthetic --count 5000 --noise 0.05
+    python tests/benchmark_local_classifier.py --source database --thresholds 0.9,0.95,0.98,0.99
+
+The model only answers for LOCAL_CLASSIFIER_CATEGORIES. None of the
+synthetic templates fall in the default categories, so pass --categories all
+to measure the model itself.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.email_processing.local_classifier import LocalClassifier, HAS_NUMPY
+
+# Populator template -> (category, priority, requires_action) the LLM gives such mail
+TEMPLATE_LABELS = {
+    'tenant_inquiry': ('New Leads', 'High', True),
+    'property_inquiry': ('New Leads', 'High', True),
+    'maintenance_request': ('Maintenance Requests', 'High', True),
+    'emergency': ('Critical Alerts', 'Critical', True),
+    'rent_payment': ('Tenant Communications', 'Medium', False),
+    'lease_questions': ('Tenant Communications', 'Medium', True),
+    'complaints': ('Tenant Communications', 'Medium', True),
+    'vendor_communication': ('Vendor Communications', 'Medium', False),
+    'legal_notice': ('Legal & Compliance', 'High', True),
+    'inspection_report': ('Legal & Compliance', 'Medium', False),
+}
+
+
+def synthetic_rows(count: int, noise: float, seed: int) -> list:
+    from test_data_populator import EmailTestDataPopulator
+
+    populator = EmailTestDataPopulator()
+    rng = random.Random(seed)
+    labels = sorted(set(TEMPLATE_LABELS.values()))
+    rows = []
+    for _ in range(count):
+        template_name = rng.choice(sorted(TEMPLATE_LABELS))
+        template = populator.email_templates[template_name]
+        name = rng.choice(populator.names)
+        email_data = {
+            'subject': rng.choice(template['subjects']),
+            'sender_email': populator.get_sender_email(template_name, name),
+            'body_cleaned': rng.choice(template['bodies']).format(
+                name=name, address=rng.choice(populator.addresses), phone=rng.choice(populator.phones)),
+        }
+        label = TEMPLATE_LABELS[template_name]
+        if rng.random() < noise:
+            label = rng.choice(labels)
+        rows.append((email_data, *label))
+    return rows
+
+
+def database_rows() -> list:
+    from app import create_app, db
+    from app.database_models import Email, ClassifiedEmail
+
+    with create_app().app_context():
+        query = db.session.query(
+            ClassifiedEmail.category, ClassifiedEmail.priority, ClassifiedEmail.requires_action,
+            Email.subject, Email.sender_email, Email.body_cleaned
+        ).join(Email, ClassifiedEmail.email_id == Email.id).filter(Email.is_sent == False)
+        for tag in LocalClassifier.EXCLUDED_TAGS:
+            query = query.filter((ClassifiedEmail.tags == None) | ~ClassifiedEmail.tags.contains(f'"{tag}"'))
+        return [({'subject': r.subject, 'sender_email': r.sender_email, 'body_cleaned': r.body_cleaned},
+                 r.category, r.priority, r.requires_action)
+                for r in query.order_by(ClassifiedEmail.id).all()]
+
+
+def evaluate(model: LocalClassifier, test_rows: list, thresholds: list):
+    """Served fraction, agreement on served emails, and microseconds per email for each threshold"""
+    start = time.perf_counter()
+    predictions = [model.predict(email_data) for email_data, *_ in test_rows]
+    microseconds = (time.perf_counter() - start) / len(test_rows) * 1e6
+
+    results = []
+    for threshold in thresholds:
+        served = agreed = 0
+        for (_, category, priority, _), (label, confidence, _) in zip(test_rows, predictions):
+            # classify() only answers for its configured categories, never Critical; the rest go to the LLM
+            if confidence >= threshold and model.can_serve(*label):
+                served += 1
+                agreed += label == (category, priority)
+        results.append((threshold, served / len(test_rows), agreed / served if served else None))
+    return results, microseconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=('synthetic', 'database'), default='synthetic')
+    parser.add_argument('--count', type=int, default=5000, help='synthetic emails to generate')
+    parser.add_argument('--noise', type=float, default=0.05, help='fraction of synthetic labels flipped')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--train-fraction', type=float, default=0.8, help='oldest share of rows used for training')
+    parser.add_argument('--chunks', type=int, default=4, help='incremental training steps')
+    parser.add_argument('--thresholds', default='0.9,0.95,0.98,0.99')
+    parser.add_argument('--categories', help="comma-separated categories the model may answer for, "
+                                             "'all' for every category (default: LOCAL_CLASSIFIER_CATEGORIES)")
+    args = parser.parse_args()
+
+    if not HAS_NUMPY:
+        sys.exit('NumPy is not installed; the local classifier is disabled')
+
+    rows = synthetic_rows(args.count, args.noise, args.seed) if args.source == 'synthetic' else database_rows()
+    split = int(len(rows) * args.train_fraction)
+    train_rows, test_rows = rows[:split], rows[split:]
+    if not train_rows or not test_rows:
+        sys.exit(f"Need labeled emails for both training and testing, found {len(rows)}")
+    thresholds = [float(t) for t in args.thresholds.split(',')]
+
+    model = LocalClassifier(min_rows=0)
+    if args.categories == 'all':
+        model.categories = {category for _, category, _, _ in rows}
+    elif args.categories:
+        model.categories = {category.strip() for category in args.categories.split(',')}
+    print(f"Source: {args.source}, {len(train_rows)} training and {len(test_rows)} held-out emails")
+    print(f"{'trained':>8} {'classes':>7} {'train s':>8} {'threshold':>9} {'LLM calls skipped':>17} "
+          f"{'agreement':>9} {'us/email':>8}")
+    chunk_size = -(-len(train_rows) // args.chunks)
+    for start in range(0, len(train_rows), chunk_size):
+        train_start = time.perf_counter()
+        model.partial_fit(train_rows[start:start + chunk_size])
+        train_seconds = time.perf_counter() - train_start
+
+        results, microseconds = evaluate(model, test_rows, thresholds)
+        for threshold, served, agreement in results:
+            print(f"{model.trained_rows:>8} {len(model.labels):>7} {train_seconds:>8.2f} {threshold:>9.2f} "
+                  f"{served:>17.1%} {(f'{agreement:.1%}' if agreement is not None else '-'):>9} "
+                  f"{microseconds:>8.1f}")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Email persistence benchmark
+Compares committing one email at a time with BatchEmailWriter batches on a
+scratch SQLite database, using parsed emails from the synthetic corpus
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+WORK_DIR = tempfile.mkdtemp(prefix='email_agent_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ.setdefault('OPENAI_API_KEY', 'sk-offline-benchmark')
+
+from corpus_generator import CorpusGenerator
+from app import create_app, db
+from app.email_processing.email_writer import BatchEmailWriter
+from app.email_processing.message_dedup import KnownMessageFilter
+from app.property_management.property_manager import PropertyManager
+
+
+def build_items(count: int, seed: int, prefix: str):
+    """Parsed-and-classified pairs shaped like EmailParser and EmailClassifier output"""
+    items = []
+    for message in CorpusGenerator(seed=seed, count=count).messages():
+        headers = {h['name']: h['value'] for h in message['payload']['headers']}
+        maintenance = 'Unit' in message['snippet']
+        items.append(({
+            'message_id': f"{prefix}-{message['id']}",
+            'thread_id': message['threadId'],
+            'subject': headers.get('Subject'),
+            'sender_name': headers.get('From', '').split('<')[0].strip(),
+            'sender_email': headers.get('From', '').split('<')[-1].rstrip('>'),
+            'recipient_email': 'mikeaubry2025@gmail.com',
+            'received_at': datetime.fromtimestamp(int(message['internalDate']) / 1000),
+            'body_raw': message['snippet'],
+            'body_cleaned': message['snippet'],
+            'labels': message['labelIds'],
+            'is_sent': 'SENT' in message['labelIds'],
+            'attachments': [],
+        }, {
+            'category': 'Maintenance Requests' if maintenance else 'General',
+            'priority': 'Medium',
+            'summary': message['snippet'][:80],
+            'extracted_info': {'property_address': '123 Main St'} if maintenance else {},
+            'tags': [],
+        }))
+    return items
+
+
+def run(count: int, batch_size: int, seed: int):
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        writer = BatchEmailWriter(PropertyManager(), KnownMessageFilter())
+
+        items = build_items(count, seed, 'single')
+        start = time.perf_counter()
+        for item in items:
+            writer.write_batch([item])
+        single = time.perf_counter() - start
+
+        items = build_items(count, seed, 'batch')
+        start = time.perf_counter()
+        saved = 0
+        for offset in range(0, count, batch_size):
+            saved += sum(r is True for r in writer.write_batch(items[offset:offset + batch_size]))
+        batched = time.perf_counter() - start
+
+    print(f"Emails: {count}, batch size: {batch_size}")
+    print(f"  one commit per email: {single:7.2f}s  {count / single:8.1f} emails/s")
+    print(f"  batched             : {batched:7.2f}s  {saved / batched:8.1f} emails/s")
+    print(f"  speedup             : {single / batched:.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+    try:
+        run(args.count, args.batch_size, args.seed)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Prioritized ingestion benchmark
+Syncs a mailbox holding a burst of newsletters with a few emergency emails
+listed behind them, once in plain listing order and once with MessagePriority
+ranking, and reports how long the emergencies took to reach the database.
+Uses the local fake Gmail API, a scratch SQLite database and a stub classifier.
+
+    python tests/benchmark_priority.py --bulk 300 --alerts 5 --classify-delay 0.05
+"""
+
+import os
+import sys
+import time
+import base64
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Never touch the real database or call OpenAI from a benchmark
+WORK_DIR = tempfile.mkdtemp(prefix='email_agent_priority_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ.setdefault('OPENAI_API_KEY', 'sk-offline-benchmark')
+
+from fake_gmail_service import FakeGmailServer, make_message
+from app import create_app, db
+from app.database_models import Email, ClassifiedEmail
+from app.email_processor import EmailProcessor
+from app.email_processing.gmail_fetcher import GmailFetcher, TokenBucket
+from app.email_processing.message_priority import MessagePriority
+from app.email_processing.pipeline import pipeline_metrics
+
+
+def with_content(message: dict, subject: str, body: str, labels: list, extra_headers: list = ()) -> dict:
+    """Rewrite a synthetic message's subject, body and labels"""
+    headers = [h for h in message['payload']['headers'] if h['name'] != 'Subject']
+    headers += [{'name': 'Subject', 'value': subject}] + list(extra_headers)
+    message['payload'] = {
+        'mimeType': 'text/plain',
+        'filename': '',
+        'headers': headers,
+        'body': {'size': len(body), 'data': base64.urlsafe_b64encode(body.encode()).decode()},
+    }
+    message['labelIds'] = labels
+    message['snippet'] = ' '.join(body.split())[:100]
+    return message
+
+
+def build_mailbox(bulk: int, alerts: int) -> list:
+    """Newsletters first in listing order, emergencies spread over the oldest part of the burst"""
+    total = bulk + alerts
+    alert_positions = {total - 1 - i * max(1, bulk // (4 * max(1, alerts))) for i in range(alerts)}
+    messages = []
+    for index in range(total):
+        message = make_message(index)
+        if index in alert_positions:
+            messages.append(with_content(
+                message, f"URGENT: water leak in unit {index}",
+                "Hi Mike,\n\nThere is a water leak coming through the ceiling. Please send someone asap.\n\nTenant",
+                ['INBOX', 'UNREAD', 'IMPORTANT']
+            ))
+        else:
+            messages.append(with_content(
+                message, f"Weekly market newsletter #{index}",
+                "This week in real estate: rates, listings and staging tips.\n\nUnsubscribe any time.",
+                ['INBOX', 'CATEGORY_PROMOTIONS'],
+                [{'name': 'List-Unsubscribe', 'value': '<mailto:unsubscribe@news.example.com>'}]
+            ))
+    return messages
+
+
+def stub_classifier(classifier, delay: float):
+    """Fixed-cost local classification that marks keyword emergencies Critical, like the override does"""
+    def classify(email_data):
+        if delay:
+            time.sleep(delay)
+        result = classifier._classify_sent_email(email_data)
+        score = MessagePriority.urgency_score(f"{email_data.get('subject', '')} {email_data.get('body_cleaned', '')}")
+        critical = score >= classifier.URGENCY_OVERRIDE_SCORE
+        result.update(category='Critical Alerts' if critical else 'General',
+                      priority='Critical' if critical else 'Low', sub_category='Benchmark', tags=['benchmark'])
+        return result
+    return classify
+
+
+def run(messages: list, prioritized: bool, latency: float, classify_delay: float, quota: float):
+    app = create_app()
+    with app.app_context(), FakeGmailServer(messages, latency=latency) as fake:
+        Email.query.delete()
+        ClassifiedEmail.query.delete()
+        db.session.commit()
+        pipeline_metrics.visibility.clear()
+
+        processor = EmailProcessor()
+        processor.gmail_client = fake.gmail_client(fetcher=GmailFetcher(bucket=TokenBucket(quota)))
+        processor.attachment_handler.base_dir = os.path.join(WORK_DIR, 'attachments')
+        processor.known_messages.clear()
+        processor.email_classifier.classify_email = stub_classifier(processor.email_classifier, classify_delay)
+        if not prioritized:
+            # Every message gets the same rank, which is plain listing order
+            processor.message_priority.rank = lambda message: MessagePriority.NORMAL
+
+        start = time.perf_counter()
+        result = processor.process_new_emails(hours_back=24 * 30)
+        elapsed = time.perf_counter() - start
+        visibility = pipeline_metrics.snapshot()['visibility']
+
+    label = 'prioritized' if prioritized else 'listing order'
+    print(f"{label}: {result['new']} stored ({result.get('critical', 0)} Critical) in {elapsed:.2f}s")
+    for priority in ('Critical', 'Low'):
+        stats = visibility.get(priority)
+        if stats:
+            print(f"  {priority:<8} x{stats['count']:<4} visible after run start: "
+                  f"p50 {stats['since_run_start']['p50']:.2f}s  max {stats['since_run_start']['max']:.2f}s  "
+                  f"(in pipeline p50 {stats['since_fetch']['p50']:.2f}s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bulk', type=int, default=300, help='newsletters in the burst')
+    parser.add_argument('--alerts', type=int, default=5, help='emergency emails behind the burst')
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated round trip in seconds')
+    parser.add_argument('--classify-delay', type=float, default=0.05, help='stub classifier cost in seconds')
+    parser.add_argument('--quota', type=float, default=250, help='Gmail quota units per second')
+    args = parser.parse_args()
+
+    mailbox = build_mailbox(args.bulk, args.alerts)
+    try:
+        for prioritized in (False, True):
+            run(mailbox, prioritized, args.latency, args.classify_delay, args.quota)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+WSGI serving benchmark
+Starts gunicorn with the production profile (gunicorn.conf.py, wsgi:app) at
+several worker counts against a scratch SQLite database seeded from the
+synthetic corpus, and measures requests per second and latency on the
+dashboard and a few API routes.
+
+    python tests/benchmark_wsgi.py --workers 1,2,4 --duration 10 --clients 8
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+WORK_DIR = tempfile.mkdtemp(prefix='email_agent_wsgi_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ.setdefault('OPENAI_API_KEY', 'sk-offline-benchmark')
+os.environ['SECRET_KEY'] = 'wsgi-benchmark'
+
+from corpus_generator import CorpusGenerator
+from app import create_app, db
+from app.email_processing.email_writer import BatchEmailWriter
+from app.email_processing.message_dedup import KnownMessageFilter
+from app.property_management.property_manager import PropertyManager
+
+ROUTES = ['/dashboard', '/api/urgent_counts', '/api/processing_status', '/api/jobs']
+PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+
+
+def seed(count: int, seed_value: int):
+    """Fill the scratch database and return a logged-in session cookie"""
+    app = create_app()
+    with app.app_context():
+        writer = BatchEmailWriter(PropertyManager(), KnownMessageFilter())
+        items = []
+        for message in CorpusGenerator(seed=seed_value, count=count).messages():
+            headers = {h['name']: h['value'] for h in message['payload']['headers']}
+            items.append(({
+                'message_id': message['id'],
+                'thread_id': message['threadId'],
+                'subject': headers.get('Subject'),
+                'sender_name': headers.get('From', '').split('<')[0].strip(),
+                'sender_email': headers.get('From', '').split('<')[-1].rstrip('>'),
+                'received_at': datetime.fromtimestamp(int(message['internalDate']) / 1000),
+                'body_raw': message['snippet'],
+                'body_cleaned': message['snippet'],
+                'labels': message['labelIds'],
+                'is_sent': 'SENT' in message['labelIds'],
+            }, {
+                'category': 'General',
+                'priority': PRIORITIES[int(message['internalDate']) % len(PRIORITIES)],
+                'summary': message['snippet'][:80],
+            }))
+        for offset in range(0, len(items), 200):
+            writer.write_batch(items[offset:offset + 200])
+
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie = serializer.dumps({'logged_in': True, 'username': 'benchmark'})
+    return f"{app.config.get('SESSION_COOKIE_NAME', 'session')}={cookie}"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", ACCESS_LOG='',
+               LOG_LEVEL='warning')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"gunicorn did not start: {server.stderr.read().decode()[-2000:]}")
+
+
+def load(port: int, path: str, cookie: str, clients: int, duration: float):
+    """Hammer one route from `clients` threads; returns (requests, errors, latencies)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('GET', path, headers={'Cookie': cookie})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except OSError:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), errors[0], sorted(latencies)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+
+def run(worker_counts, duration: float, clients: int, emails: int, seed_value: int):
+    cookie = seed(emails, seed_value)
+    print(f"Emails: {emails}, clients: {clients}, {duration:.0f}s per route, CPUs: {os.cpu_count()}")
+    print(f"{'workers':>7}  {'route':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+
+    for workers in worker_counts:
+        port = free_port()
+        server = start_server(workers, port)
+        try:
+            # Warm up every worker's imports and connection pool
+            load(port, ROUTES[0], cookie, clients, 1.0)
+            for path in ROUTES:
+                count, errors, latencies = load(port, path, cookie, clients, duration)
+                print(f"{workers:>7}  {path:<24} {count / duration:>8.1f} {percentile(latencies, 0.5):>8.1f} "
+                      f"{percentile(latencies, 0.95):>8.1f} {errors:>6}")
+        finally:
+            server.terminate()
+            server.wait(30)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='Comma-separated gunicorn worker counts')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--emails', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+    try:
+        run([int(n) for n in args.workers.split(',')], args.duration, args.clients, args.emails, args.seed)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
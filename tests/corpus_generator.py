@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Synthetic mailbox corpus generator for ingestion benchmarks
+Writes Gmail-API-shaped (format=full) messages as JSONL shards, deterministically
+from a seed, for serving through tests/fake_gmail_service.py
+
+    python tests/corpus_generator.py --count 10000 --output corpus/
+    python tests/corpus_generator.py --count 1000000 --shard-size 50000 --output corpus_1m/
+
+Every message is derived from (seed, count, index) alone, so any shard can be
+regenerated independently and two runs with the same seed are byte-identical.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+from collections import Counter
+from email.utils import formatdate
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_data_populator import EmailTestDataPopulator
+
+MAILBOX = 'mikeaubry2025@gmail.com'
+MAILBOX_NAME = 'Mike Aubry'
+
+# 2025-06-01T00:00:00Z, the newest message in every corpus regardless of when it is generated
+DEFAULT_END = 1748736000
+
+# Relative frequency of each message shape
+KINDS = {
+    'plain': 30,
+    'alternative': 20,
+    'html_only': 8,
+    'nested': 7,
+    'attachment': 10,
+    'thread_reply': 12,
+    'alert': 8,
+    'sent': 5,
+}
+
+# (weight, min bytes, max bytes); the top bucket is over the 50MB download limit
+ATTACHMENT_SIZES = [
+    (70, 2 * 1024, 64 * 1024),
+    (25, 100 * 1024, 2 * 1024 * 1024),
+    (4, 5 * 1024 * 1024, 20 * 1024 * 1024),
+    (1, 51 * 1024 * 1024, 60 * 1024 * 1024),
+]
+
+ATTACHMENT_TYPES = [
+    ('application/pdf', 'pdf'),
+    ('image/jpeg', 'jpg'),
+    ('image/png', 'png'),
+    ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
+    ('text/csv', 'csv'),
+]
+
+# Automated notifications that arrive over and over with identical content
+ALERTS = [
+    ('alerts@smokeguard.com', 'Smoke detector low battery - Unit 4A',
+     'This is an automated alert.\n\nDevice SD-4A-01 at 123 Main St reports a low battery.\n'
+     'Replace the battery within 7 days.\n\nSmokeGuard Monitoring'),
+    ('noreply@payments.example.com', 'Payment received',
+     'A payment has been received for your account.\n\nLog in to the owner portal to see details.\n\n'
+     'This mailbox is not monitored.'),
+    ('monitoring@waterwatch.io', '[WaterWatch] Leak sensor offline',
+     'Sensor WW-2B-basement has not reported for 60 minutes.\n\nStatus: OFFLINE\n'
+     'Property: 456 Oak Ave\n\nYou are receiving this because you subscribed to sensor alerts.'),
+    ('no-reply@listings.example.com', 'Your listing received new views',
+     'Your listing at 789 Pine Dr received 14 new views this week.\n\n'
+     'Manage notification settings in your dashboard.'),
+]
+
+
+def _encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode()
+
+
+def _to_html(text: str) -> str:
+    paragraphs = ''.join(f"<p>{p.replace(chr(10), '<br>')}</p>" for p in text.split('\n\n'))
+    return (
+        '<html><head><style>body{font-family:Arial,sans-serif}td{padding:4px}</style></head><body>'
+        f'<table width="100%"><tr><td>{paragraphs}</td></tr></table>'
+        '<div style="color:#888;font-size:11px">Sent from my mail client</div></body></html>'
+    )
+
+
+class CorpusGenerator:
+    """Deterministic generator of Gmail-shaped messages"""
+
+    def __init__(self, seed: int = 1234, count: int = 1000, end_timestamp: int = DEFAULT_END, days: int = 365,
+                 max_attachment_mb: float = None):
+        self.seed = seed
+        self.count = count
+        self.end_timestamp = end_timestamp
+        self.days = days
+        self.max_attachment_bytes = int(max_attachment_mb * 1024 * 1024) if max_attachment_mb else None
+
+        # Reuse the populator's property-management templates and contact data
+        populator = EmailTestDataPopulator()
+        self.templates = populator.email_templates
+        self.categories = sorted(self.templates)
+        self.names = populator.names
+        self.addresses = populator.addresses
+        self.phones = populator.phones
+        self.sender_email = populator.get_sender_email
+
+        self.kinds = list(KINDS)
+        self.kind_weights = [KINDS[k] for k in self.kinds]
+
+    def messages(self, start: int = 0, stop: int = None):
+        """Yield messages start..stop-1, newest first"""
+        for index in range(start, self.count if stop is None else stop):
+            yield self.message(index)
+
+    def message(self, index: int) -> dict:
+        """Build message number `index`; the same seed and count always give the same message"""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        kind = rng.choices(self.kinds, self.kind_weights)[0]
+
+        # Spread messages evenly over the window, newest first, with jitter inside each slot
+        slot = self.days * 86400 / self.count
+        received_at = self.end_timestamp - (index + rng.random()) * slot
+
+        message_id = self._id(index)
+        thread_id = message_id
+        labels = ['INBOX'] + (['UNREAD'] if rng.random() < 0.4 else [])
+        headers, text = self._content(rng, kind)
+
+        if kind == 'thread_reply':
+            thread_id, headers, text = self._thread(rng, index, headers, text)
+        elif kind == 'alert':
+            labels = ['INBOX', 'CATEGORY_UPDATES'] + (['UNREAD'] if rng.random() < 0.8 else [])
+        elif kind == 'sent':
+            labels = ['SENT']
+
+        headers.append({'name': 'Date', 'value': formatdate(received_at)})
+        headers.append({'name': 'Message-ID', 'value': f"<{message_id}.{self.seed}@corpus.example.com>"})
+
+        payload, size = self._payload(rng, kind, message_id, text)
+        payload['headers'] = headers
+
+        return {
+            'id': message_id,
+            'threadId': thread_id,
+            'labelIds': labels,
+            'snippet': ' '.join(text.split())[:100],
+            'internalDate': str(int(received_at * 1000)),
+            'sizeEstimate': size,
+            'payload': payload,
+        }
+
+    def _id(self, index: int) -> str:
+        return f"{self.seed % 0x10000:04x}{index:012x}"
+
+    def _content(self, rng: random.Random, kind: str):
+        """Headers and plain-text body for one message"""
+        if kind == 'alert':
+            sender, subject, text = rng.choice(ALERTS)
+            headers = [
+                {'name': 'From', 'value': f"Automated Alerts <{sender}>"},
+                {'name': 'To', 'value': f"{MAILBOX_NAME} <{MAILBOX}>"},
+                {'name': 'Subject', 'value': subject},
+                {'name': 'Auto-Submitted', 'value': 'auto-generated'},
+                {'name': 'List-Unsubscribe', 'value': f"<mailto:unsubscribe@{sender.split('@')[1]}>"},
+            ]
+            return headers, text
+
+        category = rng.choice(self.categories)
+        template = self.templates[category]
+        name = rng.choice(self.names)
+        subject = rng.choice(template['subjects'])
+        text = rng.choice(template['bodies']).format(
+            name=name, address=rng.choice(self.addresses), phone=rng.choice(self.phones)
+        )
+        contact = f"{name} <{self.sender_email(category, name)}>"
+
+        if kind == 'sent':
+            text = f"Hi {name.split()[0]},\n\nThanks for reaching out about \"{subject}\". " \
+                   f"I'll follow up shortly.\n\nMike"
+            return [
+                {'name': 'From', 'value': f"{MAILBOX_NAME} <{MAILBOX}>"},
+                {'name': 'To', 'value': contact},
+                {'name': 'Subject', 'value': f"Re: {subject}"},
+            ], text
+
+        return [
+            {'name': 'From', 'value': contact},
+            {'name': 'To', 'value': f"{MAILBOX_NAME} <{MAILBOX}>"},
+            {'name': 'Subject', 'value': subject},
+        ], text
+
+    def _thread(self, rng: random.Random, index: int, headers: list, text: str):
+        """Turn a message into a reply deep inside a long quoted thread"""
+        # Replies in the same bucket of 50 messages share one thread
+        bucket = index // 50
+        thread_id = f"{self.seed % 0x10000:04x}f{bucket:011x}"
+        root = random.Random(f"{self.seed}-thread-{bucket}")
+        subject = root.choice(self.templates[root.choice(self.categories)]['subjects'])
+
+        body = text
+        for depth in range(rng.randint(3, 15)):
+            quoted = '\n'.join(f"> {line}" if line else '>' for line in body.split('\n'))
+            who = rng.choice(self.names + [MAILBOX_NAME])
+            when = formatdate(self.end_timestamp - (index + depth + 1) * 3600)
+            body = f"{rng.choice(['Following up.', 'See below.', 'Any update?', 'Thanks, noted.'])}\n\n" \
+                   f"On {when}, {who} wrote:\n{quoted}"
+
+        for header in headers:
+            if header['name'] == 'Subject':
+                header['value'] = f"Re: {subject}"
+        references = f"<{thread_id}.{self.seed}@corpus.example.com>"
+        headers.append({'name': 'In-Reply-To', 'value': references})
+        headers.append({'name': 'References', 'value': references})
+        return thread_id, headers, body
+
+    def _payload(self, rng: random.Random, kind: str, message_id: str, text: str):
+        """Build the MIME tree, returning (payload, size estimate)"""
+        html = _to_html(text)
+        text_part = {'mimeType': 'text/plain', 'filename': '',
+                     'body': {'size': len(text.encode()), 'data': _encode(text)}}
+        html_part = {'mimeType': 'text/html', 'filename': '',
+                     'body': {'size': len(html.encode()), 'data': _encode(html)}}
+        alternative = {'mimeType': 'multipart/alternative', 'filename': '', 'body': {'size': 0},
+                       'parts': [text_part, html_part]}
+
+        if kind in ('plain', 'thread_reply', 'alert', 'sent'):
+            payload = dict(text_part)
+        elif kind == 'html_only':
+            payload = dict(html_part)
+        elif kind == 'alternative':
+            payload = alternative
+        elif kind == 'nested':
+            # mixed[ related[ alternative[text, html], inline image ], attachment ]
+            inline = self._attachment(rng, message_id, 1, inline=True)
+            related = {'mimeType': 'multipart/related', 'filename': '', 'body': {'size': 0},
+                       'parts': [alternative, inline]}
+            payload = {'mimeType': 'multipart/mixed', 'filename': '', 'body': {'size': 0},
+                       'parts': [related, self._attachment(rng, message_id, 2)]}
+        else:
+            attachments = [self._attachment(rng, message_id, n + 1) for n in range(rng.randint(1, 3))]
+            payload = {'mimeType': 'multipart/mixed', 'filename': '', 'body': {'size': 0},
+                       'parts': [alternative] + attachments}
+
+        return payload, self._size(payload)
+
+    def _attachment(self, rng: random.Random, message_id: str, number: int, inline: bool = False) -> dict:
+        """An attachment part whose bytes the fake server synthesises on download"""
+        if inline:
+            mime_type, extension, size = 'image/png', 'png', rng.randint(1024, 16 * 1024)
+        else:
+            mime_type, extension = rng.choice(ATTACHMENT_TYPES)
+            _, low, high = rng.choices(ATTACHMENT_SIZES, [b[0] for b in ATTACHMENT_SIZES])[0]
+            size = rng.randint(low, high)
+        if self.max_attachment_bytes:
+            size = min(size, self.max_attachment_bytes)
+
+        part = {
+            'partId': str(number),
+            'mimeType': mime_type,
+            'filename': f"{'image' if inline else 'document'}_{message_id[-6:]}_{number}.{extension}",
+            'body': {'size': size, 'attachmentId': f"att-{message_id}-{number}"},
+        }
+        if inline:
+            part['headers'] = [{'name': 'Content-ID', 'value': f"<img{number}@corpus>"},
+                               {'name': 'Content-Disposition', 'value': 'inline'}]
+        return part
+
+    @classmethod
+    def _size(cls, part: dict) -> int:
+        return part.get('body', {}).get('size', 0) + sum(cls._size(p) for p in part.get('parts', []))
+
+
+def write_corpus(output_dir: str, count: int, seed: int, shard_size: int, **options) -> dict:
+    """Stream `count` messages into JSONL shards and write a manifest describing them"""
+    os.makedirs(output_dir, exist_ok=True)
+    generator = CorpusGenerator(seed=seed, count=count, **options)
+    kinds = Counter()
+    shards = []
+
+    for shard_start in range(0, count, shard_size):
+        shard_name = f"corpus_{shard_start // shard_size:05d}.jsonl"
+        with open(os.path.join(output_dir, shard_name), 'w', encoding='utf-8') as f:
+            for message in generator.messages(shard_start, min(count, shard_start + shard_size)):
+                kinds[_kind_of(message)] += 1
+                f.write(json.dumps(message, separators=(',', ':')) + '\n')
+        shards.append(shard_name)
+
+    manifest = {
+        'seed': seed,
+        'count': count,
+        'shard_size': shard_size,
+        'shards': shards,
+        'end_timestamp': generator.end_timestamp,
+        'days': generator.days,
+        'shapes': dict(sorted(kinds.items())),
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _kind_of(message: dict) -> str:
+    """Coarse shape label for the manifest summary"""
+    payload = message['payload']
+    if 'SENT' in message['labelIds']:
+        return 'sent'
+    if 'CATEGORY_UPDATES' in message['labelIds']:
+        return 'alert'
+    if message['threadId'] != message['id']:
+        return 'thread_reply'
+    if payload['mimeType'] == 'multipart/mixed':
+        return 'nested' if payload['parts'][0]['mimeType'] == 'multipart/related' else 'attachment'
+    return {'text/plain': 'plain', 'text/html': 'html_only'}.get(payload['mimeType'], 'alternative')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', default='corpus')
+    parser.add_argument('--shard-size', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365, help='how far back the corpus spans')
+    parser.add_argument('--end-timestamp', type=int, default=DEFAULT_END, help='epoch of the newest message')
+    parser.add_argument('--max-attachment-mb', type=float, help='cap attachment sizes')
+    args = parser.parse_args()
+
+    # Timing stays out of the manifest so runs with the same arguments are byte-identical
+    start = time.perf_counter()
+    manifest = write_corpus(args.output, args.count, args.seed, args.shard_size, days=args.days,
+                            end_timestamp=args.end_timestamp, max_attachment_mb=args.max_attachment_mb)
+    print(f"Wrote {manifest['count']} messages in {len(manifest['shards'])} shards to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+    print(f"Shapes: {manifest['shapes']}")
@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+"""
+Fake Gmail API for offline benchmarking
+Serves a synthetic mailbox (or a recorded cassette of real responses) over HTTP
+so GmailClient, EmailParser and EmailProcessor can run without a Google account
+
+    python tests/fake_gmail_service.py --count 1000 --port 8085
+    python tests/fake_gmail_service.py --corpus corpus_dir/ --latency 0.05
+    python tests/fake_gmail_service.py --record cassette.jsonl --query newer_than:1d
+    python tests/fake_gmail_service.py --cassette cassette.jsonl --port 8085
+
+Point the app at a running instance with GMAIL_API_ROOT_URL=http://127.0.0.1:8085/
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from email import message_from_bytes
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+# Add the parent directory to Python path to import from the main app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.email_processing.gmail_client import GmailClient
+
+API_PREFIX = '/gmail/v1/users/me'
+BATCH_PATHS = ('/batch', '/batch/gmail/v1')
+
+# Query parameters that do not change the response, ignored when matching cassette entries
+IGNORED_PARAMS = {'alt', 'prettyPrint', 'key', 'quotaUser', 'fields'}
+
+NOT_FOUND = {'error': {'code': 404, 'message': 'Requested entity was not found.'}}
+
+
+def make_message(index: int, is_sent: bool = False, attachment_size: int = 0) -> dict:
+    """Build a small plain-text Gmail message in API (format=full) shape"""
+    body = f"Hello Mike,\n\nThis is synthetic message number {index}.\n\nThanks"
+    text_part = {
+        'mimeType': 'text/plain',
+        'filename': '',
+        'body': {
+            'size': len(body),
+            'data': base64.urlsafe_b64encode(body.encode()).decode(),
+        },
+    }
+    headers = [
+        {'name': 'From', 'value': f"Sender {index} <sender{index}@example.com>"},
+        {'name': 'To', 'value': 'Mike Aubry <mikeaubry2025@gmail.com>'},
+        {'name': 'Subject', 'value': f"Synthetic message {index}"},
+        {'name': 'Date', 'value': time.strftime('%a, %d %b %Y %H:%M:%S +0000', time.gmtime())},
+    ]
+
+    if attachment_size:
+        # Attachment bytes are synthesised by the server when the part is downloaded
+        payload = {
+            'mimeType': 'multipart/mixed',
+            'filename': '',
+            'headers': headers,
+            'body': {'size': 0},
+            'parts': [text_part, {
+                'mimeType': 'application/pdf',
+                'filename': f"document_{index}.pdf",
+                'body': {'size': attachment_size, 'attachmentId': f"att-{index:016x}-0"},
+            }],
+        }
+    else:
+        payload = dict(text_part, headers=headers)
+
+    return {
+        'id': f"{index:016x}",
+        'threadId': f"{index:016x}",
+        'labelIds': ['SENT'] if is_sent else ['INBOX', 'UNREAD'],
+        'snippet': body[:100],
+        'internalDate': str(int(time.time() * 1000) - index * 60000),
+        'sizeEstimate': len(body) + attachment_size,
+        'payload': payload,
+    }
+
+
+def load_corpus(path: str) -> list:
+    """Load Gmail-shaped messages from a .json list, a .jsonl file or a directory of .jsonl shards"""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, '*.jsonl')))
+    else:
+        files = [path]
+
+    messages = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if file_path.endswith('.jsonl'):
+                messages.extend(json.loads(line) for line in f if line.strip())
+            else:
+                messages.extend(json.load(f))
+    return messages
+
+
+def synthetic_bytes(seed: str, size: int) -> bytes:
+    """Deterministic filler for attachments that carry a size but no stored data"""
+    block = hashlib.sha256(seed.encode()).digest()
+    return (block * (size // len(block) + 1))[:size]
+
+
+def _request_key(method: str, path: str, query: dict) -> str:
+    params = sorted((k, v) for k, values in query.items() if k not in IGNORED_PARAMS for v in values)
+    return json.dumps([method.upper(), path, params])
+
+
+class Cassette:
+    """Recorded Gmail responses keyed by method, path and query
+
+    Repeated identical requests replay their recordings in order and then keep
+    returning the last one, so polling calls such as getProfile stay stable.
+    """
+
+    def __init__(self, entries: list = None):
+        self.entries = []
+        self._responses = defaultdict(deque)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        for entry in entries or []:
+            self._add(entry)
+
+    def _add(self, entry: dict):
+        self.entries.append(entry)
+        key = _request_key(entry['method'], entry['path'], entry['query'])
+        self._responses[key].append((entry['status'], entry['body']))
+
+    def record(self, method: str, path: str, query: dict, status: int, body, elapsed_ms: float = 0.0):
+        with self._lock:
+            self._add({'method': method.upper(), 'path': path, 'query': query,
+                       'status': status, 'body': body, 'elapsed_ms': round(elapsed_ms, 1)})
+
+    def lookup(self, method: str, path: str, query: dict):
+        """Return the recorded (status, body) for a request, or None"""
+        with self._lock:
+            responses = self._responses.get(_request_key(method, path, query))
+            if not responses:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return responses.popleft() if len(responses) > 1 else responses[0]
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def messages(self) -> list:
+        """Recorded format=full messages, used to seed the mailbox behind the cassette"""
+        found = {}
+        for entry in self.entries:
+            is_get = re.fullmatch(rf"{API_PREFIX}/messages/[^/]+", entry['path']) is not None
+            is_full = entry['query'].get('format', ['full']) == ['full']
+            if entry['method'] == 'GET' and is_get and is_full and entry['status'] == 200:
+                found[entry['body']['id']] = entry['body']
+        return list(found.values())
+
+    def attachments(self) -> dict:
+        """Recorded attachment data keyed by (message id, attachment id)"""
+        found = {}
+        for entry in self.entries:
+            match = re.fullmatch(rf"{API_PREFIX}/messages/([^/]+)/attachments/([^/]+)", entry['path'])
+            if match and entry['status'] == 200:
+                found[match.groups()] = entry['body']['data']
+        return found
+
+    def history_id(self) -> int:
+        """Latest historyId seen in a recorded getProfile response"""
+        ids = [int(e['body']['historyId']) for e in self.entries
+               if e['path'] == f"{API_PREFIX}/profile" and e['status'] == 200]
+        return max(ids, default=0)
+
+    def save(self, path: str):
+        with self._lock, open(path, 'w', encoding='utf-8') as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry) + '\n')
+
+
+class RecordingHttp:
+    """httplib2-compatible wrapper that copies every JSON API response into a cassette"""
+
+    def __init__(self, http, cassette: Cassette):
+        self.http = http
+        self.cassette = cassette
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        start = time.perf_counter()
+        response, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        parsed = urlparse(uri)
+        if parsed.path not in BATCH_PATHS:
+            try:
+                payload = json.loads(content or b'{}')
+            except ValueError:
+                payload = None
+            if payload is not None:
+                self.cassette.record(method, parsed.path, parse_qs(parsed.query),
+                                     response.status, payload, elapsed_ms)
+        return response, content
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+class FakeGmailServer:
+    """Threaded HTTP server implementing the Gmail profile, list, get, history,
+    attachments, send and batch endpoints
+
+    With a cassette, recorded responses are served first and anything the
+    cassette does not cover falls through to the synthetic mailbox.
+    """
+
+    def __init__(self, messages: list, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0,
+                 email_address: str = 'mikeaubry2025@gmail.com', cassette: Cassette = None):
+        self.email_address = email_address
+        self.messages = {}
+        self.order = []
+        # (message id, attachment id) -> urlsafe base64 data for attachments with stored content
+        self.attachments = {}
+        # Messages delivered through messages.send, oldest first
+        self.outbox = []
+        # (historyId, message id) records; history older than history_floor reports 404
+        self.history = []
+        self.history_id = 1000
+        self.history_floor = self.history_id
+        self.latency = latency
+        self.cassette = cassette
+        self.http_requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+        if cassette is not None:
+            # Recorded messages also back list and history calls the cassette has no exact match for
+            self.history_id = self.history_floor = max(self.history_id, cassette.history_id())
+            self.attachments.update(cassette.attachments())
+            messages = list(messages) + cassette.messages()
+        # Deliver oldest first so the listing order stays newest first
+        for message in sorted(messages, key=lambda m: int(m.get('internalDate', 0))):
+            self.add_message(message)
+
+    def add_message(self, message: dict):
+        """Deliver a message into the fake mailbox, recording a history entry
+
+        A corpus message may carry stored attachment content under a private
+        `_attachments` key mapping attachment IDs to urlsafe base64 data.
+        """
+        with self._lock:
+            for attachment_id, data in message.pop('_attachments', {}).items():
+                self.attachments[(message['id'], attachment_id)] = data
+            self.history_id += 1
+            message.setdefault('historyId', str(self.history_id))
+            self.messages[message['id']] = message
+            self.order.insert(0, message['id'])
+            self.history.append((self.history_id, message['id']))
+
+    def expire_history(self):
+        """Drop all history so stored cursors have to fall back to a full resync"""
+        with self._lock:
+            self.history_floor = self.history_id
+            self.history = []
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def build_service(self):
+        """Build a googleapiclient Gmail service that talks to this server"""
+        document = json.loads(get_static_doc('gmail', 'v1'))
+        document['rootUrl'] = self.url
+        return build_from_document(document, http=httplib2.Http())
+
+    def gmail_client(self, **kwargs) -> GmailClient:
+        return GmailClient(service=self.build_service(), **kwargs)
+
+    # ----- request routing -----
+
+    def handle(self, method: str, path: str, query: dict, body: bytes = b''):
+        """Dispatch one API call, returning (status, json body)"""
+        if self.cassette is not None:
+            recorded = self.cassette.lookup(method, path, query)
+            if recorded is not None:
+                return recorded
+
+        if method == 'GET' and path == f"{API_PREFIX}/profile":
+            return 200, {'emailAddress': self.email_address, 'messagesTotal': len(self.order),
+                         'historyId': str(self.history_id)}
+        if method == 'GET' and path == f"{API_PREFIX}/history":
+            return self._list_history(query)
+        if method == 'GET' and path == f"{API_PREFIX}/messages":
+            return 200, self._list_messages(query)
+        if method == 'POST' and path == f"{API_PREFIX}/messages/send":
+            return self._send_message(body)
+
+        match = re.fullmatch(rf"{API_PREFIX}/messages/([^/]+)/attachments/([^/]+)", path)
+        if method == 'GET' and match:
+            return self._get_attachment(*match.groups())
+
+        if method == 'GET' and path.startswith(f"{API_PREFIX}/messages/"):
+            message_id = path.rsplit('/', 1)[1]
+            message = self.messages.get(message_id)
+            if message is None:
+                return 404, NOT_FOUND
+            return 200, self._render_message(message, query)
+        return 404, {'error': {'code': 404, 'message': f"No fake endpoint for {method} {path}"}}
+
+    @staticmethod
+    def _render_message(message: dict, query: dict) -> dict:
+        """Shape a stored message for the requested format"""
+        format = query.get('format', ['full'])[0]
+        if format == 'full':
+            return message
+
+        rendered = {k: v for k, v in message.items() if k != 'payload'}
+        if format == 'metadata':
+            wanted = {h.lower() for h in query.get('metadataHeaders', [])}
+            headers = message['payload'].get('headers', [])
+            if wanted:
+                headers = [h for h in headers if h['name'].lower() in wanted]
+            rendered['payload'] = {'mimeType': message['payload'].get('mimeType'), 'headers': headers}
+        return rendered
+
+    def _matches(self, message: dict, q: str) -> bool:
+        """Evaluate the subset of Gmail search syntax GmailClient builds"""
+        labels = message.get('labelIds', [])
+        received_at = int(message.get('internalDate', 0)) // 1000
+
+        for term in q.split():
+            negated = term.startswith('-')
+            name, _, value = term.lstrip('-').partition(':')
+            value = value.lower()
+
+            if name == 'in' or name == 'is' or name == 'label':
+                result = value.upper() in labels
+            elif name in ('after', 'before'):
+                if '/' in value:
+                    value = datetime.strptime(value, '%Y/%m/%d').replace(tzinfo=timezone.utc).timestamp()
+                result = received_at > int(value) if name == 'after' else received_at < int(value)
+            elif name == 'from':
+                headers = message.get('payload', {}).get('headers', [])
+                sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), '')
+                result = value in sender.lower()
+            else:
+                # Unsupported operators match everything rather than nothing
+                continue
+
+            if result == negated:
+                return False
+        return True
+
+    def _list_messages(self, query: dict) -> dict:
+        q = query.get('q', [''])[0]
+        ids = [i for i in self.order if self._matches(self.messages[i], q)] if q else self.order
+
+        max_results = int(query.get('maxResults', ['100'])[0])
+        start = int(query.get('pageToken', ['0'])[0])
+        page = ids[start:start + max_results]
+
+        result = {'messages': [{'id': i, 'threadId': self.messages[i]['threadId']} for i in page],
+                  'resultSizeEstimate': len(ids)}
+        if start + max_results < len(ids):
+            result['nextPageToken'] = str(start + max_results)
+        return result
+
+    def _list_history(self, query: dict):
+        start = int(query['startHistoryId'][0])
+        if start < self.history_floor:
+            return 404, NOT_FOUND
+
+        max_results = int(query.get('maxResults', ['100'])[0])
+        records = [(h, i) for h, i in self.history if h > start]
+        offset = int(query.get('pageToken', ['0'])[0])
+        page = records[offset:offset + max_results]
+
+        result = {
+            'history': [
+                {'id': str(h), 'messagesAdded': [{'message': {
+                    'id': i,
+                    'threadId': self.messages[i]['threadId'],
+                    'labelIds': self.messages[i]['labelIds'],
+                }}]}
+                for h, i in page
+            ],
+            'historyId': str(self.history_id),
+        }
+        if offset + max_results < len(records):
+            result['nextPageToken'] = str(offset + max_results)
+        return 200, result
+
+    def _get_attachment(self, message_id: str, attachment_id: str):
+        message = self.messages.get(message_id)
+        if message is None:
+            return 404, NOT_FOUND
+
+        data = self.attachments.get((message_id, attachment_id))
+        if data is None:
+            part = self._find_part(message['payload'], attachment_id)
+            if part is None:
+                return 404, NOT_FOUND
+            raw = synthetic_bytes(attachment_id, part['body'].get('size', 0))
+            data = base64.urlsafe_b64encode(raw).decode()
+
+        size = len(base64.urlsafe_b64decode(data))
+        return 200, {'attachmentId': attachment_id, 'size': size, 'data': data}
+
+    @classmethod
+    def _find_part(cls, part: dict, attachment_id: str):
+        if part.get('body', {}).get('attachmentId') == attachment_id:
+            return part
+        for child in part.get('parts', []):
+            found = cls._find_part(child, attachment_id)
+            if found is not None:
+                return found
+        return None
+
+    def _send_message(self, body: bytes):
+        """Accept a messages.send call and file the message under SENT"""
+        request = json.loads(body or b'{}')
+        if 'raw' not in request:
+            return 400, {'error': {'code': 400, 'message': "'raw' RFC822 payload is required"}}
+
+        raw = base64.urlsafe_b64decode(request['raw'])
+        mime = message_from_bytes(raw)
+        message_id = hashlib.sha1(raw + str(time.time_ns()).encode()).hexdigest()[:16]
+
+        headers = [{'name': k, 'value': str(v)} for k, v in mime.items()]
+        if not any(h['name'].lower() == 'from' for h in headers):
+            headers.insert(0, {'name': 'From', 'value': self.email_address})
+        if not any(h['name'].lower() == 'date' for h in headers):
+            headers.append({'name': 'Date', 'value': time.strftime('%a, %d %b %Y %H:%M:%S +0000',
+                                                                    time.gmtime())})
+
+        payload = self._payload_from_mime(message_id, mime)
+        payload['headers'] = headers
+        text = next((p.get_payload(decode=True) for p in mime.walk()
+                     if p.get_content_type() == 'text/plain'), b'') or b''
+
+        message = {
+            'id': message_id,
+            'threadId': request.get('threadId') or message_id,
+            'labelIds': ['SENT'],
+            'snippet': text.decode('utf-8', 'replace')[:100],
+            'internalDate': str(int(time.time() * 1000)),
+            'sizeEstimate': len(raw),
+            'payload': payload,
+        }
+        self.add_message(message)
+        with self._lock:
+            self.outbox.append(message)
+        return 200, {'id': message_id, 'threadId': message['threadId'], 'labelIds': ['SENT']}
+
+    def _payload_from_mime(self, message_id: str, part, index: str = '0') -> dict:
+        """Convert an email.message part into Gmail payload shape, storing attachment bytes"""
+        payload = {'partId': index, 'mimeType': part.get_content_type(),
+                   'filename': part.get_filename() or ''}
+
+        if part.is_multipart():
+            payload['body'] = {'size': 0}
+            payload['parts'] = [self._payload_from_mime(message_id, child, f"{index}.{n}")
+                                for n, child in enumerate(part.get_payload())]
+            return payload
+
+        data = part.get_payload(decode=True) or b''
+        encoded = base64.urlsafe_b64encode(data).decode()
+        if payload['filename']:
+            attachment_id = f"att-{message_id}-{index}"
+            self.attachments[(message_id, attachment_id)] = encoded
+            payload['body'] = {'size': len(data), 'attachmentId': attachment_id}
+        else:
+            payload['body'] = {'size': len(data), 'data': encoded}
+        return payload
+
+    def handle_batch(self, content_type: str, body: bytes) -> tuple:
+        """Answer a multipart/mixed batch request part by part"""
+        envelope = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        boundary = 'batch_fake_gmail_boundary'
+        chunks = []
+        for part in envelope.iter_parts():
+            payload = part.get_payload(decode=False)
+            request_line = payload.split('\n', 1)[0].strip()
+            method, target, _ = request_line.split(' ', 2)
+            parsed = urlparse(target)
+            status, result = self.handle(method, parsed.path, parse_qs(parsed.query))
+            inner = json.dumps(result)
+            content_id = part['Content-ID'].strip('<>')
+            chunks.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{inner}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", ''.join(chunks).encode()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _before_request(self):
+                with server._lock:
+                    server.http_requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+            def do_GET(self):
+                self._before_request()
+                parsed = urlparse(self.path)
+                status, result = server.handle('GET', parsed.path, parse_qs(parsed.query))
+                self._send(status, 'application/json; charset=UTF-8', json.dumps(result).encode())
+
+            def do_POST(self):
+                self._before_request()
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                parsed = urlparse(self.path)
+                if parsed.path in BATCH_PATHS:
+                    content_type, payload = server.handle_batch(self.headers['Content-Type'], body)
+                    self._send(200, content_type, payload)
+                else:
+                    status, result = server.handle('POST', parsed.path, parse_qs(parsed.query), body)
+                    self._send(status, 'application/json; charset=UTF-8', json.dumps(result).encode())
+
+        return Handler
+
+
+def record_cassette(output_path: str, query: str, max_messages: int) -> int:
+    """Capture real Gmail responses for a query, one call at a time, into a cassette file"""
+    from googleapiclient.discovery import build
+    from google_auth_httplib2 import AuthorizedHttp
+
+    client = GmailClient()
+    if not client.authenticate():
+        raise SystemExit('Gmail authentication failed - authorize through the web app first')
+
+    cassette = Cassette()
+    http = RecordingHttp(AuthorizedHttp(client.credentials, http=httplib2.Http()), cassette)
+    users = build('gmail', 'v1', http=http).users()
+    messages = users.messages()
+
+    profile = users.getProfile(userId='me').execute()
+
+    message_ids, page_token = [], None
+    while len(message_ids) < max_messages:
+        response = messages.list(userId='me', q=query, pageToken=page_token,
+                                 maxResults=min(GmailClient.LIST_PAGE_SIZE, max_messages)).execute()
+        message_ids.extend(m['id'] for m in response.get('messages', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    oldest_history_id = int(profile['historyId'])
+    for message_id in message_ids[:max_messages]:
+        message = messages.get(userId='me', id=message_id, format='full').execute()
+        messages.get(userId='me', id=message_id, format='metadata',
+                     metadataHeaders=['From', 'To', 'Subject', 'Date']).execute()
+        oldest_history_id = min(oldest_history_id, int(message.get('historyId', oldest_history_id)))
+
+        parts = [message.get('payload', {})]
+        while parts:
+            part = parts.pop()
+            parts.extend(part.get('parts', []))
+            attachment_id = part.get('body', {}).get('attachmentId')
+            if attachment_id:
+                messages.attachments().get(userId='me', messageId=message_id, id=attachment_id).execute()
+
+    users.history().list(
+        userId='me', startHistoryId=str(oldest_history_id - 1), historyTypes=['messageAdded']
+    ).execute()
+
+    cassette.save(output_path)
+    return len(cassette.entries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000, help='synthetic messages when no corpus is given')
+    parser.add_argument('--corpus', help='.json, .jsonl or directory of shards to serve')
+    parser.add_argument('--cassette', help='recorded responses to replay')
+    parser.add_argument('--record', metavar='PATH', help='record a cassette from the real Gmail API and exit')
+    parser.add_argument('--query', default='newer_than:1d', help='search query to record')
+    parser.add_argument('--max-messages', type=int, default=200, help='messages to record')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated round trip in seconds')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    args = parser.parse_args()
+
+    if args.record:
+        recorded = record_cassette(args.record, args.query, args.max_messages)
+        print(f"Recorded {recorded} responses to {args.record}")
+        sys.exit(0)
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    elif args.cassette:
+        corpus = []
+    else:
+        corpus = [make_message(i, is_sent=(i % 5 == 0), attachment_size=(2048 if i % 10 == 3 else 0))
+                  for i in range(args.count)]
+    cassette = Cassette.load(args.cassette) if args.cassette else None
+
+    with FakeGmailServer(corpus, latency=args.latency, host=args.host, port=args.port,
+                         cassette=cassette) as fake:
+        print(f"Fake Gmail API serving {len(corpus)} messages at {fake.url} (Ctrl+C to stop)")
+        if cassette:
+            print(f"Replaying {len(cassette.entries)} recorded responses from {args.cassette}")
+        print(f"Run the app against it with GMAIL_API_ROOT_URL={fake.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI API for offline benchmarking
+Serves /v1/chat/completions with a fixed latency, optional rate limiting and
+a canned classification reply, so EmailClassifier and the classification
+engine can run without an OpenAI account. Batch prompts get a JSON array with
+one result per <email id="..."> block, and token usage is estimated at four
+characters per token.
+
+    python tests/fake_openai_service.py --latency 0.8 --max-concurrent 20 --port 8086
+
+Point the app at a running instance with OPENAI_BASE_URL=http://127.0.0.1:8086/v1
+"""
+
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Words that make the canned reply a Critical alert, like a real model would
+CRITICAL_WORDS = ('emergency', 'fire', 'flood', 'leak', 'break in')
+
+EMAIL_BLOCK = re.compile(r'<email id="([^"]*)">(.*?)</email>', re.S)
+SINGLE_EMAIL = re.compile(r'\*\*EMAIL TO CLASSIFY:\*\*(.*?)\*\*INSTRUCTIONS:\*\*', re.S)
+
+
+def classify_text(email_text: str) -> dict:
+    critical = any(word in email_text.lower() for word in CRITICAL_WORDS)
+    return {
+        'category': 'Critical Alerts' if critical else 'General',
+        'priority': 'Critical' if critical else 'Medium',
+        'summary': 'Fake classification',
+        'extracted_info': {},
+        'requires_action': critical,
+        'confidence_score': 0.9,
+        'tags': ['fake']
+    }
+
+
+def classification_reply(messages: list) -> str:
+    """Canned classification JSON for the email, or array for the emails, in the last user message"""
+    text = messages[-1].get('content', '') if messages else ''
+    emails = EMAIL_BLOCK.findall(text)
+    if emails:
+        return json.dumps([dict(classify_text(body), id=email_id) for email_id, body in emails])
+    # Only the email itself counts; the instructions mention leaks and floods too
+    single = SINGLE_EMAIL.search(text)
+    return json.dumps(classify_text(single.group(1) if single else text))
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server implementing the chat completions endpoint
+
+    Requests beyond max_concurrent in flight, or every rate_limit_every-th
+    request, get a 429 with a Retry-After header, as an account at its rate
+    limit would. With drop_every set, every Nth result of a batch reply is left
+    out, as a model that loses track of an email would.
+    """
+
+    def __init__(self, latency: float = 0.5, max_concurrent: int = 0, rate_limit_every: int = 0,
+                 retry_after: float = 0.2, reply=classification_reply, drop_every: int = 0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.reply = reply
+        self.drop_every = drop_every
+        self.requests = 0
+        self.completions = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.results_dropped = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, body: bytes):
+        """Return (status, headers, response) for one chat completion request"""
+        with self._lock:
+            self.requests += 1
+            limited = (self.rate_limit_every and self.requests % self.rate_limit_every == 0) or \
+                      (self.max_concurrent and self.in_flight >= self.max_concurrent)
+            if limited:
+                self.rate_limited += 1
+            else:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        if limited:
+            return 429, {'retry-after': str(self.retry_after)}, {
+                'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}
+            }
+
+        try:
+            request = json.loads(body or b'{}')
+            if self.latency:
+                time.sleep(self.latency)
+            content = self._drop_results(self.reply(request.get('messages', [])))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completions += 1
+
+        prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4
+        completion_tokens = len(content) // 4
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+        return 200, {}, {
+            'id': f"chatcmpl-fake-{self.requests}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'fake'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+
+    def _drop_results(self, content: str) -> str:
+        if not self.drop_every or not content.startswith('['):
+            return content
+        results = json.loads(content)
+        kept = [r for i, r in enumerate(results, 1) if i % self.drop_every]
+        with self._lock:
+            self.results_dropped += len(results) - len(kept)
+        return json.dumps(kept)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    status, headers, result = 404, {}, {'error': {'message': f"No fake endpoint for {self.path}"}}
+                else:
+                    status, headers, result = server.handle(body)
+
+                payload = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per completion')
+    parser.add_argument('--max-concurrent', type=int, default=0, help='429 above this many requests in flight')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='429 every Nth request')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8086)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(latency=args.latency, max_concurrent=args.max_concurrent,
+                              rate_limit_every=args.rate_limit_every, host=args.host, port=args.port)
+    print(f"Fake OpenAI API on {server.url}")
+    try:
+        server.start()._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Background processing is not started here; run `python -m app.worker` separately.
+"""
+
+from app import create_app
+
+app = create_app()